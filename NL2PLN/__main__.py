@@ -1,35 +1,68 @@
 import argparse
+import json
 import os
-from NL2PLN.utils.common import process_file, create_openai_completion, extract_logic
-from NL2PLN.utils.prompts import nl2pln, pln2nl
+from NL2PLN.utils.common import (process_file, create_openai_completion, extract_logic, format_example,
+                                 prompt_cache_stats, IncrementalLogicParser, completion_flight)
+from NL2PLN.utils.prompts import nl2pln
+from NL2PLN.utils.query_utils import convert_to_english_batch
+from NL2PLN.utils.pln_render import Rendered, render_stats
 from NL2PLN.metta.metta_handler import MeTTaHandler
 from NL2PLN.utils.checker import HumanCheck
-from NL2PLN.utils.ragclass import RAG
+from NL2PLN.utils.ragclass import RAG, embedding_flight, http_session
+from NL2PLN.utils.embedders import open_embedder
+from NL2PLN.utils.hybrid_retriever import HybridRetriever
+from NL2PLN.utils.example_selector import ExampleSelector, selection_stats
+from NL2PLN.utils.lookahead import LookAhead
+from NL2PLN.utils.cascade import ModelCascade, DEFAULT_MODELS
+from NL2PLN.utils.self_correction import SelfCorrection
+from NL2PLN.utils.validation import SymbolTable, check_structure
 
 
-def convert_logic(input_text, prompt_func, similar_examples, previous_sentences=None):
-    system_msg, user_msg = prompt_func(input_text, similar_examples, previous_sentences or [])
+def generate_logic(input_text, prompt_func, similar_examples, previous_sentences=None, stable_examples=None,
+                   on_text=None, cascade=None, corrector=None, on_retry=None):
+    system_msg, user_msg = prompt_func(input_text, similar_examples, previous_sentences or [], stable_examples)
     #print("--------------------------------------------------------------------------------")
     #print(f"System Message: {system_msg}")
     #print(f"User Message: {user_msg}")
     
-    txt = create_openai_completion(system_msg, user_msg)
-    print("--------------------------------------------------------------------------------")
-    print("LLM output:")
-    print(txt)
-    logic_data = extract_logic(txt)
+    completion = cascade.complete if cascade else create_openai_completion
+    if corrector:
+        return corrector.complete(system_msg, user_msg, on_text=on_text, completion=completion, on_retry=on_retry)
+    return completion(system_msg, user_msg, on_text=on_text)
+
+def review_logic(txt, input_text, echo=True):
+    """Show the LLM output to the reviewer and parse the approved version.
+
+    Returns the parsed logic and whether the reviewer edited the output.
+    """
+    if echo:
+        print("--------------------------------------------------------------------------------")
+        print("LLM output:")
+        print(txt)
+    try:
+        logic_data = extract_logic(txt)
+    except ValueError as e:
+        # Malformed output still goes to the reviewer, who can fix it
+        print(f"WARNING: {e}")
+        logic_data = txt
 
     if logic_data is None:
         raise RuntimeError("No output from LLM")
 
-    # Validate the entire output at once
+    # Validate the entire output at once, until the approved text parses
     validated_data = HumanCheck(txt, input_text)
-    logic_data = extract_logic(validated_data)
-    
+    while True:
+        try:
+            logic_data = extract_logic(validated_data)
+            break
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            validated_data = HumanCheck(validated_data, input_text)
+
     if logic_data is None:
         raise RuntimeError("No output from validation")
         
-    return logic_data
+    return logic_data, validated_data != txt
 
 def run_forward_chaining(metta_handler, pln):
     fc_results = metta_handler.add_atom_and_run_fc(pln)
@@ -37,7 +70,7 @@ def run_forward_chaining(metta_handler, pln):
     return fc_results
 
 def process_forward_chaining_results(rag, fc_results, pln, similar_examples):
-    english_results = [convert_logic(result, pln2nl, similar_examples) for result in fc_results]
+    english_results = convert_to_english_batch(fc_results, "", similar_examples)
     print(f"Forward chaining results in English: {english_results}")
     store_fc_results(rag, fc_results, english_results)
     return pln, fc_results, english_results
@@ -51,21 +84,74 @@ def store_results(rag, sentence, pln_data):
     })
 
 def store_fc_results(rag, fc_results, english_results):
-    for fc_result, english_result in zip(fc_results, english_results):
-        rag.store_embedding({
-            "sentence": english_result,
-            "pln": fc_result,
-            "preconditions": []  # Forward chaining results don't have preconditions
-        })
-
-def process_sentence(line, rag, metta_handler, previous_sentences=None) -> bool:
-    similar = rag.search_similar(line, limit=5)
-    previous_sentences = previous_sentences or []
-    similar_examples = [f"Sentence: {item['sentence']}\nFrom Context:\n{'\n'.join(item.get('from_context', []))}\nType Definitions:\n{'\n'.join(item.get('type_definitions', []))}\nStatements:\n{'\n'.join(item.get('statements', []))}" 
-                       for item in similar if 'sentence' in item]
+    # Template English is too stilted for a few-shot example, only LLM conversions are stored
+    rag.store_embeddings([{
+        "sentence": english_result,
+        "pln": fc_result,
+        "preconditions": []  # Forward chaining results don't have preconditions
+    } for fc_result, english_result in zip(fc_results, english_results)
+        if not isinstance(english_result, Rendered)])
+
+def draft_sentence(line, rag, previous_sentences, stable_examples=None, on_text=None, cascade=None, selector=None,
+                   corrector=None, on_retry=None):
+    """Retrieve similar examples and get the LLM conversion of a sentence, without review."""
+    if selector:
+        similar_examples = selector.select(line, rag.search_similar(line, limit=selector.candidates, with_vectors=True))
+    else:
+        similar = rag.search_similar(line, limit=5)
+        similar_examples = [format_example(item) for item in similar if 'sentence' in item]
+    txt = generate_logic(line, nl2pln, similar_examples, previous_sentences, stable_examples, on_text, cascade,
+                         corrector, on_retry)
+    return similar_examples, txt
+
+def stream_sentence(line, rag, metta_handler, previous_sentences, stable_examples=None, cascade=None, selector=None,
+                    corrector=None):
+    """Draft a sentence while printing the response as it arrives.
+
+    The type definitions are checked for conflicts with the KB as soon as their
+    section is complete, so the reviewer sees conflicts while the statements are
+    still being generated. Nothing is added to the KB before review.
+    """
+    def check_section(name, statements):
+        if name != "type_definitions":
+            return
+        for type_def in statements:
+            conflict = metta_handler.find_conflict(type_def)
+            if conflict is not None:
+                print(f"\nWARNING: Type definition {type_def} conflicts with existing atom: {conflict}")
+
+    parser = IncrementalLogicParser(check_section)
+    def on_text(text):
+        print(text, end="", flush=True)
+        parser.feed(text)
+
+    def on_retry():
+        # Conflicts of the corrected output are checked from scratch
+        parser.reset()
+        print("Corrected LLM output:")
 
+    print("--------------------------------------------------------------------------------")
+    print("LLM output:")
+    similar_examples, txt = draft_sentence(line, rag, previous_sentences, stable_examples, on_text, cascade, selector,
+                                           corrector, on_retry)
+    parser.close()
+    print()
+    return similar_examples, txt
+
+def process_sentence(line, rag, metta_handler, previous_sentences=None, stable_examples=None, lookahead=None,
+                     cascade=None, selector=None, corrector=None, symbols=None) -> bool:
+    previous_sentences = previous_sentences or []
     print(f"Processing line: {line}")
-    pln_data = convert_logic(line, nl2pln, similar_examples, previous_sentences)
+    if lookahead:
+        similar_examples, txt = lookahead.take(line, previous_sentences)
+    else:
+        similar_examples, txt = stream_sentence(line, rag, metta_handler, previous_sentences, stable_examples, cascade,
+                                                selector, corrector)
+
+    pln_data, edited = review_logic(txt, line, echo=lookahead is not None)
+    if edited and lookahead:
+        # Later drafts were made without the corrected output, redo them
+        lookahead.invalidate()
     if pln_data == "Performative":
         return True
     
@@ -78,6 +164,8 @@ def process_sentence(line, rag, metta_handler, previous_sentences=None) -> bool:
     
     # Then add and process all statements
     store_results(rag, line, pln_data)
+    if symbols is not None:
+        symbols.add(pln_data["type_definitions"] + pln_data["statements"])
     
     # Run forward chaining on each statement
     fc_results = []
@@ -94,27 +182,120 @@ def main():
     parser.add_argument("file_path", help="Path to the input file")
     parser.add_argument("--skip", type=int, default=0, help="Number of lines to skip at the beginning of the file")
     parser.add_argument("--limit", type=int, default=None, help="Maximum number of lines to process")
+    parser.add_argument("--stable-examples", default=None,
+                        help="JSON file with example payloads pinned into the cached prompt prefix")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="Report cacheable prefix length and prompt cache hit rate")
+    parser.add_argument("--lookahead", type=int, default=0,
+                        help="Number of upcoming sentences to convert in the background during review")
+    parser.add_argument("--vector-store", default="http://truenas:9333",
+                        help="Qdrant URL, or local:<directory> for the in-process vector store")
+    parser.add_argument("--embedder", default="ollama",
+                        help="ollama[:<model>] or hash[:<dimensions>] for the deterministic offline embedder")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="Retrieve examples with fused vector, word and predicate-symbol ranking")
+    parser.add_argument("--collection", default=None,
+                        help="Collection or alias of the examples, <file>_pln by default; "
+                             "open a collection re-embedded by qdrant_utils reembed through its alias")
+    parser.add_argument("--skip-stored", action="store_true",
+                        help="Skip sentences that are already stored in the collection")
+    parser.add_argument("--dedup", type=float, nargs="?", const=0.98, default=None, metavar="THRESHOLD",
+                        help="Do not store items that duplicate an existing point (default similarity 0.98)")
+    parser.add_argument("--quantization", choices=["int8", "binary"], default=None,
+                        help="Quantize the vectors of a newly created collection")
+    parser.add_argument("--on-disk-payload", action="store_true",
+                        help="Keep the payloads of a newly created collection on disk")
+    parser.add_argument("--example-budget", type=int, default=None, metavar="TOKENS",
+                        help="Choose diverse examples from more candidates and fit them into this many tokens")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Times the LLM is asked to fix mechanical errors (arity, undeclared symbols, "
+                             "unbound variables) before the review")
+    parser.add_argument("--cascade", nargs="*", default=None, metavar="MODEL",
+                        help="Try cheaper models first and escalate when the output fails validation "
+                             f"(default tiers: {' '.join(DEFAULT_MODELS)})")
     args = parser.parse_args()
 
+    prompt_cache_stats.verbose = args.cache_stats
+    stable_examples = None
+    if args.stable_examples:
+        with open(args.stable_examples) as f:
+            stable_examples = [format_example(item) for item in json.load(f)]
+
     metta_handler = MeTTaHandler(args.file_path + ".metta")
     metta_handler.load_kb_from_file()
     print("Loaded kb:")
     print(metta_handler.run("!(kb)"))
 
     collection_name = os.path.splitext(os.path.basename(args.file_path))[0]
-    rag = RAG(collection_name=f"{collection_name}_pln")
+    rag = RAG(collection_name=args.collection or f"{collection_name}_pln", qdrant_url=args.vector_store,
+              dedup_threshold=args.dedup, quantization=args.quantization, on_disk_payload=args.on_disk_payload,
+              embedder=open_embedder(args.embedder, session=http_session()))
+    if args.hybrid:
+        rag = HybridRetriever(rag)
+
+    stored = set()
+    if args.skip_stored:
+        with open(args.file_path) as f:
+            lines = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+        stored = {line for line, payload in zip(lines, rag.search_exact_many(lines)) if payload}
+        print(f"{len(stored)} of {len(lines)} sentences are already stored and will be skipped")
+
+    cascade = None
+    if args.cascade is not None:
+        cascade = ModelCascade(args.cascade or DEFAULT_MODELS)
+
+    selector = None
+    if args.example_budget:
+        selection_stats.verbose = True
+        selector = ExampleSelector(rag, token_budget=args.example_budget)
+
+    symbols = SymbolTable.from_kb(metta_handler)
+    corrector = SelfCorrection(lambda txt: check_structure(txt, symbols), args.retries)
 
     previous_sentences = []
+    lookahead = None
+    if args.lookahead > 0:
+        lookahead = LookAhead(lambda line, previous: draft_sentence(line, rag, previous, stable_examples,
+                                                                   cascade=cascade, selector=selector,
+                                                                   corrector=corrector),
+                              args.lookahead)
+
     def process_sentence_wrapper(line, index):
         print(f"Current Index: {index}")
-        result = process_sentence(line, rag, metta_handler, previous_sentences[-10:] if previous_sentences else [])
+        if line in stored:
+            print(f"Skipping stored sentence: {line}")
+            return True
+        result = process_sentence(line, rag, metta_handler, previous_sentences[-10:] if previous_sentences else [],
+                                  stable_examples, lookahead, cascade, selector, corrector, symbols)
         if result:
             previous_sentences.append(line)
             if len(previous_sentences) > 10:
                 previous_sentences.pop(0)
         return result
 
-    process_file(args.file_path, process_sentence_wrapper, args.skip, args.limit)
+    def schedule_lookahead(upcoming):
+        lookahead.schedule((line for line in upcoming if line not in stored), previous_sentences)
+
+    try:
+        process_file(args.file_path, process_sentence_wrapper, args.skip, args.limit,
+                     schedule_lookahead if lookahead else None)
+    finally:
+        if lookahead:
+            lookahead.shutdown()
+            print(lookahead.report())
+        if cascade:
+            print(cascade.report())
+        print(corrector.report())
+        print(render_stats.report())
+        if selector:
+            print(selection_stats.report())
+        print(completion_flight.report())
+        print(embedding_flight.report())
+        print(rag.embedding_cache.report())
+        if args.dedup is not None:
+            print(rag.dedup_report())
+    if args.cache_stats:
+        print(prompt_cache_stats.report())
 
 if __name__ == "__main__":
     main()
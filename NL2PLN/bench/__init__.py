@@ -0,0 +1 @@
+# NL2PLN benchmarks package
@@ -0,0 +1,82 @@
+"""Compare embedding latency with a new connection per request against the pooled RAG session.
+
+Runs a local stand-in for Ollama's embedding API, so no model server is needed:
+
+    python -m NL2PLN.bench.http_pool --requests 500
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from NL2PLN.utils.ragclass import RAG, http_session
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    dimensions = 768
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/api/embed":
+            body = {"embeddings": [[0.0] * self.dimensions for _ in request["input"]]}
+        else:
+            body = {"embedding": [0.0] * self.dimensions}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_ollama() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def measure(post, url: str, n: int) -> list[float]:
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        response = post(f"{url}/api/embeddings", json={"model": "nomic-embed-text", "prompt": f"sentence {i}"}, timeout=30)
+        response.raise_for_status()
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def summary(name: str, latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    return f"{name:<28} p50 {p50 * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms   total {sum(ordered):6.3f} s"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark connection reuse for embedding requests")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per variant")
+    args = parser.parse_args()
+
+    server = start_fake_ollama()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        print(summary("requests.post (no reuse)", measure(requests.post, url, args.requests)))
+        print(summary("pooled session", measure(http_session().post, url, args.requests)))
+
+        # Full RAG.get_embedding path with the cache disabled and an in-process Qdrant
+        rag = RAG("bench", ollama_base_url=url, qdrant_url=":memory:", embedding_cache=EmbeddingCache(None, max_entries=0))
+        latencies = []
+        for i in range(args.requests):
+            start = time.perf_counter()
+            rag.get_embedding(f"sentence {i}")
+            latencies.append(time.perf_counter() - start)
+        print(summary("RAG.get_embedding", latencies))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
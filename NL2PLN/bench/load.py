@@ -0,0 +1,68 @@
+"""Ingestion and search throughput of RAG at growing collection sizes, without network.
+
+Uses the deterministic HashEmbedder and synthetic sentences, so it runs anywhere:
+
+    python -m NL2PLN.bench.load --sizes 1000 10000 100000 --concurrency 1 4
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from NL2PLN.utils.embedders import HashEmbedder
+from NL2PLN.utils.ragclass import RAG
+
+SUBJECTS = ["the dog", "a cat", "Anna", "the teacher", "my brother", "every bird", "the old man", "a student"]
+VERBS = ["sees", "helps", "follows", "likes", "visits", "teaches", "feeds", "calls"]
+OBJECTS = ["the garden", "a friend", "the river", "her neighbour", "the city", "a small house", "the market"]
+
+def sentences(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} on day {rng.randrange(10000)}"
+            for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of RAG ingestion and search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Collection sizes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Parallel search clients")
+    parser.add_argument("--queries", type=int, default=500, help="Searches per measurement")
+    parser.add_argument("--vector-store", default=None, help="Vector store URL, a fresh local store by default")
+    parser.add_argument("--batch-size", type=int, default=64, help="Batch size of store_embeddings")
+    args = parser.parse_args()
+
+    embedder = HashEmbedder()
+    start = time.perf_counter()
+    embedder.embed_many(sentences(1000, 0))
+    print(f"HashEmbedder: {1000 / (time.perf_counter() - start):.0f} texts/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            rag = RAG(collection_name=f"load_{size}", qdrant_url=args.vector_store or f"local:{directory}",
+                      embedder=embedder, batch_size=args.batch_size)
+            items = [{"sentence": sentence, "statements": []} for sentence in sentences(size, size)]
+            start = time.perf_counter()
+            rag.store_embeddings(items)
+            ingest = size / (time.perf_counter() - start)
+
+            queries = sentences(args.queries, -size)
+            for concurrency in args.concurrency:
+                def timed(query):
+                    begin = time.perf_counter()
+                    rag.search_similar(query, limit=5)
+                    return time.perf_counter() - begin
+                start = time.perf_counter()
+                with ThreadPoolExecutor(concurrency) as executor:
+                    latencies = sorted(executor.map(timed, queries))
+                print(json.dumps({
+                    "points": size,
+                    "ingest_per_s": round(ingest),
+                    "concurrency": concurrency,
+                    "search_qps": round(len(queries) / (time.perf_counter() - start)),
+                    "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+                    "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+                }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare memory footprint, search latency and recall@k of the vector storage modes.
+
+Each mode gets its own LocalBackend collection in a temporary directory, filled with
+the same vectors. Recall is measured against exact float32 search. The vectors are
+synthetic clustered embeddings, or the points of an existing collection:
+
+    python -m NL2PLN.bench.quantization --points 200000
+    python -m NL2PLN.bench.quantization --source mytext_pln --vector-store http://truenas:9333
+"""
+import argparse
+import itertools
+import json
+import statistics
+import tempfile
+import time
+import numpy as np
+from NL2PLN.utils.vector_backends import LocalBackend, open_backend
+
+MODES = [None, "int8", "binary"]
+
+def synthetic_points(count: int, size: int, seed: int = 0):
+    """Clustered vectors around a shared offset, like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    offset = rng.standard_normal(size) * 0.5
+    centers = rng.standard_normal((max(count // 50, 1), size))
+    for i in range(0, count, 10000):
+        n = min(10000, count - i)
+        vectors = offset + centers[rng.integers(len(centers), size=n)] + rng.standard_normal((n, size)) * 0.6
+        yield from ((str(i + j), vectors[j].tolist(), {"sentence": f"point {i + j}"}) for j in range(n))
+
+def collection_points(url: str, name: str):
+    for hit in open_backend(url).scroll(name):
+        yield hit.id, hit.vector, hit.payload
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector storage")
+    parser.add_argument("--points", type=int, default=100000, help="Number of synthetic points")
+    parser.add_argument("--size", type=int, default=768, help="Dimensions of the synthetic points")
+    parser.add_argument("--source", default=None, help="Use the points of this collection instead")
+    parser.add_argument("--vector-store", default="http://truenas:9333", help="Vector store of --source")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--limit", type=int, default=5, help="k of recall@k")
+    parser.add_argument("--on-disk-payload", action="store_true", help="Keep payloads on disk in all modes")
+    args = parser.parse_args()
+
+    points = collection_points(args.vector_store, args.source) if args.source else synthetic_points(args.points, args.size)
+    batches = iter(lambda: list(itertools.islice(points, 5000)), [])
+    first = next(batches, [])
+    if not first:
+        parser.error("No points to benchmark")
+    size = len(first[0][1])
+    rng = np.random.default_rng(1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = LocalBackend(directory)
+        for mode in MODES:
+            backend.create_collection(str(mode), size, mode, args.on_disk_payload)
+        queries = []
+        for batch in itertools.chain([first], batches):
+            for mode in MODES:
+                backend.upsert(str(mode), batch)
+            # Queries are perturbed stored vectors, so each has close neighbours
+            queries.extend((np.asarray(vector) + rng.standard_normal(size) * 0.3).tolist()
+                           for _, vector, _ in batch[:args.queries - len(queries)])
+
+        exact = [[hit.id for hit in backend.search(str(None), query, args.limit)] for query in queries]
+        print(f"{backend.count(str(None))} points of {size} dimensions, {len(queries)} queries")
+        for mode in MODES:
+            latencies, recalls = [], []
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                hits = backend.search(str(mode), query, args.limit)
+                latencies.append(time.perf_counter() - start)
+                recalls.append(len({hit.id for hit in hits} & set(expected)) / len(expected))
+            footprint = backend.footprint(str(mode))
+            print(json.dumps({
+                "mode": mode or "float32",
+                "vector_mb": round(footprint["vectors"] / 2**20, 1),
+                "payload_mb": round(footprint["payloads"] / 2**20, 1),
+                "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+                "latency_p95_ms": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+                f"recall@{args.limit}": round(statistics.mean(recalls), 3),
+            }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Evaluate retrieval latency and quality on gold data.
+
+The gold file is JSONL, one query per line, with the stored sentences that should be retrieved:
+
+    {"query": "Anna helps her brother with his homework", "expected": ["Tom helps Mary with math"]}
+
+    python -m NL2PLN.bench.retrieval_eval mytext_pln gold.jsonl --limit 5
+"""
+import argparse
+import json
+import statistics
+import time
+from NL2PLN.utils.ragclass import RAG
+from NL2PLN.utils.hybrid_retriever import HybridRetriever
+
+def load_gold(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+def evaluate(search, gold: list[dict], limit: int) -> dict:
+    """Run every gold query through search(query, limit) and score the returned payloads."""
+    latencies, recalls, hits, reciprocal_ranks = [], [], [], []
+    for item in gold:
+        start = time.perf_counter()
+        results = search(item["query"], limit)
+        latencies.append(time.perf_counter() - start)
+        sentences = [payload.get("sentence") for payload in results]
+        expected = set(item["expected"])
+        found = [rank for rank, sentence in enumerate(sentences, 1) if sentence in expected]
+        recalls.append(len(set(sentences) & expected) / len(expected) if expected else 1.0)
+        hits.append(1.0 if found else 0.0)
+        reciprocal_ranks.append(1.0 / found[0] if found else 0.0)
+    return {
+        "queries": len(gold),
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p95_ms": percentile(latencies, 95) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        f"recall@{limit}": statistics.mean(recalls),
+        f"hit@{limit}": statistics.mean(hits),
+        "mrr": statistics.mean(reciprocal_ranks),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector and hybrid retrieval on gold data")
+    parser.add_argument("collection", help="Collection name")
+    parser.add_argument("gold", help="JSONL file with query and expected sentences")
+    parser.add_argument("--limit", type=int, default=5, help="Number of examples retrieved per query")
+    parser.add_argument("--vector-store", default="http://truenas:9333",
+                        help="Qdrant URL, or local:<directory> for the in-process vector store")
+    parser.add_argument("--weights", type=float, nargs=3, default=[1.0, 1.0, 1.0], metavar=("VECTOR", "WORD", "SYMBOL"),
+                        help="Fusion weights of the hybrid retriever")
+    args = parser.parse_args()
+
+    gold = load_gold(args.gold)
+    rag = RAG(collection_name=args.collection, qdrant_url=args.vector_store)
+    start = time.perf_counter()
+    hybrid = HybridRetriever(rag, *args.weights)
+    print(f"Built lexical indexes over {len(hybrid.payloads)} points in {time.perf_counter() - start:.2f}s")
+
+    # Embed all queries up front so both variants measure retrieval, not the first embedding call
+    rag.get_embeddings([item["query"] for item in gold])
+    for name, search in [("vector", rag.search_similar), ("hybrid", hybrid.search_similar)]:
+        print(name, json.dumps(evaluate(search, gold, args.limit)))
+
+if __name__ == "__main__":
+    main()
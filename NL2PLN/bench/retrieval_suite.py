@@ -0,0 +1,169 @@
+"""Replay a labeled query set against a collection dump in every retrieval configuration.
+
+The dump is a file written by `qdrant_utils dump` or a directory written by `qdrant_utils
+export`, the query set the gold JSONL file of NL2PLN.bench.retrieval_eval. Each configuration
+gets its own copy of the dump, queries are embedded once up front, and for every
+configuration and limit the suite reports
+p50/p95/p99 latency, throughput with --concurrency parallel clients, and recall@k, hit@k
+and MRR of the gold examples. Results are written as JSON; pass an earlier result file
+as --baseline to flag regressions (exit status 1):
+
+    python -m NL2PLN.bench.retrieval_suite mytext_pln.json gold.jsonl --output today.json --baseline last.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from qdrant_client import QdrantClient
+from NL2PLN.bench.retrieval_eval import evaluate, load_gold
+from NL2PLN.utils.embedders import Embedder, open_embedder
+from NL2PLN.utils.hybrid_retriever import HybridRetriever
+from NL2PLN.utils.qdrant_utils import StreamedDump
+from NL2PLN.utils.ragclass import RAG
+from NL2PLN.utils.vector_backends import LocalBackend, QdrantBackend
+
+# name -> (backend factory taking a scratch directory, quantization)
+CONFIGS = {
+    "local": (LocalBackend, None),
+    "local-int8": (LocalBackend, "int8"),
+    "local-binary": (LocalBackend, "binary"),
+    "qdrant-memory": (lambda directory: QdrantBackend(QdrantClient(":memory:")), None),
+}
+
+def load_dump(path: str):
+    """Points of a dump: a streaming dump directory is read lazily, a JSON dump at once."""
+    if os.path.isdir(path):
+        return StreamedDump(path)
+    with open(path) as f:
+        return json.load(f)
+
+def dump_dimensions(points) -> int | None:
+    """Vector size of the dumped points, None for a dump without vectors."""
+    if isinstance(points, StreamedDump):
+        return points.dimensions or None
+    vector = points[0].get("vector") if points else None
+    return len(vector) if vector else None
+
+def build(config: str, points: list[dict], directory: str, embedder: Embedder, embedding_cache=None) -> RAG:
+    """
+    A RAG over a fresh collection holding the dumped points, embedding queries with
+    embedder. "<config>+hybrid" wraps it in a HybridRetriever.
+    """
+    dimensions = dump_dimensions(points) or embedder.dimensions
+    if dimensions != embedder.dimensions:
+        raise ValueError(f"The dump has {dimensions}-dimensional vectors, embedder {embedder.name} "
+                         f"{embedder.dimensions}; pass the embedder the dump was made with")
+    factory, quantization = CONFIGS[config.removesuffix("+hybrid")]
+    backend = factory(directory)
+    backend.create_collection("bench", dimensions, quantization)
+    rag = RAG(collection_name="bench", backend=backend, embedder=embedder, embedding_cache=embedding_cache)
+    iterator = iter(points)
+    for batch in iter(lambda: list(itertools.islice(iterator, 1000)), []):
+        # Dumps without vectors are embedded like RAG.store_embeddings would
+        vectors = [p["vector"] for p in batch] if all(p.get("vector") for p in batch) else \
+            rag.get_embeddings([rag.embedding_text(p["payload"]) for p in batch])
+        backend.upsert("bench", [(p["id"], vector, p["payload"]) for p, vector in zip(batch, vectors)])
+    return HybridRetriever(rag) if config.endswith("+hybrid") else rag
+
+def throughput(search, queries: list[str], limit: int, concurrency: int, seconds: float) -> float:
+    """Queries per second with `concurrency` clients replaying the queries for about `seconds`."""
+    done = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        while time.perf_counter() - start < seconds:
+            list(executor.map(lambda query: search(query, limit), queries))
+            done += len(queries)
+    return done / (time.perf_counter() - start)
+
+def compare(results: list[dict], baseline: list[dict], latency_tolerance: float, recall_tolerance: float,
+            latency_floor_ms: float = 0.0) -> list[str]:
+    """Regressions of results against a baseline; latency changes below latency_floor_ms are noise."""
+    previous = {(row["config"], row["limit"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = previous.get((row["config"], row["limit"]))
+        if old is None:
+            continue
+        for key in ("latency_p50_ms", "latency_p95_ms", "latency_p99_ms"):
+            if row[key] - old[key] > max(old[key] * latency_tolerance, latency_floor_ms):
+                regressions.append(f"{row['config']} limit {row['limit']}: {key} {old[key]:.2f} -> {row[key]:.2f}")
+        if row["qps"] < old["qps"] / (1 + latency_tolerance):
+            regressions.append(f"{row['config']} limit {row['limit']}: qps {old['qps']:.0f} -> {row['qps']:.0f}")
+        for key in (f"recall@{row['limit']}", "mrr"):
+            if row[key] < old[key] - recall_tolerance:
+                regressions.append(f"{row['config']} limit {row['limit']}: {key} {old[key]:.3f} -> {row[key]:.3f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval benchmark and quality harness")
+    parser.add_argument("dump", help="Collection dump written by qdrant_utils dump or export")
+    parser.add_argument("gold", help="JSONL file with query and expected sentences")
+    parser.add_argument("--configs", nargs="+", default=["local", "local-int8", "local-binary", "qdrant-memory",
+                                                          "local+hybrid"],
+                        help=f"Configurations: {', '.join(CONFIGS)}, each optionally with +hybrid")
+    parser.add_argument("--limits", type=int, nargs="+", default=[3, 5], help="Values of limit to measure")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel clients for the throughput run")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each throughput run")
+    parser.add_argument("--embedder", default="ollama",
+                        help="Embedder of the queries, ollama[:<model>] or hash[:<dimensions>], as used for the dump")
+    parser.add_argument("--ollama", default="http://127.0.0.1:11434", help="Ollama URL for embedding the queries")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Earlier results to compare against")
+    parser.add_argument("--latency-tolerance", type=float, default=0.2,
+                        help="Relative latency or throughput change reported as a regression")
+    parser.add_argument("--latency-floor-ms", type=float, default=0.5,
+                        help="Latency increases below this are not reported as regressions")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the query set")
+    parser.add_argument("--recall-tolerance", type=float, default=0.01,
+                        help="Absolute recall or MRR drop reported as a regression")
+    args = parser.parse_args()
+    for config in args.configs:
+        if config.removesuffix("+hybrid") not in CONFIGS:
+            parser.error(f"Unknown configuration {config}")
+
+    points = load_dump(args.dump)
+    embedder = open_embedder(args.embedder, args.ollama)
+    gold = load_gold(args.gold)
+    queries = [item["query"] for item in gold]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n, config in enumerate(args.configs):
+            rag = build(config, points, f"{directory}/{n}", embedder)
+            # Embed (or load from the embedding cache) up front, so only retrieval is timed
+            rag.get_embeddings(queries)
+            for limit in args.limits:
+                row = {"config": config, "limit": limit, **evaluate(rag.search_similar, gold * args.repeat, limit)}
+                row["queries"] = len(gold)
+                row["qps"] = throughput(rag.search_similar, queries, limit, args.concurrency, args.seconds)
+                results.append(row)
+                print(json.dumps({key: round(value, 3) if isinstance(value, float) else value
+                                  for key, value in row.items()}))
+
+    report = {
+        "meta": {
+            "dump": args.dump, "gold": args.gold, "points": len(points), "queries": len(gold),
+            "concurrency": args.concurrency, "repeat": args.repeat, "python": platform.python_version(),
+            "machine": platform.machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.latency_tolerance, args.recall_tolerance,
+                                  args.latency_floor_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Parsing speed of LLM output sections, against the former line-rescanning parser.
+
+Measures a section of one-line statements, the usual LLM output, then sections
+of statements spanning more and more lines. Both parsers count parentheses with
+str.count, but parse_lisp_statement also normalises the text to the rendered
+form and checks where each statement closes, so it is up to about 3x slower on
+short statements. The former parser re-counts the accumulated statement on every
+line, which is quadratic in the lines of a statement, so it falls behind from
+about a hundred lines:
+
+    python -m NL2PLN.bench.sexpr_parse --statements 100 --lines 10 100 1000
+"""
+import argparse
+import json
+import random
+import time
+from NL2PLN.utils.common import parse_lisp_statement
+
+PREDICATES = ["Dog", "Chases", "Likes", "LivesIn", "Helps", "Owns"]
+NAMES = ["max", "tom", "anna", "garden", "city", "$x", "$y"]
+
+def legacy_parse_lisp_statement(lines: list[str]) -> list[str]:
+    """The parser before sexpr.Reader, kept for comparison."""
+    result = []
+    current_statement = None
+    for line in lines:
+        line = line.strip()
+        if not line or not line.startswith('('):
+            continue
+        current_statement = line if current_statement is None else current_statement + ' ' + line
+        if current_statement.count('(') <= current_statement.count(')'):
+            current_statement = current_statement[:current_statement.rindex(')') + 1]
+            result.append(current_statement)
+            current_statement = None
+    if current_statement is not None:
+        result.append(current_statement)
+    return result
+
+def statement_lines(rng: random.Random, lines: int, one_line: bool = False) -> list[str]:
+    """One (: proof (* ...)) statement with one conjunct per line, or all on one line."""
+    conjuncts = [f"({rng.choice(PREDICATES)} rel{i} {rng.choice(NAMES)} {rng.choice(NAMES)})" for i in range(lines)]
+    if one_line:
+        return [f"(: prf{rng.randrange(10**6)} (* {' '.join(conjuncts)}))"]
+    # The closing parentheses end the last conjunct line; the former parser skipped lines starting with ')'
+    conjuncts[-1] += "))"
+    return [f"(: prf{rng.randrange(10**6)} (*"] + [f"  {c} ; part {i}" for i, c in enumerate(conjuncts)]
+
+def timed(func, lines: list[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="S-expression parser micro-benchmark")
+    parser.add_argument("--statements", type=int, default=100, help="Statements per section")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 100, 1000], help="Conjunct lines per statement")
+    parser.add_argument("--one-line-conjuncts", type=int, default=3,
+                        help="Conjuncts of the one-line statements measured first, 0 to skip them")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the fastest counts")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cases = [(args.one_line_conjuncts, True)] if args.one_line_conjuncts else []
+    for length, one_line in cases + [(length, False) for length in args.lines]:
+        lines = [line for _ in range(args.statements) for line in statement_lines(rng, length, one_line)]
+        size = sum(len(line) + 1 for line in lines)
+        reader = timed(parse_lisp_statement, lines, args.repeat)
+        legacy = timed(legacy_parse_lisp_statement, lines, args.repeat)
+        print(json.dumps({
+            "lines_per_statement": len(lines) // args.statements,
+            "conjuncts": length,
+            "megabytes": round(size / 1e6, 2),
+            "reader_mb_per_s": round(size / 1e6 / reader, 2),
+            "legacy_mb_per_s": round(size / 1e6 / legacy, 2),
+            "speedup": round(legacy / reader, 2),
+        }))
+
+if __name__ == "__main__":
+    main()
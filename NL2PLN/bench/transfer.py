@@ -0,0 +1,58 @@
+"""Export and import throughput of a collection with a growing number of workers.
+
+Against a running server the workers overlap network round trips:
+
+    python -m NL2PLN.bench.transfer --url localhost:6333 --points 100000 --workers 1 2 4 8
+
+Without --url a fresh local store is used, which is bound by the interpreter and
+mostly shows the overhead of the partitioning.
+"""
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from NL2PLN.utils.qdrant_utils import dump_collection_stream, restore_collection_stream
+from NL2PLN.utils.vector_backends import open_backend
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel export/import throughput")
+    parser.add_argument("--url", default=None, help="Vector store URL, a fresh local store by default")
+    parser.add_argument("--points", type=int, default=20000, help="Size of the synthetic collection")
+    parser.add_argument("--dimensions", type=int, default=768, help="Vector size")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to measure")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per page and per upsert")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.url or f"local:{directory}/store"
+        backend = open_backend(url)
+        source = "bench_transfer"
+        if not backend.collection_exists(source):
+            backend.create_collection(source, args.dimensions)
+            rng = np.random.default_rng(0)
+            for begin in range(0, args.points, 1000):
+                rows = range(begin, min(begin + 1000, args.points))
+                vectors = rng.standard_normal((len(rows), args.dimensions), dtype=np.float32)
+                backend.upsert(source, [(row, vector.tolist(), {"sentence": f"sentence {row}"})
+                                        for row, vector in zip(rows, vectors)])
+
+        for workers in args.workers:
+            dump = f"{directory}/dump_{workers}"
+            start = time.perf_counter()
+            count = dump_collection_stream(source, dump, url, args.batch_size, workers=workers)
+            export = time.perf_counter() - start
+
+            target = f"bench_transfer_{workers}_{time.time_ns()}"
+            start = time.perf_counter()
+            restore_collection_stream(target, dump, url, args.batch_size, workers=workers)
+            restore = time.perf_counter() - start
+            print(json.dumps({
+                "workers": workers,
+                "points": count,
+                "export_per_s": round(count / export),
+                "import_per_s": round(count / restore),
+            }))
+
+if __name__ == "__main__":
+    main()
@@ -31,9 +31,30 @@ class MeTTaHandler:
         [self.append_to_file(str(elem)) for elem in res[0]]
         return out
 
+    def declarations(self) -> List[str]:
+        """All (: name type) atoms in &kb."""
+        return [str(atom) for atom in self.metta.run("!(match &kb (: $a $b) (: $a $b))")[0]]
+
     def bc(self, atom: str) -> List[str]:
         return self.metta.run('!(bc &kb (S (S (S Z))) ' + atom + ')')
 
+    def _existing_type(self, exp) -> str | None:
+        inctx = self.metta.run("!(match &kb (: " + str(exp.get_children()[1]) + " $a) $a)")
+        return str(inctx[0][0]) if len(inctx[0]) > 0 else None
+
+    def find_conflict(self, atom: str) -> str | None:
+        """Check atom against the context without adding it.
+
+        Returns:
+            None if atom could be added without conflict
+            The conflicting atom string if a conflict was found
+        """
+        exp = self.metta.parse_single(atom)
+        existing_atom = self._existing_type(exp)
+        if existing_atom is None or str(exp.get_children()[2]) == existing_atom:
+            return None
+        return existing_atom
+
     def add_to_context(self, atom: str) -> str | None:
         """Add atom to context if no conflict exists.
         
@@ -42,13 +63,12 @@ class MeTTaHandler:
             The conflicting atom string if a conflict was found
         """
         exp = self.metta.parse_single(atom)
-        inctx = self.metta.run("!(match &kb (: " + str(exp.get_children()[1]) + " $a) $a)")
+        existing_atom = self._existing_type(exp)
         
-        if len(inctx[0]) == 0:
+        if existing_atom is None:
             self.metta.run("!(add-atom &kb " + atom + ")")
             return None
             
-        existing_atom = str(inctx[0][0])
         if str(exp.get_children()[2]) == existing_atom:
             return None
         else:
@@ -1,10 +1,13 @@
 import argparse
 import json
-from NL2PLN.utils.common import create_openai_completion
-from NL2PLN.utils.query_utils import convert_logic_simple, convert_to_english
+from NL2PLN.utils.common import create_openai_completion, format_example, prompt_cache_stats, completion_flight
+from NL2PLN.utils.example_selector import ExampleSelector, selection_stats
+from NL2PLN.utils.query_utils import convert_logic_simple, convert_to_english, convert_to_english_batch
+from NL2PLN.utils.pln_render import render_stats
 from NL2PLN.utils.prompts import nl2pln, pln2nl
 from NL2PLN.metta.metta_handler import MeTTaHandler
-from NL2PLN.utils.ragclass import RAG
+from NL2PLN.utils.ragclass import RAG, embedding_flight, http_session, search_collections
+from NL2PLN.utils.embedders import open_embedder
 import os
 import cmd
 
@@ -12,14 +15,18 @@ class KBShell(cmd.Cmd):
     intro = 'Welcome to the Knowledge Base shell. Type help or ? to list commands.\n'
     prompt = 'KB> '
 
-    def __init__(self, kb_file: str, collection_name: str):
+    def __init__(self, kb_file: str, collection_name: str, vector_store: str = "http://truenas:9333",
+                 example_budget: int | None = None, embedder: str = "ollama", query_collection_name: str | None = None):
         super().__init__()
         self.debug = False
         self.llm = False
         self.metta_handler = MeTTaHandler(kb_file)
         self.metta_handler.load_kb_from_file()
-        self.rag = RAG(collection_name=collection_name)
-        self.query_rag = RAG(collection_name=f"{collection_name}_query")
+        embedder = open_embedder(embedder, session=http_session())
+        self.rag = RAG(collection_name=collection_name, qdrant_url=vector_store, embedder=embedder)
+        self.query_rag = RAG(collection_name=query_collection_name or f"{collection_name}_query",
+                             qdrant_url=vector_store, embedder=embedder)
+        self.selector = ExampleSelector(self.rag, token_budget=example_budget) if example_budget else None
         self.conversation_history = []
         print(f"Loaded knowledge base from {kb_file}")
         print("Type 'exit' to quit")
@@ -43,20 +50,14 @@ class KBShell(cmd.Cmd):
         print(f"LLM mode: {'on' if self.llm else 'off'}")
 
     def get_similar_examples(self, input_text):
-        # Get examples from both RAG databases
-        base_similar = self.rag.search_similar(input_text, limit=3)
-        query_similar = self.query_rag.search_similar(input_text, limit=2)
-        
-        # Combine results
-        similar = base_similar + query_similar
-        
-        return [
-            f"Sentence: {item['sentence']}\n"
-            f"From Context:\n{'\n'.join(item.get('from_context', []))}\n"
-            f"Type Definitions:\n{'\n'.join(item.get('type_definitions', []))}\n"
-            f"Statements:\n{'\n'.join(item.get('statements', []))}" 
-            for item in similar if 'sentence' in item
-        ]
+        # Get examples from both RAG databases, 3 from the base and 2 from the query collection
+        if self.selector:
+            # Three times as many candidates, in the same proportion
+            base, queries = search_collections(input_text, [(self.rag, 9), (self.query_rag, 6)], grouped=True,
+                                               with_vectors=True)
+            return self.selector.select(input_text, base + queries, baseline=base[:3] + queries[:2])
+        similar = search_collections(input_text, [(self.rag, 3), (self.query_rag, 2)])
+        return [format_example(item) for item in similar if 'sentence' in item]
 
     def get_llm_response(self, user_input: str) -> str:
         """Get response from LLM considering conversation history"""
@@ -96,7 +97,11 @@ class KBShell(cmd.Cmd):
         if self.debug: print(f"Processing input: {user_input}")
         similar_examples = self.get_similar_examples(user_input)
         if self.debug: print(f"Similar examples:\n{similar_examples}")
-        pln_data = convert_logic_simple(user_input, nl2pln, similar_examples)
+        try:
+            pln_data = convert_logic_simple(user_input, nl2pln, similar_examples)
+        except ValueError as e:
+            print(f"Could not parse the converted logic: {e}")
+            return
         if self.debug:
             print("\nConverted PLN data:")
             print(json.dumps(pln_data, indent=2))
@@ -124,8 +129,7 @@ class KBShell(cmd.Cmd):
             if fc_results and self.debug:
                 print(f"FC results: {fc_results}")
                 print("\nInferred results:")
-                for result in fc_results:
-                    english = convert_to_english(result, "", similar_examples)
+                for english in convert_to_english_batch(fc_results, "", similar_examples):
                     print(f"- {english}")
             else:
                 print("No new inferences made.")
@@ -145,10 +149,34 @@ class KBShell(cmd.Cmd):
 def main():
     parser = argparse.ArgumentParser(description="Interactive shell for querying the knowledge base.")
     parser.add_argument("kb_file", help="Path to the knowledge base file (.metta)")
+    parser.add_argument("--vector-store", default="http://truenas:9333",
+                        help="Qdrant URL, or local:<directory> for the in-process vector store")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="Report cacheable prefix length and prompt cache hit rate")
+    parser.add_argument("--example-budget", type=int, default=None, metavar="TOKENS",
+                        help="Choose diverse examples from more candidates and fit them into this many tokens")
+    parser.add_argument("--embedder", default="ollama",
+                        help="ollama[:<model>] or hash[:<dimensions>] for the deterministic offline embedder")
+    parser.add_argument("--collection", default=None,
+                        help="Collection or alias of the examples, <kb>_pln by default; "
+                             "open a collection re-embedded by qdrant_utils reembed through its alias")
+    parser.add_argument("--query-collection", default=None,
+                        help="Collection or alias of the query examples, <kb>_pln_query by default")
     args = parser.parse_args()
+    prompt_cache_stats.verbose = args.cache_stats
 
     collection_name = os.path.splitext(os.path.splitext(os.path.basename(args.kb_file))[0])[0]
-    KBShell(args.kb_file, f"{collection_name}_pln").cmdloop()
+    shell = KBShell(args.kb_file, args.collection or f"{collection_name}_pln", args.vector_store, args.example_budget,
+                    args.embedder, args.query_collection or f"{collection_name}_pln_query")
+    shell.cmdloop()
+    print(render_stats.report())
+    if shell.selector:
+        print(selection_stats.report())
+    print(completion_flight.report())
+    print(embedding_flight.report())
+    print(shell.rag.embedding_cache.report())
+    if args.cache_stats:
+        print(prompt_cache_stats.report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,31 @@
+import asyncio
+from NL2PLN.utils.async_rag import AsyncRAG
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+from NL2PLN.utils.vector_backends import LocalBackend, ThreadedBackend
+
+def test_async_rag_store_and_search(tmp_path) -> None:
+    requests = []
+
+    async def fake_embeddings(texts):
+        requests.append(len(texts))
+        await asyncio.sleep(0.01)
+        return [[float(len(text)), 1.0] + [0.0] * 766 for text in texts]
+
+    async def fake_embedding(text):
+        return (await fake_embeddings([text]))[0]
+
+    async def run():
+        rag = AsyncRAG(backend=ThreadedBackend(LocalBackend(str(tmp_path))), embedding_cache=EmbeddingCache(None))
+        rag._request_embeddings = fake_embeddings
+        rag._request_embedding = fake_embedding
+        async with rag:
+            await rag.store_embeddings([{"sentence": "Max is a dog"}, {"sentence": "The cat sleeps"}])
+            # Concurrent searches for the same sentence share one embedding request
+            results = await asyncio.gather(*[rag.search_similar("Is Max a dog?", limit=1) for _ in range(5)])
+            exact = await rag.search_exact("max is a  dog")
+        return results, exact
+
+    results, exact = asyncio.run(run())
+    assert requests == [2, 1]
+    assert all(len(result) == 1 for result in results)
+    assert exact["sentence"] == "Max is a dog"
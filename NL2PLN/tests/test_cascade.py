@@ -0,0 +1,24 @@
+from NL2PLN.utils import cascade as cascade_module
+from NL2PLN.utils.cascade import ModelCascade
+
+def test_escalates_until_accepted(monkeypatch) -> None:
+    outputs = {"small": "bad", "medium": "good", "large": "good"}
+    calls = []
+    def completion(system_msg, user_msg, model=None, on_text=None):
+        calls.append(model)
+        return outputs[model]
+    monkeypatch.setattr(cascade_module, "create_openai_completion", completion)
+
+    streamed = []
+    cascade = ModelCascade(["small", "medium", "large"], validate=lambda txt: [] if txt == "good" else ["invalid"])
+    assert cascade.complete("system", "user", on_text=streamed.append) == "good"
+    assert calls == ["small", "medium"]
+    # An accepted output of an earlier tier is passed to on_text once, after validation
+    assert streamed == ["good"]
+
+    outputs["medium"] = "bad"
+    outputs["large"] = "bad"
+    assert cascade.complete("system", "user") == "bad"
+    assert cascade.attempts == {"small": 2, "medium": 2, "large": 1}
+    assert cascade.accepted == {"medium": 1}
+    assert "  medium: 1/2 accepted (50.0%)" in cascade.report().split('\n')
@@ -1,6 +1,6 @@
 from typing import List
 import pytest
-from NL2PLN.utils.common import extract_logic, parse_lisp_statement
+from NL2PLN.utils.common import extract_logic, parse_lisp_statement, IncrementalLogicParser
 
 def test_parse_lisp_statement() -> None:
     # Test single line statement
@@ -54,3 +54,35 @@ Type Definitions:
 Statements:
 ```"""
     assert extract_logic(response) is None
+
+def test_incremental_logic_parser() -> None:
+    response = """Here you go:
+```
+From Context:
+(: john Object)
+
+Type Definitions:
+(: Happy (-> Object Object Type))
+
+Statements:
+(: happyrel Object)
+(: prf1
+  (Happy happyrel john))
+```
+Done."""
+    sections = []
+    parser = IncrementalLogicParser(lambda name, statements: sections.append((name, statements)))
+
+    # Feed in small chunks; type definitions must be reported before the statements arrive
+    type_defs_end = response.index("(: happyrel")
+    for i in range(0, type_defs_end, 7):
+        parser.feed(response[i:min(i + 7, type_defs_end)])
+    assert sections == [
+        ("from_context", ["(: john Object)"]),
+        ("type_definitions", ["(: Happy (-> Object Object Type))"]),
+    ]
+
+    parser.feed(response[type_defs_end:])
+    parser.close()
+    assert sections[2] == ("statements", ["(: happyrel Object)", "(: prf1 (Happy happyrel john))"])
+    assert len(sections) == 3
@@ -0,0 +1,20 @@
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+
+def test_cache_persists_across_instances(tmp_path) -> None:
+    path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    first = EmbeddingCache(path)
+    first.put("nomic-embed-text", "Max is a dog", [0.25, -1.5, 3.0])
+    first.db.close()
+
+    second = EmbeddingCache(path)
+    assert second.get("nomic-embed-text", "Max is a dog") == [0.25, -1.5, 3.0]
+    # Entries are per model
+    assert second.get("other-model", "Max is a dog") is None
+    assert second.report() == "Embedding cache: 1/2 lookups served from cache"
+
+def test_memory_only_cache_evicts_oldest() -> None:
+    cache = EmbeddingCache(None, max_entries=2)
+    for text in ("a", "b", "c"):
+        cache.put("model", text, [1.0])
+    assert cache.get("model", "a") is None
+    assert cache.get("model", "c") == [1.0]
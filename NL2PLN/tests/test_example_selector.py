@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+from NL2PLN.utils.common import format_example
+from NL2PLN.utils.example_selector import ExampleSelector, SelectionStats, estimate_tokens
+from NL2PLN.utils.vector_backends import Hit
+
+VECTORS = {
+    "query": [1.0, 0.0, 0.0],
+    "Max is a dog": [0.9, 0.1, 0.0],
+    "Max is a big dog": [0.9, 0.12, 0.0],
+    "Max barks at the cat": [0.6, 0.0, 0.8],
+}
+
+def fake_rag(embedded):
+    """Only the query is embedded, the candidates bring their stored vectors."""
+    def get_embedding(text):
+        embedded.append(text)
+        return VECTORS[text]
+    return SimpleNamespace(get_embedding=get_embedding)
+
+def candidate_hits():
+    return [Hit(str(i), 0.0, {"sentence": sentence, "statements": ["(Dog max)"]}, VECTORS[sentence])
+            for i, sentence in enumerate(list(VECTORS)[1:])]
+
+def test_select_prefers_diverse_examples_within_budget() -> None:
+    embedded = []
+    stats = SelectionStats()
+    hits = candidate_hits()
+
+    selector = ExampleSelector(fake_rag(embedded), token_budget=1000, diversity=0.5, stats=stats)
+    examples = selector.select("query", hits, baseline=3)
+    assert [example.splitlines()[0] for example in examples[:2]] == ["Sentence: Max is a dog",
+                                                                     "Sentence: Max barks at the cat"]
+    assert embedded == ["query"]
+
+    # Only two examples fit into the budget
+    budget = sum(estimate_tokens(example) for example in examples[:2])
+    selector = ExampleSelector(fake_rag(embedded), token_budget=budget, diversity=0.5, stats=stats)
+    assert len(selector.select("query", hits, baseline=3)) == 2
+    assert stats.selected_tokens < stats.baseline_tokens
+
+def test_baseline_examples_are_counted() -> None:
+    stats = SelectionStats()
+    hits = candidate_hits()
+    # The shell used to prompt with the top examples of two collections, not the top of the merged candidates
+    baseline = [hits[0], hits[2]]
+    ExampleSelector(fake_rag([]), stats=stats).select("query", hits, baseline=baseline)
+    assert stats.baseline_tokens == sum(estimate_tokens(format_example(hit.payload)) for hit in baseline)
+
+def test_hits_without_vectors_keep_retrieval_order() -> None:
+    hits = [hit._replace(vector=None) for hit in candidate_hits()]
+    examples = ExampleSelector(fake_rag([]), stats=SelectionStats()).select("query", hits)
+    sentences = [example.splitlines()[0].removeprefix("Sentence: ") for example in examples]
+    assert sentences == list(VECTORS)[1:]
@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+from NL2PLN.utils.hybrid_retriever import HybridRetriever, predicate_symbols, symbol_words
+from NL2PLN.utils.vector_backends import LocalBackend
+
+def test_symbol_words() -> None:
+    assert symbol_words("ProvidesHelp") == ["provid", "help"]
+    assert predicate_symbols({"statements": ["(: prf (LivesIn anna berlin))"],
+                              "type_definitions": ["(: LivesIn (-> Concept Concept Type))"]}) == {"LivesIn"}
+
+def test_hybrid_ranking_uses_words_and_symbols(tmp_path) -> None:
+    backend = LocalBackend(str(tmp_path))
+    backend.create_collection("sentences", 2)
+    # The vector ranking alone prefers the filler sentence
+    backend.upsert("sentences", [
+        ("filler", [1.0, 0.0], {"sentence": "The weather is nice", "statements": []}),
+        ("help", [0.0, 1.0], {"sentence": "Tom assists Mary", "statements": ["(: prf (ProvidesHelp tom mary))"]}),
+    ])
+    rag = SimpleNamespace(backend=backend, collection_name="sentences", get_embedding=lambda text: [1.0, 0.0])
+    retriever = HybridRetriever(rag, vector_weight=0.5)
+
+    results = retriever.search_similar("Who provides help to John?", limit=2)
+    assert [payload["sentence"] for payload in results] == ["Tom assists Mary", "The weather is nice"]
@@ -0,0 +1,65 @@
+import threading
+from NL2PLN.utils.lookahead import LookAhead
+
+class FakeDraft:
+    """Records its calls; drafts of the sentences in `blocked` wait for `release`."""
+    def __init__(self, blocked=()):
+        self.calls = []
+        self.blocked = set(blocked)
+        self.release = threading.Event()
+
+    def __call__(self, line, previous):
+        self.calls.append((line, previous))
+        if line in self.blocked:
+            self.release.wait(5)
+        return f"{line} after {','.join(previous)}"
+
+def test_drafts_use_predicted_context() -> None:
+    draft = FakeDraft()
+    lookahead = LookAhead(draft, depth=2, history=2)
+    lookahead.schedule(["b", "c", "d"], ["a"])
+    assert lookahead.take("b", ["a"]) == "b after a"
+    # c was drafted assuming b is accepted; only the last `history` sentences count
+    assert lookahead.take("c", ["x", "a", "b"]) == "c after a,b"
+    assert lookahead.pending[lookahead._key("d", ["b", "c"])].result() == "d after b,c"
+    lookahead.shutdown()
+    assert sorted(draft.calls) == [("b", ["a"]), ("c", ["a", "b"]), ("d", ["b", "c"])]
+    assert lookahead.misses == 0 and lookahead.taken == 2
+
+def test_invalidate_redrafts() -> None:
+    draft = FakeDraft()
+    lookahead = LookAhead(draft, depth=1)
+    lookahead.schedule(["b"], ["a"])
+    lookahead.pending[lookahead._key("b", ["a"])].result()
+    lookahead.invalidate()
+    assert lookahead.pending == {}
+    assert lookahead.take("b", ["a"]) == "b after a"
+    assert draft.calls == [("b", ["a"]), ("b", ["a"])]
+    assert lookahead.misses == 1 and lookahead.invalidations == 1
+    lookahead.shutdown()
+
+def test_unwanted_drafts_are_cancelled() -> None:
+    draft = FakeDraft(blocked={"b"})
+    lookahead = LookAhead(draft, depth=1)
+    lookahead.schedule(["b", "c"], ["a"])
+    queued = lookahead.pending[lookahead._key("c", ["a", "b"])]
+    # The reviewer edited b, so c is expected after a different context
+    lookahead.schedule(["b", "d"], ["a"])
+    assert queued.cancelled()
+    draft.release.set()
+    assert lookahead.take("b", ["a"]) == "b after a"
+    assert lookahead.take("d", ["a", "b"]) == "d after a,b"
+    lookahead.shutdown()
+    assert ("c", ["a", "b"]) not in draft.calls
+
+def test_missing_draft_is_drafted_on_demand() -> None:
+    draft = FakeDraft(blocked={"b"})
+    lookahead = LookAhead(draft, depth=1)
+    lookahead.schedule(["b", "c"], ["a"])
+    lookahead.pending[lookahead._key("c", ["a", "b"])].cancel()
+    assert lookahead.take("c", ["a", "b"]) == "c after a,b"
+    assert lookahead.take("z", ["a"]) == "z after a"
+    assert lookahead.misses == 2 and lookahead.ready == 0
+    draft.release.set()
+    lookahead.shutdown()
+    assert "2 drafted on demand" in lookahead.report()
@@ -0,0 +1,39 @@
+from NL2PLN.utils.pln_render import Rendered, render_pln
+
+def test_render_predicates() -> None:
+    assert render_pln("(Dog dogrel max)") == "Max is a dog"
+    assert render_pln("(Elephant elephantrel max)") == "Max is an elephant"
+    assert render_pln("(Happy happyrel max)") == "Max is happy"
+    assert render_pln("(: prf1 (Chase chase dog cat))") == "Dog chases Cat"
+    assert render_pln("(LiveIn liverel john london)") == "John lives in London"
+    assert render_pln("(GoTo gorel john home)") == "John goes to Home"
+    assert render_pln("(Carry carryrel john box)") == "John carries Box"
+    assert render_pln("(Likes likerel john mary)") == "John likes Mary"
+
+def test_render_operators() -> None:
+    assert render_pln("(Not (Happy happyrel john))") == "It is not the case that John is happy"
+    assert render_pln("(* (Dog dogrel x) (Happy happyrel x))") == "X is a dog and X is happy"
+    assert render_pln("(-> (Dog $dogrel $x) (Mammal $mrel $x))") == "If x is a dog then x is a mammal"
+    assert render_pln("(Σ (: $x Object) (* (Dog dogrel $x) (Happy happyrel $x)))") == \
+        "There is some x such that x is a dog and x is happy"
+
+def test_render_unsupported() -> None:
+    # Sum types, expressions as arguments and unbalanced input go to the LLM
+    assert render_pln("(| (Cat catrel x) (Dog dogrel x))") is None
+    assert render_pln("(Swimming swimrel (Cat catrel cat))") is None
+    assert render_pln("(Give giverel john mary book)") is None
+    assert render_pln("(Dog dogrel max") is None
+
+def test_ungrammatical_shapes_go_to_the_llm() -> None:
+    # Heads that are not verbs
+    assert render_pln("(AtTime timerel going t1)") is None
+    assert render_pln("(MarriedTo marriedrel john mary)") is None
+    assert render_pln("(BiggerThan biggerrel max tom)") is None
+    # A noun or an adjective
+    assert render_pln("(Puppy puppyrel max)") is None
+    # A sentence starting with a variable
+    assert render_pln("(Dog dogrel $x)") is None
+
+def test_rendered_results_are_marked() -> None:
+    # store_fc_results keeps template English out of the example sentences
+    assert isinstance(render_pln("(Dog dogrel max)"), Rendered)
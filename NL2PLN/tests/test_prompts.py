@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from NL2PLN.utils.common import PromptCacheStats
+from NL2PLN.utils.prompts import NL2PLN_INSTRUCTIONS, cached_prefix, nl2pln, pln2nl, prefix_hash, stable_order
+
+STABLE = ["Sentence: Max is a dog\nStatements: (Dog max)", "Sentence: Tom is a cat\nStatements: (Cat tom)"]
+
+def test_prefix_is_stable_when_retrieved_examples_change() -> None:
+    first = nl2pln("Max chases Tom", ["Sentence: a", "Sentence: b"], ["Max is a dog"], STABLE)
+    second = nl2pln("Anna helps Max", ["Sentence: c"], [], list(reversed(STABLE)) + STABLE[:1])
+    assert prefix_hash(*first) == prefix_hash(*second)
+    prefix = cached_prefix(*first)
+    assert prefix.startswith(NL2PLN_INSTRUCTIONS) and STABLE[0] in prefix
+    # The per-sentence content stays after the breakpoint
+    assert "Sentence: a" not in prefix and "Max chases Tom" not in prefix
+    assert prefix_hash(*pln2nl("(Dog max)", "", ["Sentence: a"], [], STABLE)) == \
+        prefix_hash(*pln2nl("(Cat tom)", "Is Tom a cat?", ["Sentence: c"], [], STABLE))
+    assert prefix_hash(*first) != prefix_hash(*nl2pln("Max chases Tom", [], [], STABLE[:1]))
+
+def test_stable_order_drops_duplicates_and_sorts() -> None:
+    assert stable_order(["b", "a", "b"]) == ["a", "b"]
+    assert stable_order(list(reversed(STABLE))) == STABLE
+
+def test_cache_stats_count_hits_and_tokens(capsys) -> None:
+    stats = PromptCacheStats()
+    system_msg, user_msg = nl2pln("Max chases Tom", [], [], STABLE)
+    stats.record(system_msg, user_msg, SimpleNamespace(input_tokens=40, cache_creation_input_tokens=900,
+                                                       cache_read_input_tokens=0))
+    stats.verbose = True
+    # Usage without the cache fields, or with None, counts as zero
+    stats.record(system_msg, user_msg, SimpleNamespace(input_tokens=None, cache_read_input_tokens=900))
+    stats.record(system_msg, user_msg, SimpleNamespace())
+    assert "uncached 0 tokens" in capsys.readouterr().out
+    assert (stats.calls, stats.hits, len(stats.prefixes)) == (3, 1, 1)
+    assert (stats.input_tokens, stats.cache_read_tokens, stats.cache_write_tokens) == (40, 900, 900)
+    assert stats.report().startswith("Prompt cache: 3 calls, hit rate 33.3%")
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from NL2PLN.utils.embedders import HashEmbedder
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+from NL2PLN.utils.qdrant_utils import (StreamedDump, dump_collection_stream, reembed_collection,
+                                      restore_collection_stream)
+from NL2PLN.utils.ragclass import RAG
+from NL2PLN.utils.vector_backends import LocalBackend
+
+def test_stream_dump_and_restore(tmp_path) -> None:
+    source = LocalBackend(str(tmp_path / "source"))
+    source.create_collection("sentences", 4)
+    source.upsert("sentences", [(str(i), [1.0, float(i), 0.0, 0.0], {"sentence": f"s{i}"}) for i in range(10)])
+
+    dump = str(tmp_path / "dump")
+    assert dump_collection_stream("sentences", dump, f"local:{tmp_path / 'source'}", batch_size=3, compress=True) == 10
+    assert np.load(f"{dump}/vectors-000.npy", mmap_mode="r").shape == (10, 4)
+    points = list(StreamedDump(dump))
+    assert [point["payload"]["sentence"] for point in points] == [f"s{i}" for i in range(10)]
+
+    assert restore_collection_stream("copy", dump, f"local:{tmp_path / 'target'}", batch_size=4) == 10
+    target = LocalBackend(str(tmp_path / "target"))
+    assert target.search("copy", [1.0, 9.0, 0.0, 0.0], limit=1)[0].payload == {"sentence": "s9"}
+
+def test_parallel_dump_resumes(tmp_path, monkeypatch) -> None:
+    source = LocalBackend(str(tmp_path / "source"))
+    source.create_collection("sentences", 4)
+    source.upsert("sentences", [(str(i), [1.0, float(i), 0.0, 0.0], {"sentence": f"s{i}"}) for i in range(20)])
+
+    scroll_page = LocalBackend.scroll_page
+    calls = []
+    def failing_scroll_page(self, *args, **kwargs):
+        calls.append(args)
+        if len(calls) == 4:
+            raise ConnectionError("interrupted")
+        return scroll_page(self, *args, **kwargs)
+    monkeypatch.setattr(LocalBackend, "scroll_page", failing_scroll_page)
+
+    dump = str(tmp_path / "dump")
+    url = f"local:{tmp_path / 'source'}"
+    with pytest.raises(ConnectionError):
+        dump_collection_stream("sentences", dump, url, batch_size=2, workers=3)
+    assert dump_collection_stream("sentences", dump, url, batch_size=2, resume=True, workers=3) == 20
+    points = list(StreamedDump(dump))
+    assert sorted(point["payload"]["sentence"] for point in points) == sorted(f"s{i}" for i in range(20))
+
+    assert restore_collection_stream("copy", dump, f"local:{tmp_path / 'target'}", batch_size=3, workers=4) == 20
+    assert LocalBackend(str(tmp_path / "target")).count("copy") == 20
+
+def test_reembed_swaps_alias(tmp_path) -> None:
+    url = f"local:{tmp_path}"
+    backend = LocalBackend(str(tmp_path))
+    backend.create_collection("sentences_v1", 4)
+    backend.upsert("sentences_v1", [(str(i), [1.0, float(i), 0.0, 0.0], {"sentence": f"sentence number {i}"})
+                                    for i in range(10)])
+    backend.set_alias("sentences", "sentences_v1")
+
+    with pytest.raises(ValueError):
+        reembed_collection("sentences", "sentences_v1", HashEmbedder(32), url, alias="sentences")
+    assert reembed_collection("sentences", "sentences_v2", HashEmbedder(32), url, alias="sentences",
+                              batch_size=3, workers=2) == 10
+
+    shell = LocalBackend(str(tmp_path))
+    assert shell.get_alias("sentences") == "sentences_v2"
+    assert shell.count("sentences") == 10
+    hit = shell.search("sentences", HashEmbedder(32).embed("sentence number 7"), limit=1)[0]
+    assert hit.id == "7" and hit.payload["sentence"] == "sentence number 7"
+    assert backend.count("sentences_v1") == 10
+
+def test_reembedded_collection_opens_through_alias(tmp_path) -> None:
+    url = f"local:{tmp_path}"
+    # The collection as the CLIs created it before --collection
+    old = RAG(collection_name="kb_pln", qdrant_url=url, embedder=HashEmbedder(16), embedding_cache=EmbeddingCache(None))
+    old.store_embeddings([{"sentence": f"sentence number {i}", "statements": [f"(N n{i})"]} for i in range(5)])
+
+    with pytest.raises(ValueError, match="--collection"):
+        reembed_collection("kb_pln", "kb_pln_v2", HashEmbedder(32), url, alias="kb_pln")
+    assert reembed_collection("kb_pln", "kb_pln_v2", HashEmbedder(32), url, alias="kb_examples") == 5
+
+    # What --collection kb_examples opens
+    rag = RAG(collection_name="kb_examples", qdrant_url=url, embedder=HashEmbedder(32),
+              embedding_cache=EmbeddingCache(None))
+    assert rag.search_similar("sentence number 3", limit=1)[0]["statements"] == ["(N n3)"]
+    rag.store_embedding({"sentence": "sentence number 5", "statements": ["(N n5)"]})
+    assert rag.backend.count("kb_pln_v2") == 6 and rag.backend.count("kb_pln") == 5
+    # Only the new embedder may open the alias, the old one still opens the source
+    with pytest.raises(ValueError, match="reembed"):
+        RAG(collection_name="kb_examples", qdrant_url=url, embedder=HashEmbedder(16),
+            embedding_cache=EmbeddingCache(None))
+    RAG(collection_name="kb_pln", qdrant_url=url, embedder=HashEmbedder(16), embedding_cache=EmbeddingCache(None))
@@ -0,0 +1,31 @@
+from NL2PLN.utils import query_utils
+from NL2PLN.utils.query_utils import convert_to_english_batch, parse_numbered_answers
+
+def test_parse_numbered_answers() -> None:
+    response = """Here you go:
+```
+1. John gives Mary a book.
+2) The cat swims.
+2: A second answer for 2 is ignored
+3.
+7. Out of range
+```"""
+    assert parse_numbered_answers(response, 3) == {1: "John gives Mary a book.", 2: "The cat swims."}
+    assert parse_numbered_answers("1: Max is a dog", 1) == {1: "Max is a dog"}
+
+def test_batch_falls_back_per_item(monkeypatch) -> None:
+    monkeypatch.setattr(query_utils, "create_openai_completion",
+                        lambda system_msg, user_msg: "```\n2. The cat swims.\n```")
+    single = []
+    def llm_to_english(pln, user_input, similar_examples, previous_sentences=None):
+        single.append(pln)
+        return f"single {pln}"
+    monkeypatch.setattr(query_utils, "llm_to_english", llm_to_english)
+
+    pln = ["(Give giverel john mary book)", "(Dog dogrel max)", "(Swimming swimrel (Cat catrel cat))"]
+    assert convert_to_english_batch(pln, "", []) == [
+        "single (Give giverel john mary book)",  # missing from the batch answer
+        "Max is a dog",  # rendered by the templates
+        "The cat swims.",
+    ]
+    assert single == ["(Give giverel john mary book)"]
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+from NL2PLN.utils.embedders import Embedder, HashEmbedder
+from NL2PLN.utils.ragclass import RAG, search_collections
+from NL2PLN.utils.vector_backends import LocalBackend, QdrantBackend
+
+def test_compact_removes_near_duplicates(tmp_path) -> None:
+    backend = LocalBackend(str(tmp_path))
+    rag = RAG(collection_name="sentences", backend=backend, embedding_cache=EmbeddingCache(None))
+    vector = [1.0] + [0.0] * 767
+    backend.upsert("sentences", [
+        ("a", vector, {"sentence": "Max is a dog", "statements": ["(Dog max)"]}),
+        ("b", vector, {"sentence": "max is a  dog", "statements": ["(Dog  max)"]}),
+        ("c", vector, {"sentence": "Max is a cat", "statements": ["(Cat max)"]}),
+        ("d", [0.0, 1.0] + [0.0] * 766, {"sentence": "Max is a dog", "statements": ["(Dog max)"]}),
+    ])
+    assert rag.compact(dry_run=True) == ["b"]
+    assert backend.count("sentences") == 4
+    assert rag.compact() == ["b"]
+    assert {hit.id for hit in backend.scroll("sentences")} == {"a", "c", "d"}
+
+def test_search_collections_quotas(tmp_path) -> None:
+    backend = LocalBackend(str(tmp_path))
+    cache = EmbeddingCache(None)
+    base = RAG(collection_name="base", backend=backend, embedding_cache=cache)
+    query = RAG(collection_name="query", backend=backend, embedding_cache=cache)
+    vector = [1.0] + [0.0] * 767
+    cache.put(base.embedding_model, "Is Max a dog?", vector)
+    backend.upsert("base", [(str(i), vector, {"sentence": f"base {i}"}) for i in range(5)])
+    backend.upsert("query", [("q0", vector, {"sentence": "base 0"})] +
+                   [(f"q{i}", [1.0, 0.1 * i] + [0.0] * 766, {"sentence": f"query {i}"}) for i in range(1, 4)])
+
+    similar = search_collections("Is Max a dog?", [(base, 3), (query, 2)])
+    assert len(similar) == 5
+    assert [item["sentence"] for item in similar[3:]] == ["query 1", "query 2"]
+    base_similar, query_similar = search_collections("Is Max a dog?", [(base, 3), (query, 2)], grouped=True)
+    assert base_similar + query_similar == similar
+    # The selector compares the stored vectors instead of embedding the candidates again
+    hits = search_collections("Is Max a dog?", [(base, 3), (query, 2)], with_vectors=True)
+    assert [hit.payload for hit in hits] == similar
+    assert np.allclose(hits[3].vector, np.array([1.0, 0.1] + [0.0] * 766) / np.hypot(1.0, 0.1))
+
+def test_rag_with_hash_embedder(tmp_path) -> None:
+    embedder = HashEmbedder()
+    first, second, other = embedder.embed_many(["Max is a dog", "Max is a big dog", "The weather is nice"])
+    assert embedder.embed("Max is a dog") == first
+    assert len(first) == 768
+    assert np.dot(first, second) > np.dot(first, other)
+
+    rag = RAG(collection_name="sentences", qdrant_url=f"local:{tmp_path}", embedder=embedder,
+              embedding_cache=EmbeddingCache(None))
+    rag.store_embeddings([{"sentence": "Max is a dog"}, {"sentence": "The weather is nice"}])
+    assert rag.search_similar("Is Max a dog?", limit=1) == [rag._payload({"sentence": "Max is a dog"})]
+    assert rag.embedding_cache.hits + rag.embedding_cache.misses == 0
+
+@pytest.mark.parametrize("open_store", [lambda path: LocalBackend(str(path)),
+                                        lambda path: QdrantBackend(QdrantClient(":memory:"))])
+def test_collection_keeps_its_embedder(tmp_path, open_store) -> None:
+    backend = open_store(tmp_path)
+    rag = RAG(collection_name="sentences", backend=backend, embedder=HashEmbedder(32),
+              embedding_cache=EmbeddingCache(None))
+    rag.store_embeddings([{"sentence": "Max is a dog"}])
+    assert backend.scroll_page("sentences", limit=1)[0][0].payload["embedder"] == HashEmbedder(32).name
+
+    with pytest.raises(ValueError, match="reembed"):
+        RAG(collection_name="sentences", backend=backend, embedder=HashEmbedder(64),
+            embedding_cache=EmbeddingCache(None))
+    reopened = RAG(collection_name="sentences", backend=backend, embedder=HashEmbedder(32),
+                   embedding_cache=EmbeddingCache(None))
+    assert reopened.search_similar("Max is a dog", limit=1)[0]["sentence"] == "Max is a dog"
+
+SENTENCES = [f"sentence number {i}" for i in range(5)]
+
+class FakeRemoteEmbedder(Embedder):
+    """One axis per sentence; records its requests and fails on the texts in `failing`."""
+    name = "fake-remote"
+    dimensions = len(SENTENCES)
+
+    def __init__(self, failing=()):
+        self.requests = []
+        self.failing = set(failing)
+
+    def embed_many(self, texts):
+        self.requests.append(list(texts))
+        if self.failing & set(texts):
+            raise ConnectionError("embedding service unavailable")
+        return [[float(i == SENTENCES.index(text)) for i in range(self.dimensions)] for text in texts]
+
+def remote_rag(backend, embedder):
+    return RAG(collection_name="sentences", backend=backend, embedder=embedder, batch_size=2,
+               embedding_cache=EmbeddingCache(None))
+
+def test_store_embeddings_in_batches(tmp_path) -> None:
+    embedder = FakeRemoteEmbedder()
+    rag = remote_rag(LocalBackend(str(tmp_path)), embedder)
+    ids = rag.store_embeddings([{"sentence": sentence} for sentence in SENTENCES])
+    assert embedder.requests == [SENTENCES[0:2], SENTENCES[2:4], SENTENCES[4:]]
+    assert len(set(ids)) == 5 and rag.backend.count("sentences") == 5
+    # The vectors are cached, storing again sends no request
+    rag.store_embeddings([{"sentence": SENTENCES[1]}])
+    assert len(embedder.requests) == 3
+
+def test_search_similar_many_keeps_order(tmp_path) -> None:
+    backend = LocalBackend(str(tmp_path))
+    remote_rag(backend, FakeRemoteEmbedder()).store_embeddings([{"sentence": sentence} for sentence in SENTENCES])
+    searches = []
+    search_batch = backend.search_batch
+    def counted_search_batch(name, vectors, limit):
+        searches.append(len(vectors))
+        return search_batch(name, vectors, limit)
+    backend.search_batch = counted_search_batch
+    embedder = FakeRemoteEmbedder()
+    queries = list(reversed(SENTENCES))
+    results = remote_rag(backend, embedder).search_similar_many(queries, limit=1)
+    assert [hits[0]["sentence"] for hits in results] == queries
+    assert embedder.requests == [queries[0:2], queries[2:4], queries[4:]] and searches == [2, 2, 1]
+
+def test_search_similar_many_pads_failed_batches(tmp_path, capsys) -> None:
+    backend = LocalBackend(str(tmp_path))
+    remote_rag(backend, FakeRemoteEmbedder()).store_embeddings([{"sentence": sentence} for sentence in SENTENCES])
+    embedder = FakeRemoteEmbedder(failing={SENTENCES[2]})
+    results = remote_rag(backend, embedder).search_similar_many(SENTENCES, limit=1)
+    # The first batch is answered, the failed batch and the ones after it are empty
+    assert [[hit["sentence"] for hit in hits] for hits in results] == [[SENTENCES[0]], [SENTENCES[1]], [], [], []]
+    assert len(embedder.requests) == 2
+    assert "embedding service unavailable" in capsys.readouterr().out
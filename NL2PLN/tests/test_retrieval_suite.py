@@ -0,0 +1,24 @@
+import pytest
+from NL2PLN.bench.retrieval_suite import build, compare
+from NL2PLN.utils.embedders import HashEmbedder
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+
+def test_compare_flags_regressions() -> None:
+    baseline = [{"config": "local", "limit": 5, "latency_p50_ms": 2.0, "latency_p95_ms": 4.0, "latency_p99_ms": 0.4,
+                 "qps": 500.0, "recall@5": 0.9, "mrr": 0.8}]
+    results = [{**baseline[0], "latency_p95_ms": 6.0, "latency_p99_ms": 0.8, "recall@5": 0.85}]
+    assert compare(results, baseline, 0.2, 0.01, latency_floor_ms=0.5) == [
+        "local limit 5: latency_p95_ms 4.00 -> 6.00",
+        "local limit 5: recall@5 0.900 -> 0.850",
+    ]
+    assert compare(baseline, baseline, 0.2, 0.01) == []
+
+def test_build_takes_vector_size_from_dump(tmp_path) -> None:
+    embedder = HashEmbedder(16)
+    sentences = ["the dog barks", "a cat sleeps"]
+    points = [{"id": str(i), "payload": {"sentence": s}, "vector": vector}
+              for i, (s, vector) in enumerate(zip(sentences, embedder.embed_many(sentences)))]
+    rag = build("local", points, str(tmp_path / "local"), embedder, EmbeddingCache(None))
+    assert rag.search_similar("dog barks", limit=1)[0]["sentence"] == "the dog barks"
+    with pytest.raises(ValueError, match="16-dimensional"):
+        build("local", points, str(tmp_path / "other"), HashEmbedder(32), EmbeddingCache(None))
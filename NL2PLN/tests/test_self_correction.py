@@ -0,0 +1,32 @@
+from NL2PLN.utils.common import IncrementalLogicParser
+from NL2PLN.utils.self_correction import SelfCorrection
+
+def test_errors_are_sent_back() -> None:
+    outputs = iter(["first draft", "fixed draft"])
+    requests = []
+    def completion(system_msg, messages, on_text=None):
+        requests.append(list(messages))
+        return next(outputs)
+
+    corrector = SelfCorrection(lambda txt: [] if txt == "fixed draft" else ["Symbol bob is not declared"])
+    user_msg = [{"role": "user", "content": "convert"}]
+    assert corrector.complete("system", user_msg, completion=completion) == "fixed draft"
+    assert requests[1][1] == {"role": "assistant", "content": "first draft"}
+    assert "- Symbol bob is not declared" in requests[1][2]["content"]
+    assert user_msg == [{"role": "user", "content": "convert"}]
+    assert corrector.report() == "Self-correction: 1/1 outputs failed the structural check, 1 corrected with 1 retries"
+
+def test_retry_is_parsed_from_scratch() -> None:
+    drafts = iter(["```\nType Definitions:\n(: Bob Concept)\n```\n", "```\nType Definitions:\n(: bob Concept)\n```\n"])
+    def completion(system_msg, messages, on_text=None):
+        txt = next(drafts)
+        on_text(txt)
+        return txt
+
+    sections = []
+    parser = IncrementalLogicParser(lambda name, statements: sections.append(statements))
+    corrector = SelfCorrection(lambda txt: ["Bob must be lower case"] if "Bob" in txt else [])
+    txt = corrector.complete("system", [], on_text=parser.feed, completion=completion, on_retry=parser.reset)
+    parser.close()
+    assert "bob" in txt
+    assert sections == [["(: Bob Concept)"], ["(: bob Concept)"]]
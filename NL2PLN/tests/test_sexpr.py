@@ -0,0 +1,48 @@
+import pytest
+from NL2PLN.utils.sexpr import (Expression, Number, ParseError, Span, String, Symbol, Variable, expressions, parse,
+                                render, statements)
+
+def test_parse_nodes_and_render() -> None:
+    text = '(: prf1 ; proof\n  (Says $x "a (quoted) \\"word\\"" 0.5))'
+    [node] = parse(text)
+    assert isinstance(node, Expression) and node.span == Span(0, len(text))
+    says = node.children[2]
+    assert says.children[0] == Symbol("Says", 19, 23)
+    assert says.children[1] == Variable("x", 24, 26)
+    assert isinstance(says.children[2], String) and says.children[2].value == 'a (quoted) "word"'
+    assert isinstance(says.children[3], Number) and says.children[3].value == 0.5
+    assert text[says.span.start:says.span.end] == '(Says $x "a (quoted) \\"word\\"" 0.5)'
+    assert render(node) == '(: prf1 (Says $x "a (quoted) \\"word\\"" 0.5))'
+
+def test_numbers_keep_their_text() -> None:
+    [node] = parse("(Weight max 1e3 1.50 -2)")
+    assert [child.value for child in node.children[2:]] == [1000.0, 1.5, -2]
+    assert render(node) == "(Weight max 1e3 1.50 -2)"
+
+def test_malformed_output_is_rejected() -> None:
+    with pytest.raises(ParseError, match="Unbalanced"):
+        parse("(Dog max))")
+    with pytest.raises(ParseError, match="Unterminated string"):
+        parse('(Says john "hello)')
+    with pytest.raises(ParseError, match="line 1, column 1"):
+        expressions(["(: prf", "  (Dog max)"])
+
+def test_expressions_skip_prose() -> None:
+    lines = ["Here are the statements:", "(Dog max) (Cat tom) done", "(Chases", "  max tom)"]
+    assert [render(e) for e in expressions(lines)] == ["(Dog max)", "(Cat tom)", "(Chases max tom)"]
+
+@pytest.mark.parametrize("lines", [
+    ["Statements:", "(: prf1 ; proof", "  (Chases max\ttom)) trailing", "(Dog  max)"],
+    ["( Dog ( max ) )", "(Likes(max)tom)(Cat tom)"],  # glued parentheses
+    ["(Dog max) (Cat tom) done"],  # closes before its last parenthesis
+    ['(Says john "a ) b")'],
+    ["(Weight max 1e3 1.50)", "(Dog é)"],
+])
+def test_statements_match_rendered_expressions(lines) -> None:
+    assert statements(lines) == [render(e) for e in expressions(lines)]
+
+def test_statements_raise_parse_errors() -> None:
+    with pytest.raises(ParseError, match="line 1, column 1"):
+        statements(["(: prf", "  (Dog max)"])
+    with pytest.raises(ParseError, match="Unbalanced"):
+        statements(["(Dog max))"])
@@ -0,0 +1,41 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from NL2PLN.utils.singleflight import SingleFlight
+
+def run_concurrently(flight, func, callers=4):
+    """Start `callers` identical calls and let func finish once they all wait on the first one."""
+    release = threading.Event()
+    calls = []
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return func()
+    with ThreadPoolExecutor(callers) as executor:
+        futures = [executor.submit(flight.do, "key", slow) for _ in range(callers)]
+        deadline = time.monotonic() + 5
+        while flight.deduplicated < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+    return futures, calls
+
+def test_concurrent_calls_share_the_result() -> None:
+    flight = SingleFlight("Test")
+    futures, calls = run_concurrently(flight, lambda: ["result"])
+    results = [future.result() for future in futures]
+    assert results == [["result"]] * 4 and all(result is results[0] for result in results)
+    assert len(calls) == 1
+    assert flight.report() == "Test: 3 of 4 calls shared an identical in-flight request"
+    # Nothing is cached after the call
+    assert flight.do("key", lambda: "again") == "again" and flight.in_flight == {}
+
+def test_exception_reaches_every_caller() -> None:
+    flight = SingleFlight("Test")
+    def fail():
+        raise TimeoutError("no answer")
+    futures, calls = run_concurrently(flight, fail)
+    for future in futures:
+        with pytest.raises(TimeoutError, match="no answer"):
+            future.result()
+    assert len(calls) == 1 and flight.in_flight == {}
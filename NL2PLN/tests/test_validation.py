@@ -0,0 +1,37 @@
+from NL2PLN.utils.validation import SymbolTable, check_structure
+
+OUTPUT = """```
+From Context:
+(: john Object)
+
+Type Definitions:
+(: Happy (-> Object Object Type))
+(: Chase (-> Object Object Object Type))
+
+Statements:
+(: happyrel Object)
+(: prf1 (Happy happyrel john))
+(: prf2 (-> (Dog $dogrel $dog) (Σ (: $chaserel Object) (Chase $chaserel $dog john))))
+{extra}
+```"""
+
+def test_structural_errors() -> None:
+    symbols = SymbolTable(["(: Dog (-> Object Object Type))", "(: HDkhCgnb (: mary Object))"])
+    assert symbols.arities == {"Dog": 2} and "mary" in symbols.names
+    assert check_structure(OUTPUT.format(extra=""), symbols) == []
+    # Without the KB the undeclared Dog is not reported
+    assert check_structure(OUTPUT.format(extra="(: prf3 (Happy happyrel bob))")) == []
+
+    errors = check_structure(OUTPUT.format(extra="(: prf3 (Happy happyrel john mary))\n(: prf4 (Happy $rel bob))"),
+                             symbols)
+    assert errors == [
+        "Happy is declared with 2 arguments but used with 3",
+        "Variable $rel in statement (: prf4 (Happy $rel bob)) is not bound by -> or Σ",
+        "Symbol bob is not declared",
+    ]
+    assert check_structure(OUTPUT.format(extra="(: prf3 (Happy happyrel john)"))[0].startswith("Missing 1 ')'")
+
+def test_type_definition_conflicts_with_kb() -> None:
+    symbols = SymbolTable(["(: Happy (-> Object Type))"])
+    assert check_structure(OUTPUT.format(extra=""), symbols)[0] == (
+        "Type definition (: Happy (-> Object Object Type)) conflicts with (: Happy (-> Object Type)) in the KB")
@@ -0,0 +1,78 @@
+import numpy as np
+from qdrant_client import QdrantClient
+from NL2PLN.utils.vector_backends import LocalBackend, QdrantBackend
+
+def test_local_backend_search_and_persistence(tmp_path) -> None:
+    backend = LocalBackend(str(tmp_path))
+    assert not backend.collection_exists("sentences")
+    backend.create_collection("sentences", 4)
+    backend.upsert("sentences", [
+        ("a", [1.0, 0.0, 0.0, 0.0], {"sentence": "Max is a dog"}),
+        ("b", [0.0, 2.0, 0.0, 0.0], {"sentence": "The cat sleeps"}),
+        ("c", [1.0, 1.0, 0.0, 0.0], {"sentence": "The dog chases the cat"}),
+    ])
+
+    hits = backend.search("sentences", [3.0, 0.1, 0.0, 0.0], limit=2)
+    assert [hit.payload["sentence"] for hit in hits] == ["Max is a dog", "The dog chases the cat"]
+    assert hits[0].score > hits[1].score
+
+    # Upsert of an existing id replaces it, deleted points are not returned
+    backend.upsert("sentences", [("b", [0.0, 1.0, 0.0, 0.0], {"sentence": "The cat is asleep"})])
+    backend.delete("sentences", ["a"])
+    assert backend.count("sentences") == 2
+
+    reopened = LocalBackend(str(tmp_path))
+    assert reopened.collection_exists("sentences")
+    hits = reopened.search("sentences", [0.0, 1.0, 0.0, 0.0], limit=5, with_vectors=True)
+    assert [hit.payload["sentence"] for hit in hits] == ["The cat is asleep", "The dog chases the cat"]
+    assert np.allclose(hits[0].vector, [0.0, 1.0, 0.0, 0.0])
+    assert {hit.id for hit in reopened.scroll("sentences")} == {"b", "c"}
+
+def test_local_backend_find(tmp_path) -> None:
+    backend = LocalBackend(str(tmp_path))
+    backend.create_collection("sentences", 2)
+    backend.upsert("sentences", [
+        ("a", [1.0, 0.0], {"sentence": "Max is a dog", "sentence_hash": "h1"}),
+        ("b", [0.0, 1.0], {"sentence": "The cat sleeps", "sentence_hash": "h2"}),
+    ])
+    backend.create_payload_index("sentences", "sentence_hash")
+    backend.upsert("sentences", [("c", [1.0, 1.0], {"sentence": "Max is a dog", "sentence_hash": "h1"})])
+    assert {hit.id for hit in backend.find("sentences", "sentence_hash", ["h1", "h3"])} == {"a", "c"}
+
+    # Replaced and deleted points leave the index
+    backend.upsert("sentences", [("a", [1.0, 0.0], {"sentence": "Rex is a dog", "sentence_hash": "h3"})])
+    backend.delete("sentences", ["c"])
+    assert backend.find("sentences", "sentence_hash", ["h1"]) == []
+    assert [hit.id for hit in backend.find("sentences", "sentence_hash", ["h3"])] == ["a"]
+
+    # The index is rebuilt while the payloads are loaded, before find is called
+    reopened = LocalBackend(str(tmp_path))
+    reopened.configure_collection("sentences", on_disk_payload=True)
+    assert reopened._collection("sentences").indexes["sentence_hash"] == {"h2": {1}, "h3": {0}}
+    assert [hit.id for hit in reopened.find("sentences", "sentence_hash", ["h1", "h2", "h3"])] == ["a", "b"]
+
+def test_local_backend_quantization(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 64))
+    backend = LocalBackend(str(tmp_path))
+    backend.create_collection("sentences", 64, "binary", on_disk_payload=True)
+    backend.upsert("sentences", [(str(i), vector.tolist(), {"sentence": f"s{i}"}) for i, vector in enumerate(vectors)])
+
+    # Rescoring with the float32 vectors gives exact scores for the candidates
+    hits = backend.search("sentences", vectors[7].tolist(), limit=3)
+    assert hits[0].payload == {"sentence": "s7"}
+    assert abs(hits[0].score - 1.0) < 1e-5
+    assert backend.footprint("sentences")["vectors"] == 500 * 8
+
+    backend.configure_collection("sentences", "int8", on_disk_payload=False)
+    reopened = LocalBackend(str(tmp_path))
+    assert reopened.search("sentences", vectors[42].tolist(), limit=1)[0].payload == {"sentence": "s42"}
+    assert reopened.footprint("sentences")["vectors"] == 500 * 64
+
+def test_qdrant_backend_integer_ids() -> None:
+    # Hits carry integer ids as strings, which upsert and delete convert back
+    backend = QdrantBackend(QdrantClient(":memory:"))
+    backend.create_collection("sentences", 2)
+    backend.upsert("sentences", [("1", [1.0, 0.0], {"sentence": "a"}), ("2", [0.0, 1.0], {"sentence": "b"})])
+    backend.delete("sentences", [hit.id for hit in backend.scroll("sentences") if hit.payload["sentence"] == "a"])
+    assert [hit.id for hit in backend.scroll("sentences")] == ["2"]
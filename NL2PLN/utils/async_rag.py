@@ -0,0 +1,231 @@
+import asyncio
+import uuid
+import httpx
+from NL2PLN.utils.singleflight import AsyncSingleFlight
+from NL2PLN.utils.embedding_cache import default_embedding_cache
+from NL2PLN.utils.ragclass import BaseRAG, _batches
+from NL2PLN.utils.vector_backends import open_async_backend
+
+async_embedding_flight = AsyncSingleFlight("Async embeddings")
+
+class AsyncRAG(BaseRAG):
+    """RAG with coroutine methods, for retrieval inside an event loop.
+
+    Same API and options as RAG, on httpx.AsyncClient for Ollama and the async
+    Qdrant client (stores without an async client run in worker threads). The
+    embedding cache is shared with RAG and read in worker threads, as its
+    writes are. Create it with `await AsyncRAG.create(...)`
+    or await ensure_collection yourself, and close it with `await rag.aclose()`
+    or `async with`.
+    """
+    def __init__(self, collection_name="sentences", ollama_base_url="http://127.0.0.1:11434", qdrant_url="http://truenas:9333",
+                 embedding_cache=None, batch_size=64, timeout=30, pool_connections=4, pool_maxsize=16,
+                 prefer_grpc=True, grpc_port=6334, backend=None, dedup_threshold=None,
+                 quantization=None, on_disk_payload=False, embedder=None):
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.ollama_base_url = ollama_base_url
+        # Any Embedder replaces the async Ollama client; remote ones are called in worker threads
+        self.embedder = embedder
+        self.embedding_model = embedder.name if embedder else "nomic-embed-text"
+        self.dedup_threshold = dedup_threshold
+        self.quantization = quantization
+        self.on_disk_payload = on_disk_payload
+        self.duplicates = 0
+        self.embedding_cache = embedding_cache or default_embedding_cache()
+        # The same pool sizes as the requests adapter of RAG: pool_maxsize kept-alive connections per host
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_connections * pool_maxsize, max_keepalive_connections=pool_maxsize)
+        )
+        self.backend = backend or open_async_backend(qdrant_url, prefer_grpc, grpc_port, timeout)
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        rag = cls(*args, **kwargs)
+        await rag.ensure_collection()
+        return rag
+
+    async def aclose(self):
+        await self.client.aclose()
+        await self.backend.close()
+
+    async def __aenter__(self):
+        await self.ensure_collection()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    timeout_error = httpx.TimeoutException
+
+    async def get_embedding(self, text):
+        """
+        Get the embedding for a given text using Ollama's API.
+        Embeddings are cached, and concurrent requests for the same text share one API call.
+        """
+        if self.embedder is not None and not self.embedder.remote:
+            return self.embedder.embed(text)
+        embedding = await asyncio.to_thread(self.embedding_cache.get, self.embedding_model, text)
+        if embedding is None:
+            embedding = await async_embedding_flight.do((self.ollama_base_url, self.embedding_model, text),
+                                                        lambda: self._request_embedding(text))
+            await asyncio.to_thread(self.embedding_cache.put, self.embedding_model, text, embedding)
+        return embedding
+
+    async def _request_embedding(self, text):
+        if self.embedder is not None:
+            return await asyncio.to_thread(self.embedder.embed, text)
+        try:
+            response = await self.client.post(
+                f"{self.ollama_base_url}/api/embeddings",
+                json={"model": self.embedding_model, "prompt": text}
+            )
+            response.raise_for_status()
+            return response.json()['embedding']
+        except httpx.TimeoutException:
+            print("Timeout occurred while getting embedding from Ollama API")
+            raise
+        except httpx.HTTPError as e:
+            print(f"Error occurred while getting embedding: {str(e)}")
+            raise
+
+    async def get_embeddings(self, texts, batch_size=None):
+        """
+        Get the embeddings for several texts, sending the uncached ones to
+        Ollama's multi-input embed endpoint in batches of batch_size.
+        """
+        batch_size = batch_size or self.batch_size
+        if self.embedder is not None and not self.embedder.remote:
+            return self.embedder.embed_many(texts)
+        found, missing = await asyncio.to_thread(self._cached_embeddings, texts)
+        batches = _batches(missing, batch_size)
+        for batch, embeddings in zip(batches, await asyncio.gather(*map(self._request_embeddings, batches))):
+            await asyncio.to_thread(self._cache_embeddings, batch, embeddings, found)
+        return [found[text] for text in texts]
+
+    async def _request_embeddings(self, texts):
+        if self.embedder is not None:
+            return await asyncio.to_thread(self.embedder.embed_many, texts)
+        try:
+            response = await self.client.post(
+                f"{self.ollama_base_url}/api/embed",
+                json={"model": self.embedding_model, "input": texts},
+                timeout=self.timeout + len(texts)
+            )
+            response.raise_for_status()
+            return response.json()['embeddings']
+        except httpx.TimeoutException:
+            print("Timeout occurred while getting embeddings from Ollama API")
+            raise
+        except httpx.HTTPError as e:
+            print(f"Error occurred while getting embeddings: {str(e)}")
+            raise
+
+    async def store_embedding(self, data):
+        """
+        Store the embedding of a JSON object in the vector store.
+        Returns the id of the new point.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Input must be a dictionary (JSON object)")
+
+        embedding = await self.get_embedding(self.embedding_text(data))
+
+        if self.dedup_threshold is not None:
+            duplicate = self._duplicate(data, await self.backend.search(self.collection_name, embedding, 5))
+            if duplicate is not None:
+                self.duplicates += 1
+                return duplicate
+
+        point_id = str(uuid.uuid4())
+        await self.backend.upsert(self.collection_name, [(point_id, embedding, self._payload(data))])
+        return point_id
+
+    async def store_embeddings(self, data_list, batch_size=None):
+        """
+        Store several JSON objects, embedding them in batches and writing
+        each batch of points with a single upsert. Returns the ids of the new points
+        (of the existing points for items skipped as duplicates).
+        """
+        if not all(isinstance(data, dict) for data in data_list):
+            raise ValueError("Input must be a list of dictionaries (JSON objects)")
+
+        batch_size = batch_size or self.batch_size
+        point_ids = []
+        for batch in _batches(data_list, batch_size):
+            embeddings = await self.get_embeddings([self.embedding_text(data) for data in batch], batch_size)
+            ids, points = self._points(batch, embeddings)
+            if self.dedup_threshold is not None:
+                existing = await self.backend.search_batch(self.collection_name, embeddings, 5)
+                points = self._without_duplicates(batch, ids, points, existing)
+            if points:
+                await self.backend.upsert(self.collection_name, points)
+            point_ids.extend(ids)
+        return point_ids
+
+    async def ensure_collection(self):
+        """
+        Ensure the collection exists in the vector store.
+
+        Raises:
+            ValueError: if the collection is embedded with another embedder
+        """
+        if not await self.backend.collection_exists(self.collection_name):
+            # Remote embedders may ask the model for their vector size
+            dimensions = await asyncio.to_thread(lambda: self.embedder.dimensions) if self.embedder else 768
+            await self.backend.create_collection(self.collection_name, dimensions, self.quantization,
+                                                 self.on_disk_payload)
+            print(f"Created '{self.collection_name}' collection in {type(self.backend).__name__}")
+        else:
+            self._check_embedder((await self.backend.scroll_page(self.collection_name, limit=1))[0])
+        await self.backend.create_payload_index(self.collection_name, 'sentence_hash')
+
+    async def search_similar(self, sentence, limit=3):
+        try:
+            query_vector = await self.get_embedding(sentence)
+            search_result = await self.backend.search(self.collection_name, query_vector, limit)
+            return [hit.payload for hit in search_result]
+        except Exception as e:
+            self._report_search_error(e)
+            return []
+
+    async def search_similar_many(self, sentences, limit=3, batch_size=None):
+        """
+        Search similar items for several sentences, with batched embedding
+        and one batch search per batch of sentences.
+        """
+        batch_size = batch_size or self.batch_size
+        results = []
+        try:
+            for batch in _batches(sentences, batch_size):
+                search_results = await self.backend.search_batch(
+                    self.collection_name, await self.get_embeddings(batch, batch_size), limit
+                )
+                results.extend([hit.payload for hit in hits] for hits in search_results)
+            return results
+        except Exception as e:
+            self._report_search_error(e)
+        return results + [[] for _ in sentences[len(results):]]
+
+    async def search_exact(self, sentence):
+        """
+        Search for an exact match of the given sentence in the vector store,
+        ignoring case and whitespace. Needs no embedding.
+        """
+        return (await self.search_exact_many([sentence]))[0]
+
+    async def search_exact_many(self, sentences, batch_size=1024):
+        """
+        Look up many sentences at once, e.g. to skip already stored ones before ingestion.
+        Returns the stored payload or None for each sentence.
+        """
+        hashes, batches = self._hash_batches(sentences, batch_size)
+        hits = []
+        try:
+            for batch in batches:
+                hits.extend(await self.backend.find(self.collection_name, 'sentence_hash', batch))
+        except Exception as e:
+            self._report_search_error(e)
+        return self._exact_matches(hashes, hits)
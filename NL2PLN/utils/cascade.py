@@ -0,0 +1,42 @@
+from collections import Counter
+from typing import Callable
+from NL2PLN.utils.common import create_openai_completion
+from NL2PLN.utils.validation import check_logic_output
+
+DEFAULT_MODELS = ["claude-3-5-haiku-20241022", "claude-3-5-sonnet-20241022"]
+
+class ModelCascade:
+    """Tries the models in order and escalates only when the output fails validation.
+
+    The output of the last model is returned even if it fails, the human review
+    still sees it. Attempts and acceptances are counted per model.
+    """
+    def __init__(self, models: list[str] = DEFAULT_MODELS, validate: Callable[[str], list[str]] = check_logic_output):
+        self.models = models
+        self.validate = validate
+        self.attempts = Counter()
+        self.accepted = Counter()
+
+    def complete(self, system_msg, user_msg, on_text: Callable[[str], None] | None = None) -> str:
+        for i, model in enumerate(self.models):
+            last = i == len(self.models) - 1
+            # Only the last tier is streamed, earlier tiers may still be rejected
+            txt = create_openai_completion(system_msg, user_msg, model=model, on_text=on_text if last else None)
+            self.attempts[model] += 1
+            errors = self.validate(txt)
+            if not errors:
+                self.accepted[model] += 1
+                if on_text and not last:
+                    on_text(txt)
+                return txt
+            if not last:
+                print(f"{model} output failed validation, escalating to {self.models[i + 1]}: {'; '.join(errors)}")
+        return txt
+
+    def report(self) -> str:
+        lines = ["Model cascade acceptance:"]
+        for model in self.models:
+            attempts = self.attempts[model]
+            rate = self.accepted[model] / attempts if attempts else 0.0
+            lines.append(f"  {model}: {self.accepted[model]}/{attempts} accepted ({rate:.1%})")
+        return '\n'.join(lines)
@@ -1,11 +1,17 @@
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional
 import anthropic
 import os
+import json
 import re
 import time
+import threading
 import tempfile
 import shutil
+from itertools import islice
 from NL2PLN.utils.ragclass import RAG
+from NL2PLN.utils.prompts import cached_prefix, prefix_hash
+from NL2PLN.utils.singleflight import SingleFlight
+from NL2PLN.utils.sexpr import Expression, expressions, statements
 
 # Initialize Anthropic client
 client = anthropic.Anthropic(
@@ -13,34 +19,18 @@ client = anthropic.Anthropic(
 )
 
 def parse_lisp_statement(lines: list[str]) -> list[str]:
-    """Parse multi-line Lisp-like statements and clean up trailing content after final parenthesis"""
-    result = []
-    current_statement = None
-    
-    for line in lines:
-        line = line.strip()
-        if not line or not line.startswith('('):
-            continue
-            
-        if current_statement is None:
-            current_statement = line
-        else:
-            current_statement = current_statement + ' ' + line
-            
-        if current_statement.count('(') <= current_statement.count(')'):
-            # Find the last closing parenthesis and trim anything after it
-            last_paren_idx = current_statement.rindex(')')
-            current_statement = current_statement[:last_paren_idx + 1]
-            result.append(current_statement)
-            current_statement = None
-            
-    if current_statement is not None:
-        result.append(current_statement)
-        
-    return result
+    """
+    Parse multi-line Lisp-like statements into their canonical one-line form,
+    dropping comments and trailing content after the final parenthesis.
 
+    Raises:
+        ParseError: for unbalanced parentheses or unterminated strings
+    """
+    return statements(lines)
 
-def extract_logic(response: str) -> dict[str, list[str]] | str | None:
+
+def _section_lines(response: str) -> dict[str, list[str]] | str | None:
+    """The lines of each section of an LLM response in the nl2pln format, see extract_expressions."""
     match = re.search(r'```(.*?)```', response, re.DOTALL)
     if not match:
         return None
@@ -88,20 +78,124 @@ def extract_logic(response: str) -> dict[str, list[str]] | str | None:
     if not statements and not questions:
         return None
     
-    # Parse all sections using the Lisp statement parser
-    parsed_context = parse_lisp_statement(from_context)
-    parsed_types = parse_lisp_statement(type_definitions)
-    parsed_statements = parse_lisp_statement(statements)
-    parsed_questions = parse_lisp_statement(questions)
-        
     return {
-        "from_context": parsed_context,
-        "type_definitions": parsed_types,
-        "statements": parsed_statements,
-        "questions": parsed_questions
+        "from_context": from_context,
+        "type_definitions": type_definitions,
+        "statements": statements,
+        "questions": questions
     }
 
-def process_file(file_path: str, process_sentence_func: callable, skip_lines: int = 0, limit_lines: int | None = None) -> None:
+def extract_expressions(response: str) -> dict[str, list[Expression]] | str | None:
+    """
+    Read the sections of an LLM response in the nl2pln format as parsed expressions.
+    Returns None without a code block with statements or questions, "Performative" for performatives.
+
+    Raises:
+        ParseError: if a section contains a malformed s-expression
+    """
+    sections = _section_lines(response)
+    if not isinstance(sections, dict):
+        return sections
+    return {name: expressions(lines) for name, lines in sections.items()}
+
+def extract_logic(response: str) -> dict[str, list[str]] | str | None:
+    """
+    Like extract_expressions, with every statement in its canonical one-line form.
+    Only the text is built, the expressions are left to validation.
+
+    Raises:
+        ParseError: if a section contains a malformed s-expression
+    """
+    sections = _section_lines(response)
+    if not isinstance(sections, dict):
+        return sections
+    return {name: parse_lisp_statement(lines) for name, lines in sections.items()}
+
+def format_example(item: dict) -> str:
+    """Render a stored RAG payload as an example for the nl2pln prompt."""
+    from_context = '\n'.join(item.get('from_context', []))
+    type_definitions = '\n'.join(item.get('type_definitions', []))
+    statements = '\n'.join(item.get('statements', []))
+    return (f"Sentence: {item['sentence']}\nFrom Context:\n{from_context}\n"
+            f"Type Definitions:\n{type_definitions}\nStatements:\n{statements}")
+
+class IncrementalLogicParser:
+    """Parses a streamed LLM response in the format read by extract_logic.
+
+    Feed the text chunk by chunk. on_section(name, statements) is called for every
+    section as soon as it is complete, i.e. when the next section header or the end
+    of the code block arrives, with the statements parsed by parse_lisp_statement.
+    Sections with malformed statements are not reported; their errors are kept in errors.
+    """
+    HEADERS = {
+        'from context:': 'from_context',
+        'type definitions:': 'type_definitions',
+        'statements:': 'statements',
+        'questions:': 'questions',
+    }
+
+    def __init__(self, on_section: Callable[[str, list[str]], None]):
+        self.on_section = on_section
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard the parsed state, e.g. before a corrected response is streamed."""
+        self.pending = ''
+        self.state = 'before'  # before, inside or after the code block
+        self.section = None
+        self.lines = []
+        self.errors = []
+
+    def feed(self, chunk: str) -> None:
+        *complete, self.pending = (self.pending + chunk).split('\n')
+        for line in complete:
+            self._line(line)
+
+    def close(self) -> None:
+        if self.pending:
+            self._line(self.pending)
+            self.pending = ''
+        self._end_section()
+
+    def _line(self, line: str) -> None:
+        if self.state == 'after':
+            return
+        if self.state == 'before':
+            if '```' not in line:
+                return
+            self.state = 'inside'
+            line = line.split('```', 1)[1]
+        if '```' in line:
+            line = line.split('```', 1)[0]
+            self.state = 'after'
+        line = line.strip()
+        header = next((name for prefix, name in self.HEADERS.items() if line.lower().startswith(prefix)), None)
+        if header:
+            self._end_section()
+            self.section = header
+        elif line and self.section:
+            self.lines.append(line)
+        if self.state == 'after':
+            self._end_section()
+
+    def _end_section(self) -> None:
+        if self.section:
+            try:
+                statements = parse_lisp_statement(self.lines)
+            except ValueError as e:
+                self.errors.append(f"{self.section}: {e}")
+            else:
+                self.on_section(self.section, statements)
+        self.section = None
+        self.lines = []
+
+def process_file(file_path: str, process_sentence_func: callable, skip_lines: int = 0, limit_lines: int | None = None,
+                 lookahead_func: Callable[[Iterable[str]], None] | None = None) -> None:
+    """Run process_sentence_func on every non-empty line, removing processed lines from a working copy.
+
+    If given, lookahead_func is called before each line with that line followed by all
+    remaining non-empty lines, so upcoming work can be started early.
+    """
     # Create a temporary file
     temp_fd, temp_path = tempfile.mkstemp(text=True)
     os.close(temp_fd)
@@ -117,6 +211,9 @@ def process_file(file_path: str, process_sentence_func: callable, skip_lines: in
             for i, line in enumerate(lines[skip_lines:end]):
                 if not line.strip():
                     continue
+
+                if lookahead_func:
+                    lookahead_func(l.strip() for l in islice(lines, i+skip_lines, end) if l.strip())
                     
                 if not process_sentence_func(line.strip(), i):
                     break
@@ -130,19 +227,92 @@ def process_file(file_path: str, process_sentence_func: callable, skip_lines: in
         if os.path.exists(temp_path):
             os.unlink(temp_path)
 
-def create_openai_completion(system_msg, user_msg, model: str = "claude-3-5-sonnet-20241022", max_retries: int = 3) -> str:
+class PromptCacheStats:
+    """Collects prompt cache usage over a run.
+
+    A call counts as a hit when the API reports tokens read from the cache.
+    Set `verbose` to print one line per call as well.
+    """
+    def __init__(self):
+        self.verbose = False
+        self.calls = 0
+        self.hits = 0
+        self.prefix_chars = 0
+        self.prefixes = set()
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.lock = threading.Lock()  # look-ahead drafts record from worker threads
+
+    def record(self, system_msg, user_msg, usage) -> None:
+        prefix = cached_prefix(system_msg, user_msg)
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        uncached = getattr(usage, "input_tokens", 0) or 0
+        digest = prefix_hash(system_msg, user_msg)
+        with self.lock:
+            self.calls += 1
+            self.hits += cache_read > 0
+            self.prefix_chars += len(prefix)
+            self.prefixes.add(digest)
+            self.input_tokens += uncached
+            self.cache_read_tokens += cache_read
+            self.cache_write_tokens += cache_write
+        if self.verbose:
+            print(f"Prompt cache: prefix {len(prefix)} chars ({digest}), "
+                  f"read {cache_read} / written {cache_write} / uncached {uncached} tokens")
+
+    def report(self) -> str:
+        if not self.calls:
+            return "Prompt cache: no LLM calls"
+        return (f"Prompt cache: {self.calls} calls, hit rate {self.hits / self.calls:.1%}, "
+                f"avg cacheable prefix {self.prefix_chars // self.calls} chars, "
+                f"{len(self.prefixes)} distinct prefixes, "
+                f"tokens read {self.cache_read_tokens} / written {self.cache_write_tokens} / "
+                f"uncached {self.input_tokens}")
+
+prompt_cache_stats = PromptCacheStats()
+completion_flight = SingleFlight("LLM completions")
+
+def create_openai_completion(system_msg, user_msg, model: str = "claude-3-5-sonnet-20241022", max_retries: int = 3,
+                             on_text: Callable[[str], None] | None = None) -> str:
+    """Get a completion from the LLM.
+
+    If on_text is given the response is streamed and on_text is called with every
+    chunk of text as it arrives. The full text is returned either way.
+    Concurrent identical non-streamed requests share a single API call.
+    """
+    if on_text is not None:
+        return _create_completion(system_msg, user_msg, model, max_retries, on_text)
+    key = json.dumps([model, system_msg, user_msg], sort_keys=True, ensure_ascii=False)
+    return completion_flight.do(key, lambda: _create_completion(system_msg, user_msg, model, max_retries))
+
+def _create_completion(system_msg, user_msg, model: str, max_retries: int,
+                       on_text: Callable[[str], None] | None = None) -> str:
     # Convert message format for Anthropic
     retry_count = 0
     base_delay = 1  # Start with 1 second delay
 
     while True:
         try:
-            response = client.beta.prompt_caching.messages.create(
-                model=model,
-                max_tokens=1024,
-                system=system_msg,
-                messages=user_msg,
-            )
+            if on_text is None:
+                response = client.beta.prompt_caching.messages.create(
+                    model=model,
+                    max_tokens=1024,
+                    system=system_msg,
+                    messages=user_msg,
+                )
+            else:
+                with client.beta.prompt_caching.messages.stream(
+                    model=model,
+                    max_tokens=1024,
+                    system=system_msg,
+                    messages=user_msg,
+                ) as stream:
+                    for text in stream.text_stream:
+                        on_text(text)
+                    response = stream.get_final_message()
+            prompt_cache_stats.record(system_msg, user_msg, response.usage)
             return response.content[0].text
 
         except anthropic.APIStatusError as e:
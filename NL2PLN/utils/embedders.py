@@ -0,0 +1,120 @@
+import re
+import zlib
+import numpy as np
+from requests.exceptions import RequestException, Timeout
+
+class Embedder:
+    """Turns texts into vectors for RAG.
+
+    name identifies the model in the embedding cache. Embedders with remote=True are
+    services: RAG caches their vectors and coalesces identical concurrent requests.
+    """
+    name = ""
+    dimensions = 768
+    remote = True
+
+    def embed(self, text: str) -> list[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
+
+class OllamaEmbedder(Embedder):
+    """Ollama's embedding API, on a shared keep-alive session.
+
+    Without dimensions, the vector size is asked from the model on first use.
+    """
+    def __init__(self, base_url="http://127.0.0.1:11434", model="nomic-embed-text", session=None, timeout=30,
+                 dimensions=None):
+        self.base_url = base_url
+        self.name = model
+        self.session = session
+        self.timeout = timeout
+        self._dimensions = dimensions
+
+    @property
+    def dimensions(self):
+        if self._dimensions is None:
+            self._dimensions = len(self.embed("dimensions"))
+        return self._dimensions
+
+    def embed(self, text):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.name, "prompt": text},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()['embedding']
+        except Timeout:
+            print("Timeout occurred while getting embedding from Ollama API")
+            raise
+        except RequestException as e:
+            print(f"Error occurred while getting embedding: {str(e)}")
+            raise
+
+    def embed_many(self, texts):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.name, "input": texts},
+                timeout=self.timeout + len(texts)
+            )
+            response.raise_for_status()
+            return response.json()['embeddings']
+        except Timeout:
+            print("Timeout occurred while getting embeddings from Ollama API")
+            raise
+        except RequestException as e:
+            print(f"Error occurred while getting embeddings: {str(e)}")
+            raise
+
+
+class HashEmbedder(Embedder):
+    """Deterministic offline embedder for tests and load testing.
+
+    Words and character n-grams of the lower-cased text are hashed (CRC32, so vectors
+    are the same in every process) into signed buckets of a normalized vector. Texts
+    sharing words or word parts get similar vectors; there is no semantics beyond that.
+    """
+    remote = False
+
+    def __init__(self, dimensions=768, ngram_sizes=(3, 4)):
+        self.dimensions = dimensions
+        self.ngram_sizes = ngram_sizes
+        self.name = f"hash-{dimensions}-{'-'.join(map(str, ngram_sizes))}"
+
+    def features(self, text: str) -> list[str]:
+        words = re.findall(r"\w+", text.lower())
+        grams = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.ngram_sizes:
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return grams
+
+    def embed_many(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.array([zlib.crc32(gram.encode()) for gram in self.features(text)], dtype=np.uint32)
+            if not len(hashes):
+                continue
+            # Low bits pick the bucket, the top bit the sign
+            signs = np.where(hashes >> np.uint32(31), -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dimensions, signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms > 0, norms, 1.0)).tolist()
+
+
+def open_embedder(spec: str, ollama_base_url="http://127.0.0.1:11434", session=None, timeout=30) -> Embedder:
+    """Embedder for a --embedder value: ollama[:<model>] or hash[:<dimensions>]."""
+    kind, _, argument = spec.partition(":")
+    if kind == "ollama":
+        if not argument:
+            return OllamaEmbedder(ollama_base_url, "nomic-embed-text", session, timeout, 768)
+        return OllamaEmbedder(ollama_base_url, argument, session, timeout)
+    if kind == "hash":
+        return HashEmbedder(int(argument) if argument else 768)
+    raise ValueError(f"Unknown embedder '{spec}', expected ollama[:<model>] or hash[:<dimensions>]")
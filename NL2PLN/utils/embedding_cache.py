@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "nl2pln", "embeddings.sqlite3")
+
+class EmbeddingCache:
+    """Embedding cache with an in-memory LRU on top of an SQLite store on disk.
+
+    Entries are keyed by model name and the SHA-256 of the text, so every distinct
+    text is embedded once per model, across RAG instances and across runs.
+    With path=None only the in-memory LRU is used.
+    """
+    def __init__(self, path: str | None = DEFAULT_PATH, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.memory: OrderedDict[str, list[float]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self.db.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return f"{model}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, model: str, text: str) -> list[float] | None:
+        key = self.key(model, text)
+        with self.lock:
+            vector = self.memory.get(key)
+            if vector is None and self.db is not None:
+                row = self.db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row:
+                    vector = array('d', row[0]).tolist()
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, vector)
+            return vector
+
+    def put(self, model: str, text: str, vector: list[float]) -> None:
+        key = self.key(model, text)
+        with self.lock:
+            self._remember(key, list(vector))
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                (key, array('d', vector).tobytes()))
+                self.db.commit()
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        return f"Embedding cache: {self.hits}/{total} lookups served from cache"
+
+_default_cache = None
+
+def default_embedding_cache() -> EmbeddingCache:
+    """The cache shared by all RAG instances, stored at $NL2PLN_EMBEDDING_CACHE or ~/.cache/nl2pln."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache(os.environ.get("NL2PLN_EMBEDDING_CACHE", DEFAULT_PATH))
+    return _default_cache
@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+from NL2PLN.utils.common import format_example
+from NL2PLN.utils.vector_backends import Hit
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token for English and PLN."""
+    return len(text) // 4 + 1
+
+class SelectionStats:
+    """Compares the example tokens of selected prompts with the plain top-k examples they replace."""
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.prompts = 0
+        self.baseline_tokens = 0
+        self.selected_tokens = 0
+
+    def record(self, baseline: int, selected: int) -> None:
+        with self.lock:
+            self.prompts += 1
+            self.baseline_tokens += baseline
+            self.selected_tokens += selected
+        if self.verbose:
+            print(f"Example tokens: {selected} instead of {baseline}")
+
+    def report(self) -> str:
+        saved = 1 - self.selected_tokens / self.baseline_tokens if self.baseline_tokens else 0.0
+        return (f"Example selection: {self.selected_tokens} instead of {self.baseline_tokens} example tokens "
+                f"over {self.prompts} prompts ({saved:.1%} smaller)")
+
+selection_stats = SelectionStats()
+
+class ExampleSelector:
+    """Chooses prompt examples from over-fetched retrieval candidates.
+
+    Candidates are ordered by maximal marginal relevance: each next example is the
+    one with the best trade-off between similarity to the query and dissimilarity
+    to the examples already chosen (diversity=0 is plain relevance order). Examples
+    are then packed in that order into token_budget, skipping those that no longer fit.
+
+    Similarities are cosines of the query embedding, which the embedding cache has
+    from the retrieval, and of the vectors stored with the retrieved hits.
+    """
+    def __init__(self, rag, token_budget=1200, candidates=15, max_examples=8, diversity=0.3, stats=selection_stats):
+        self.rag = rag
+        self.token_budget = token_budget
+        self.candidates = candidates
+        self.max_examples = max_examples
+        self.diversity = diversity
+        self.stats = stats
+
+    def _mmr_order(self, query: str, hits: list[Hit]) -> list[int]:
+        vectors = np.asarray([self.rag.get_embedding(query)] + [hit.vector for hit in hits], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        relevance = vectors[1:] @ vectors[0]
+        similarity = vectors[1:] @ vectors[1:].T
+        order = []
+        redundancy = np.zeros(len(hits), dtype=np.float32)
+        remaining = list(range(len(hits)))
+        while remaining:
+            scores = (1 - self.diversity) * relevance[remaining] - self.diversity * redundancy[remaining]
+            best = remaining.pop(int(np.argmax(scores)))
+            order.append(best)
+            redundancy = np.maximum(redundancy, similarity[best])
+        return order
+
+    def select(self, query: str, hits: list[Hit], baseline: int | list[Hit] = 5,
+               format_func=format_example) -> list[str]:
+        """
+        Formatted examples for query, chosen from hits in retrieval order, as returned
+        by searches with_vectors. baseline is the hits the prompt used before, or
+        their number at the top of hits, for the statistics.
+        """
+        hits = [hit for hit in hits if 'sentence' in hit.payload]
+        examples = [format_func(hit.payload) for hit in hits]
+        tokens = [estimate_tokens(example) for example in examples]
+        if not hits:
+            return []
+        try:
+            order = self._mmr_order(query, hits)
+        except Exception as e:
+            print(f"Could not compare examples, using retrieval order: {str(e)}")
+            order = list(range(len(hits)))
+
+        selected = []
+        used = 0
+        for i in order:
+            if len(selected) >= self.max_examples:
+                break
+            if used + tokens[i] <= self.token_budget:
+                selected.append(i)
+                used += tokens[i]
+        if isinstance(baseline, int):
+            baseline_tokens = sum(tokens[:baseline])
+        else:
+            baseline_tokens = sum(estimate_tokens(format_func(hit.payload)) for hit in baseline
+                                  if 'sentence' in hit.payload)
+        self.stats.record(baseline_tokens, used)
+        return [examples[i] for i in selected]
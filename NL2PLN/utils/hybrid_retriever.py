@@ -0,0 +1,143 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+STOPWORDS = {"a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "and", "or", "in", "on", "at",
+             "it", "this", "that", "with", "for", "as", "by", "he", "she", "they", "his", "her", "their"}
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def words(text: str) -> list[str]:
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+def predicate_symbols(payload: dict) -> set[str]:
+    """Predicate names applied or declared in the stored statements and type definitions."""
+    text = '\n'.join(payload.get("statements", []) + payload.get("type_definitions", []) + [payload.get("pln", "")])
+    applied = re.findall(r"\(\s*([A-Z][A-Za-z0-9_]*)", text)
+    declared = re.findall(r"\(:\s*([A-Z][A-Za-z0-9_]*)", text)
+    return set(applied) | set(declared)
+
+def symbol_words(symbol: str) -> list[str]:
+    """ProvidesHelp -> provid, help"""
+    return [_stem(part.lower()) for part in re.findall(r"[A-Z][a-z0-9]*|[a-z0-9]+", symbol)]
+
+class HybridRetriever:
+    """Retrieval that fuses vector similarity with word and predicate-symbol overlap.
+
+    Keeps two inverted indexes over the collection of a RAG: one over the words of
+    the stored sentences and one over the predicate symbols in their statements and
+    type definitions. A query is matched against the symbols through the words the
+    symbols are made of (ProvidesHelp matches "provides help"); callers that already
+    know relevant predicates can pass them as `symbols`. The vector, word (BM25) and
+    symbol rankings are combined with weighted reciprocal rank fusion.
+
+    The indexes are built by scrolling the collection once and kept up to date by
+    store_embedding/store_embeddings. All other attributes are those of the RAG.
+    """
+    def __init__(self, rag, vector_weight=1.0, word_weight=1.0, symbol_weight=1.0, candidates=50, rrf_k=60):
+        self.rag = rag
+        self.vector_weight = vector_weight
+        self.word_weight = word_weight
+        self.symbol_weight = symbol_weight
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.lock = threading.Lock()
+        self.payloads: dict[str, dict] = {}
+        self.doc_terms: dict[str, Counter] = {}
+        self.doc_lengths: dict[str, int] = {}
+        self.word_index: dict[str, set[str]] = defaultdict(set)
+        self.symbol_index: dict[str, set[str]] = defaultdict(set)
+        self.symbol_parts: dict[str, list[str]] = {}
+        self.part_index: dict[str, set[str]] = defaultdict(set)
+        self.total_length = 0
+        for hit in rag.backend.scroll(rag.collection_name):
+            self.add(hit.id, hit.payload)
+
+    def __getattr__(self, name):
+        return getattr(self.rag, name)
+
+    def add(self, point_id: str, payload: dict) -> None:
+        terms = Counter(words(payload.get("sentence", "")))
+        with self.lock:
+            if point_id in self.payloads:
+                return
+            self.payloads[point_id] = payload
+            self.doc_terms[point_id] = terms
+            self.doc_lengths[point_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[point_id]
+            for term in terms:
+                self.word_index[term].add(point_id)
+            for symbol in predicate_symbols(payload):
+                self.symbol_index[symbol].add(point_id)
+                if symbol not in self.symbol_parts:
+                    self.symbol_parts[symbol] = symbol_words(symbol)
+                    for part in self.symbol_parts[symbol]:
+                        self.part_index[part].add(symbol)
+
+    def store_embedding(self, data):
+        point_id = self.rag.store_embedding(data)
+        self.add(point_id, data)
+        return point_id
+
+    def store_embeddings(self, data_list, batch_size=None):
+        point_ids = self.rag.store_embeddings(data_list, batch_size)
+        for point_id, data in zip(point_ids, data_list):
+            self.add(point_id, data)
+        return point_ids
+
+    def _word_ranking(self, query_terms: list[str]) -> list[str]:
+        # BM25 with k1=1.2, b=0.75
+        n = len(self.doc_terms)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1.0
+        scores = Counter()
+        for term in set(query_terms):
+            postings = self.word_index.get(term, ())
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for point_id in postings:
+                tf = self.doc_terms[point_id][term]
+                length = self.doc_lengths[point_id]
+                scores[point_id] += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / avg_length))
+        return [point_id for point_id, _ in scores.most_common(self.candidates)]
+
+    def _symbol_ranking(self, query_terms: list[str], symbols: list[str]) -> list[str]:
+        query = set(query_terms)
+        scores = Counter()
+        for symbol in symbols:
+            for point_id in self.symbol_index.get(symbol, ()):
+                scores[point_id] += 2.0
+        matched = set().union(*(self.part_index.get(term, set()) for term in query))
+        for symbol in matched:
+            parts = self.symbol_parts[symbol]
+            overlap = sum(part in query for part in parts) / len(parts)
+            for point_id in self.symbol_index[symbol]:
+                scores[point_id] += overlap
+        return [point_id for point_id, _ in scores.most_common(self.candidates)]
+
+    def search_similar(self, sentence, limit=3, symbols=None):
+        try:
+            vector_hits = self.rag.backend.search(self.rag.collection_name, self.rag.get_embedding(sentence),
+                                                  self.candidates)
+        except Exception as e:
+            print(f"Vector search failed, using lexical ranking only: {str(e)}")
+            vector_hits = []
+        query_terms = words(sentence)
+        payloads = {hit.id: hit.payload for hit in vector_hits}
+        fused = Counter()
+        with self.lock:
+            rankings = [
+                (self.vector_weight, [hit.id for hit in vector_hits]),
+                (self.word_weight, self._word_ranking(query_terms)),
+                (self.symbol_weight, self._symbol_ranking(query_terms, symbols or [])),
+            ]
+            for weight, ranking in rankings:
+                for rank, point_id in enumerate(ranking):
+                    fused[point_id] += weight / (self.rrf_k + rank + 1)
+            top = [point_id for point_id, _ in fused.most_common(limit)]
+            return [payloads.get(point_id) or self.payloads[point_id] for point_id in top]
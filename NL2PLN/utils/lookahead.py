@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable
+
+
+class LookAhead:
+    """Drafts the conversions of upcoming sentences while the current one is reviewed.
+
+    A draft is keyed by the sentence, the previous sentences it was drafted with and
+    a generation counter. When a review edits the LLM output, `invalidate` bumps the
+    generation so every outstanding draft is dropped and redrafted against the
+    corrected knowledge base.
+
+    Drafts for sentence i+1 are started before sentence i is stored, so unless a review
+    invalidates them they are retrieved without sentence i as a similar example.
+    """
+
+    def __init__(self, draft_func: Callable[[str, list[str]], Any], depth: int, history: int = 10):
+        self.draft_func = draft_func
+        self.depth = depth
+        self.history = history
+        self.executor = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="lookahead")
+        self.generation = 0
+        self.pending: dict[tuple, Future] = {}
+        self.ready = 0
+        self.misses = 0
+        self.taken = 0
+        self.invalidations = 0
+        self.wait_time = 0.0
+
+    def _key(self, line: str, previous: list[str]) -> tuple:
+        return (line, tuple(previous[-self.history:]), self.generation)
+
+    def schedule(self, upcoming: Iterable[str], previous: list[str]) -> None:
+        """Start drafts for the next `depth` sentences of `upcoming`.
+
+        The previous sentences of each draft are predicted assuming every sentence
+        before it in `upcoming` is accepted, which is how the main loop proceeds.
+        """
+        context = list(previous)
+        wanted = set()
+        for line in islice(upcoming, self.depth + 1):
+            key = self._key(line, context)
+            wanted.add(key)
+            if key not in self.pending:
+                self.pending[key] = self.executor.submit(self.draft_func, line, list(key[1]))
+            context.append(line)
+        for key in [key for key in self.pending if key not in wanted]:
+            self.pending.pop(key).cancel()
+
+    def take(self, line: str, previous: list[str]) -> Any:
+        """Return the draft for `line`, waiting for it or drafting it now if there is none."""
+        future = self.pending.pop(self._key(line, previous), None)
+        start = time.monotonic()
+        if future is None or future.cancelled():
+            self.misses += 1
+            result = self.draft_func(line, previous[-self.history:])
+        else:
+            self.ready += future.done()
+            result = future.result()
+        self.taken += 1
+        self.wait_time += time.monotonic() - start
+        return result
+
+    def invalidate(self) -> None:
+        """Drop all outstanding drafts, e.g. after the reviewer edited an output."""
+        self.generation += 1
+        self.invalidations += 1
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def shutdown(self) -> None:
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def report(self) -> str:
+        taken = self.taken
+        return (f"Look-ahead: {self.ready}/{taken} drafts ready in advance, "
+                f"{self.misses} drafted on demand, {self.invalidations} invalidations, "
+                f"avg wait {self.wait_time / taken if taken else 0.0:.2f}s per sentence")
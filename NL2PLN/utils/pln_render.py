@@ -0,0 +1,121 @@
+import re
+from NL2PLN.utils.validation import read_sexpr
+
+
+def _words(symbol: str) -> str:
+    """GoldenRetriever -> golden retriever, LiveIn -> live in"""
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', ' ', symbol).lower()
+
+# Heads starting with these words are not verbs, e.g. (AtTime timerel going t1)
+NON_VERBS = {'at', 'in', 'on', 'of', 'for', 'with', 'to', 'from', 'by', 'near', 'under', 'over', 'before',
+             'after', 'during', 'inside', 'outside', 'part', 'same', 'similar', 'different', 'is', 'a', 'an', 'the'}
+ADJECTIVES = {'happy', 'sad', 'angry', 'hungry', 'busy', 'heavy', 'dirty', 'easy', 'pretty', 'ready', 'sorry',
+              'big', 'small', 'large', 'little', 'old', 'young', 'new', 'tall', 'short', 'long', 'fast', 'slow',
+              'good', 'bad', 'hot', 'cold', 'warm', 'red', 'blue', 'green', 'black', 'white', 'brown', 'alive',
+              'dead', 'rich', 'poor', 'smart', 'kind', 'strong', 'weak', 'quiet', 'loud', 'open', 'closed',
+              'true', 'false', 'wet', 'dry', 'clean', 'sick', 'tired', 'mortal', 'famous'}
+ADJECTIVE_SUFFIXES = ('ful', 'ous', 'ive', 'able', 'ible', 'less', 'ish', 'ing', 'ed')
+
+def _term(symbol: str) -> str:
+    """Variables in lower case, constants capitalised like names: $x -> x, max -> Max"""
+    return symbol[1:] if symbol.startswith('$') else symbol[:1].upper() + symbol[1:]
+
+def _third_person(words: str) -> str | None:
+    """live in -> lives in, None for heads that do not start with a verb"""
+    verb, _, rest = words.partition(' ')
+    if verb in NON_VERBS or verb.endswith('ing') or rest.startswith('than') or (verb.endswith('ed') and rest):
+        return None
+    if verb.endswith('s') and not verb.endswith('ss') or verb.endswith('ed'):
+        pass  # already agrees, or past tense
+    elif verb == 'have':
+        verb = 'has'
+    elif verb.endswith(('ss', 'sh', 'ch', 'x', 'z', 'o')):
+        verb += 'es'
+    elif verb.endswith('y') and verb[-2:-1] not in ('a', 'e', 'o', 'u', ''):
+        verb = verb[:-1] + 'ies'
+    else:
+        verb += 's'
+    return f"{verb} {rest}" if rest else verb
+
+def _complement(words: str) -> str | None:
+    """golden retriever -> a golden retriever, happy -> happy, None if it may be either"""
+    last = words.rsplit(' ', 1)[-1]
+    if last in ADJECTIVES or last.endswith(ADJECTIVE_SUFFIXES):
+        return words
+    if last.endswith('y'):
+        return None  # puppy or lazy
+    return f"{'an' if words[0] in 'aeiou' else 'a'} {words}"
+
+def _is_symbol(expr) -> bool:
+    return isinstance(expr, str) and expr not in ('->', 'Σ', '*', 'Not', ':', '|')
+
+def _render(expr) -> str | None:
+    if not isinstance(expr, list) or not expr or not isinstance(expr[0], str):
+        return None
+    head, args = expr[0], expr[1:]
+
+    if head == 'Not' and len(args) == 1:
+        inner = _render(args[0])
+        return f"it is not the case that {inner}" if inner else None
+
+    if head == '*' and len(args) >= 2:
+        parts = [_render(arg) for arg in args]
+        return ' and '.join(parts) if all(parts) else None
+
+    if head == '->' and len(args) >= 2:
+        parts = [_render(arg) for arg in args]
+        if not all(parts):
+            return None
+        return f"if {' and '.join(parts[:-1])} then {parts[-1]}"
+
+    if head == 'Σ' and len(args) == 2:
+        binder, body = args
+        if not (isinstance(binder, list) and len(binder) == 3 and binder[0] == ':' and _is_symbol(binder[1])):
+            return None
+        inner = _render(body)
+        return f"there is some {_term(binder[1])} such that {inner}" if inner else None
+
+    # Predicates take their relationship object first: (Dog dogrel max), (Chase chase dog cat)
+    if head[0].isupper() and _is_symbol(head) and all(_is_symbol(arg) for arg in args):
+        if len(args) == 2:
+            complement = _complement(_words(head))
+            return f"{_term(args[1])} is {complement}" if complement else None
+        if len(args) == 3:
+            verb = _third_person(_words(head))
+            return f"{_term(args[1])} {verb} {_term(args[2])}" if verb else None
+    return None
+
+class Rendered(str):
+    """English from the templates, not stored as an example sentence since the LLM did not write it."""
+
+def render_pln(pln: str) -> Rendered | None:
+    """Render simple PLN expressions as English without an LLM.
+
+    Handles unary and binary predicates and the ->, Σ, * and Not operators, with
+    or without a (: proof ...) wrapper. Returns None for every other shape, and for
+    predicates the templates cannot phrase grammatically (a head that is not a verb,
+    a complement that may be a noun or an adjective, a sentence starting with a variable).
+    """
+    try:
+        expr = read_sexpr(str(pln))
+    except ValueError:
+        return None
+    if isinstance(expr, list) and len(expr) == 3 and expr[0] == ':':
+        expr = expr[2]
+    sentence = _render(expr)
+    if not sentence or not sentence[0].isupper() and not sentence.startswith(('if ', 'it ', 'there ')):
+        return None
+    return Rendered(sentence[0].upper() + sentence[1:])
+
+class RenderStats:
+    """Counts how many PLN to English conversions the templates answered."""
+    def __init__(self):
+        self.rendered = 0
+        self.fallbacks = 0
+
+    def report(self) -> str:
+        total = self.rendered + self.fallbacks
+        coverage = self.rendered / total if total else 0.0
+        return f"Template renderer: {self.rendered}/{total} conversions without LLM ({coverage:.1%} coverage)"
+
+render_stats = RenderStats()
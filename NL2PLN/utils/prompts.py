@@ -1,16 +1,42 @@
-def pln2nl(pln: str, user_input: str, similar_examples: list[str], previous_sentences: list[str]):
-    """Convert PLN to natural language with prompt structure.
-    
-    Args:
-        pln: The PLN expression to convert
-        similar_examples: List of similar examples
-        previous_sentences: List of previous context
+import hashlib
+
+
+def stable_order(examples: list[str]) -> list[str]:
+    """Drop duplicates and sort the pinned examples so the same set always renders the same text.
+
+    Only for the cached prefix: retrieved examples come after the cache breakpoint,
+    where sorting gains nothing and would lose their relevance (or MMR) order.
     """
-    similar = '\n'.join(similar_examples)
-    
-    system_msg = [{
+    return sorted(dict.fromkeys(examples))
+
+def cached_system(instructions: str, stable_examples: list[str] | None = None) -> list[dict]:
+    """Build the cache-controlled system prefix.
+
+    Everything in here is identical across calls of one run: the static instructions
+    followed by the pinned examples. All per-sentence content goes into the user message.
+    """
+    text = instructions
+    if stable_examples:
+        text += "\nFurther reference conversions:\n" + '\n'.join(stable_order(stable_examples)) + "\n"
+    return [{
         "type": "text",
-        "text": """
+        "text": text,
+        "cache_control": {"type": "ephemeral"}
+    }]
+
+def cached_prefix(system_msg: list[dict], user_msg: list[dict]) -> str:
+    """Return the text covered by the last cache_control breakpoint of a prompt."""
+    blocks = [{"type": "text", "text": system_msg}] if isinstance(system_msg, str) else list(system_msg)
+    for msg in user_msg:
+        content = msg["content"]
+        blocks.extend(content if isinstance(content, list) else [{"type": "text", "text": content}])
+    last = max((i for i, block in enumerate(blocks) if "cache_control" in block), default=-1)
+    return ''.join(block["text"] for block in blocks[:last + 1])
+
+def prefix_hash(system_msg: list[dict], user_msg: list[dict]) -> str:
+    return hashlib.sha1(cached_prefix(system_msg, user_msg).encode()).hexdigest()[:12]
+
+PLN2NL_INSTRUCTIONS = """
 You are an expert in dependent type theory and natural language generation. Your task is to convert formal logic expressions using dependent types into clear, natural English sentences.
 
 For any given formal logic expression, you should:
@@ -86,9 +112,21 @@ Input:
 (: timrel Object)
 (: goingatt1 (AtTime timerel going t1))
 ```John went home before something else happened```
-""",
-        "cache_control": {"type": "ephemeral"}
-    }]
+"""
+
+def pln2nl(pln: str, user_input: str, similar_examples: list[str], previous_sentences: list[str],
+           stable_examples: list[str] | None = None):
+    """Convert PLN to natural language with prompt structure.
+    
+    Args:
+        pln: The PLN expression to convert
+        similar_examples: List of similar examples
+        previous_sentences: List of previous context
+        stable_examples: Examples pinned for the whole run, placed in the cached prefix
+    """
+    similar = '\n'.join(dict.fromkeys(similar_examples))
+    
+    system_msg = cached_system(PLN2NL_INSTRUCTIONS, stable_examples)
 
     user_msg = [{
         "role": "user",
@@ -109,22 +147,46 @@ Now, please convert this formal logic expression into natural language:
     
     return system_msg, user_msg
 
-def nl2pln(sentence: str, similar_lst: list[str], previous_lst: list[str]):
-    """Convert natural language to PLN with optional prompt caching support.
-    
+def pln2nl_batch(plns: list[str], user_input: str, similar_examples: list[str], previous_sentences: list[str],
+                 stable_examples: list[str] | None = None):
+    """Convert several PLN expressions to natural language in one prompt.
+
+    Shares the cached prefix with pln2nl. The answer is one numbered line per
+    expression, see parse_numbered_answers in query_utils.
+
     Args:
-        sentence: The sentence to convert
-        similar_lst: List of similar examples
-        previous_lst: List of previous context
-        cache_control: Whether to enable prompt caching (default True)
+        plns: The PLN expressions to convert
+        similar_examples: List of similar examples
+        previous_sentences: List of previous context
+        stable_examples: Examples pinned for the whole run, placed in the cached prefix
     """
-    similar = '\n'.join(similar_lst)
-    previous = '\n'.join(previous_lst)
-    
-    # Structure for prompt caching
-    system_msg = [{
-        "type": "text",
-        "text": """
+    similar = '\n'.join(dict.fromkeys(similar_examples))
+    numbered = '\n'.join(f"{i}. {pln}" for i, pln in enumerate(plns, 1))
+
+    system_msg = cached_system(PLN2NL_INSTRUCTIONS, stable_examples)
+
+    user_msg = [{
+        "role": "user",
+        "content": f"""
+
+For reference, here are some previous conversions:
+{similar}
+
+{"The following logic is the answer to the question: " + user_input if user_input else ""}
+
+Now, please convert each of these {len(plns)} numbered formal logic expressions into natural language.
+Convert every expression on its own. Put all answers into a single block enclosed in triple backticks,
+one line per expression, starting with its number, e.g. "1. Max is a dog".
+
+<pln>
+{numbered}
+</pln>
+"""
+    }]
+
+    return system_msg, user_msg
+
+NL2PLN_INSTRUCTIONS = """
 You are an expert in natural language understanding and dependent type theory. Your task is to convert English sentences into formal logic using dependent types.
 
 For any given English sentence, you should:
@@ -426,9 +488,25 @@ In the context we always have the following objects:
 (: authorSpeaker Object)
 (: readerLister Object)
 (: placeTime Object)
-""",
-            "cache_control": {"type": "ephemeral"}  # Don't cache the variable part
-    }]
+"""
+
+def nl2pln(sentence: str, similar_lst: list[str], previous_lst: list[str],
+           stable_lst: list[str] | None = None):
+    """Convert natural language to PLN with prompt caching support.
+
+    The system message is the cached prefix; the retrieved examples, the previous
+    sentences and the sentence itself only appear in the user message.
+    
+    Args:
+        sentence: The sentence to convert
+        similar_lst: List of similar examples
+        previous_lst: List of previous context
+        stable_lst: Examples pinned for the whole run, placed in the cached prefix
+    """
+    similar = '\n'.join(dict.fromkeys(similar_lst))
+    previous = '\n'.join(previous_lst)
+    
+    system_msg = cached_system(NL2PLN_INSTRUCTIONS, stable_lst)
 
     user_msg = [{
         "role": "user",
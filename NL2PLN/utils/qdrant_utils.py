@@ -1,8 +1,19 @@
 import json
 import argparse
+import gzip
+import itertools
+import os
+import struct
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
 from typing import Optional, List, Dict, Any
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct
+from NL2PLN.utils.embedders import open_embedder
+from NL2PLN.utils.embedding_cache import EmbeddingCache
+from NL2PLN.utils.ragclass import RAG, http_session
+from NL2PLN.utils.vector_backends import open_backend
 
 def dump_collection(
     collection_name: str,
@@ -27,11 +38,12 @@ def dump_collection(
     batch_size = 100
     
     while True:
-        batch = client.scroll(
+        batch, offset = client.scroll(
             collection_name=collection_name,
             limit=batch_size,
-            offset=offset
-        )[0]
+            offset=offset,
+            with_vectors=True
+        )
         
         if not batch:
             break
@@ -40,7 +52,7 @@ def dump_collection(
             {
                 "id": point.id,
                 "payload": point.payload,
-                "vector": point.vector.tolist() if point.vector is not None else None
+                "vector": point.vector.tolist() if hasattr(point.vector, "tolist") else point.vector
             }
             for point in batch
         ])
@@ -49,7 +61,8 @@ def dump_collection(
             points = points[:limit]
             break
             
-        offset = batch[-1].id
+        if offset is None:
+            break
 
     # Write to file
     with open(output_file, 'w') as f:
@@ -94,6 +107,271 @@ def populate_collection(
             points=point_structs
         )
 
+# Streaming dump directory:
+#   meta.json                     collection, dimensions and the progress of every part
+#   payloads-<part>.jsonl[.gz]    one {"id", "payload"} line per point; compressed in one gzip member per batch
+#   vectors-<part>.npy            float32 matrix, row i belongs to line i of the part's payloads
+# Parts cover disjoint ranges of the collection and are written by parallel workers.
+NPY_HEADER_SIZE = 128
+
+def _npy_header(rows: int, dimensions: int) -> bytes:
+    """A .npy version 1.0 header of fixed size, so it can be rewritten in place once the row count is known."""
+    header = repr({'descr': '<f4', 'fortran_order': False, 'shape': (rows, dimensions)}).encode('latin1')
+    header = header.ljust(NPY_HEADER_SIZE - 11) + b'\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def _part_files(directory: str, meta: dict, index: int) -> tuple[str, str]:
+    suffix = ".jsonl.gz" if meta["compression"] == "gzip" else ".jsonl"
+    return (os.path.join(directory, f"payloads-{index:03d}{suffix}"),
+            os.path.join(directory, f"vectors-{index:03d}.npy"))
+
+def _dump_part(backend, directory: str, meta: dict, index: int, batch_size: int, lock: threading.Lock) -> None:
+    part = meta["parts"][index]
+    payload_file, vector_file = _part_files(directory, meta, index)
+    with open(payload_file, 'ab') as payloads, open(vector_file, 'ab') as vectors:
+        # Drop anything written after the last saved progress
+        payloads.truncate(part["payload_bytes"])
+        vectors.truncate(NPY_HEADER_SIZE + part["count"] * part["dimensions"] * 4 if part["count"] else 0)
+        offset = part["next_offset"]
+        while not part["complete"]:
+            hits, offset = backend.scroll_page(meta["collection"], offset, batch_size, part["end"])
+            if hits:
+                if not part["count"]:
+                    part["dimensions"] = len(hits[0].vector)
+                    vectors.write(_npy_header(0, part["dimensions"]))
+                vectors.write(np.asarray([hit.vector for hit in hits], dtype='<f4').tobytes())
+                data = ''.join(json.dumps({"id": hit.id, "payload": hit.payload}) + "\n" for hit in hits).encode()
+                payloads.write(gzip.compress(data) if meta["compression"] == "gzip" else data)
+                payloads.flush()
+                vectors.flush()
+            with lock:
+                part["count"] += len(hits)
+                part["payload_bytes"] = payloads.tell()
+                part["next_offset"] = offset
+                part["complete"] = offset is None
+                _write_json(os.path.join(directory, "meta.json"), meta)
+
+    with open(vector_file, 'r+b') as vectors:
+        vectors.write(_npy_header(part["count"], part["dimensions"]))
+
+def dump_collection_stream(
+    collection_name: str,
+    directory: str,
+    qdrant_url: str = "localhost:6333",
+    batch_size: int = 256,
+    compress: bool = False,
+    resume: bool = False,
+    workers: int = 1
+) -> int:
+    """
+    Dumps a collection into a streaming dump directory in constant memory per worker.
+    The collection is split into one range per worker, and each range is scrolled
+    and written concurrently. Progress is saved after every page, so an interrupted
+    dump can be resumed (with the original number of parts).
+
+    Args:
+        collection_name: Name of the collection
+        directory: Output directory
+        qdrant_url: URL of the Qdrant server, or local:<directory>
+        batch_size: Number of points per page
+        compress: gzip the payloads (the vectors stay uncompressed for memory mapping)
+        resume: Continue an unfinished dump in directory
+        workers: Number of concurrent scrolls
+
+    Returns:
+        Number of points in the dump
+    """
+    backend = open_backend(qdrant_url)
+    meta_file = os.path.join(directory, "meta.json")
+    if resume and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        starts = backend.partition_offsets(collection_name, workers) if workers > 1 else [None]
+        meta = {
+            "collection": collection_name, "compression": "gzip" if compress else None,
+            "parts": [{"start": start, "end": end, "next_offset": start, "count": 0, "dimensions": 0,
+                       "payload_bytes": 0, "complete": False}
+                      for start, end in zip(starts, starts[1:] + [None])],
+        }
+        _write_json(meta_file, meta)
+
+    lock = threading.Lock()
+    with ThreadPoolExecutor(len(meta["parts"])) as executor:
+        futures = [executor.submit(_dump_part, backend, directory, meta, index, batch_size, lock)
+                   for index in range(len(meta["parts"]))]
+        for future in futures:
+            future.result()
+    return sum(part["count"] for part in meta["parts"])
+
+class StreamedDump:
+    """The points of a streaming dump directory, read lazily with memory-mapped vectors."""
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        if not all(part["complete"] for part in self.meta["parts"]):
+            raise ValueError(f"Dump in {directory} is incomplete, resume it first")
+        self.dimensions = max(part["dimensions"] for part in self.meta["parts"])
+
+    def __len__(self) -> int:
+        return sum(part["count"] for part in self.meta["parts"])
+
+    def __iter__(self):
+        opener = gzip.open if self.meta["compression"] == "gzip" else open
+        for index, part in enumerate(self.meta["parts"]):
+            if not part["count"]:
+                continue
+            payload_file, vector_file = _part_files(self.directory, self.meta, index)
+            vectors = np.load(vector_file, mmap_mode='r')
+            with opener(payload_file, 'rt') as payloads:
+                for row, line in enumerate(payloads):
+                    record = json.loads(line)
+                    yield {"id": record["id"], "payload": record["payload"], "vector": vectors[row].tolist()}
+
+def restore_collection_stream(
+    collection_name: str,
+    directory: str,
+    qdrant_url: str = "localhost:6333",
+    batch_size: int = 256,
+    resume: bool = False,
+    workers: int = 1
+) -> int:
+    """
+    Populates a collection from a streaming dump directory. The dump is read in
+    order and its batches are upserted by concurrent workers, with at most two
+    batches per worker in memory. Progress (all points before the first unfinished
+    batch) is saved in the dump directory, so an interrupted restore can be resumed;
+    re-upserting already restored points is harmless.
+
+    Args:
+        collection_name: Name of the collection, created if missing
+        directory: Dump directory written by dump_collection_stream
+        qdrant_url: URL of the Qdrant server, or local:<directory>
+        batch_size: Number of points to upsert in each batch
+        resume: Skip the points restored by an earlier, interrupted run
+        workers: Number of concurrent upserts
+
+    Returns:
+        Number of points restored
+    """
+    dump = StreamedDump(directory)
+    backend = open_backend(qdrant_url)
+    if not backend.collection_exists(collection_name):
+        backend.create_collection(collection_name, dump.dimensions)
+
+    progress_file = os.path.join(directory, f"restore-{collection_name}.json")
+    start = 0
+    if resume and os.path.exists(progress_file):
+        with open(progress_file) as f:
+            start = json.load(f)["restored"]
+
+    lock = threading.Lock()
+    finished = set()
+    watermark = 0  # number of leading batches that are all upserted
+
+    def upsert(index, batch):
+        nonlocal watermark
+        backend.upsert(collection_name, batch)
+        with lock:
+            finished.add(index)
+            while watermark in finished:
+                finished.discard(watermark)
+                watermark += 1
+            _write_json(progress_file, {"restored": min(start + watermark * batch_size, len(dump))})
+
+    def batches():
+        points = itertools.islice(dump, start, None)
+        for batch in iter(lambda: list(itertools.islice(points, batch_size)), []):
+            yield [(point["id"], point["vector"], point["payload"]) for point in batch]
+
+    with ThreadPoolExecutor(workers) as executor:
+        pending = set()
+        for index, batch in enumerate(batches()):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(upsert, index, batch))
+        for future in pending:
+            future.result()
+    return len(dump)
+
+def reembed_collection(
+    source: str,
+    target: str,
+    embedder,
+    qdrant_url: str = "localhost:6333",
+    alias: Optional[str] = None,
+    batch_size: int = 64,
+    workers: int = 4,
+    quantization: Optional[str] = None,
+    on_disk_payload: bool = False
+) -> int:
+    """
+    Copies a collection into a new collection with the vectors of another embedder.
+    Pages of the source are embedded by concurrent workers and upserted with their
+    original ids and payloads, so an interrupted run can simply be repeated. Only
+    when every point is copied is alias moved to the target in one atomic step;
+    readers that open the collection through the alias see either the old or the
+    new collection. Points added to the source during the run are not copied.
+
+    Args:
+        source: Collection (or alias) to read
+        target: New collection, created with the vector size of embedder
+        embedder: Embedder for the new vectors
+        qdrant_url: URL of the Qdrant server, or local:<directory>
+        alias: Alias to point at target when done
+        batch_size: Number of texts per embedding request and points per upsert
+        workers: Number of concurrent embedding requests
+        quantization: Quantization of the target collection
+        on_disk_payload: Keep the payloads of the target collection on disk
+
+    Returns:
+        Number of points copied
+    """
+    backend = open_backend(qdrant_url)
+    if target in (source, backend.get_alias(source), alias, backend.get_alias(alias) if alias else None):
+        raise ValueError(f"Target '{target}' must be a new collection, not the source or the live collection")
+    if alias and backend.get_alias(alias) is None and backend.collection_exists(alias):
+        raise ValueError(f"'{alias}' is a collection, not an alias; use a new alias and open it with --collection")
+    # Every text is embedded once, so the embedder is called directly instead of through the embedding cache
+    rag = RAG(collection_name=target, backend=backend, embedder=embedder, batch_size=batch_size,
+              quantization=quantization, on_disk_payload=on_disk_payload, embedding_cache=EmbeddingCache(None))
+
+    def copy(hits):
+        vectors = embedder.embed_many([RAG.embedding_text(hit.payload) for hit in hits])
+        backend.upsert(target, [(hit.id, vector, rag._payload(hit.payload)) for hit, vector in zip(hits, vectors)])
+        return len(hits)
+
+    copied = 0
+    offset = None
+    with ThreadPoolExecutor(workers) as executor:
+        pending = set()
+        while True:
+            hits, offset = backend.scroll_page(source, offset, batch_size)
+            if hits:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    copied += sum(future.result() for future in done)
+                pending.add(executor.submit(copy, hits))
+            if offset is None:
+                break
+        copied += sum(future.result() for future in pending)
+
+    if alias:
+        previous = backend.get_alias(alias)
+        backend.set_alias(alias, target)
+        print(f"Alias '{alias}' moved from '{previous}' to '{target}'")
+    return copied
+
 def main():
     parser = argparse.ArgumentParser(description='Qdrant collection backup and restore utility')
     subparsers = parser.add_subparsers(dest='command', help='Commands')
@@ -112,6 +390,61 @@ def main():
     populate_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL')
     populate_parser.add_argument('--batch-size', type=int, default=100, help='Batch size for inserts')
 
+    # Export command
+    export_parser = subparsers.add_parser('export', help='Dump collection to a streaming dump directory')
+    export_parser.add_argument('collection', help='Collection name')
+    export_parser.add_argument('output', help='Output directory')
+    export_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL or local:<directory>')
+    export_parser.add_argument('--batch-size', type=int, default=256, help='Points per page')
+    export_parser.add_argument('--compress', action='store_true', help='gzip the payloads')
+    export_parser.add_argument('--resume', action='store_true', help='Continue an interrupted export')
+    export_parser.add_argument('--workers', type=int, default=1, help='Concurrent scrolls over disjoint id ranges')
+
+    # Import command
+    import_parser = subparsers.add_parser('import', help='Populate collection from a streaming dump directory')
+    import_parser.add_argument('collection', help='Collection name')
+    import_parser.add_argument('input', help='Dump directory')
+    import_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL or local:<directory>')
+    import_parser.add_argument('--batch-size', type=int, default=256, help='Batch size for inserts')
+    import_parser.add_argument('--resume', action='store_true', help='Continue an interrupted import')
+    import_parser.add_argument('--workers', type=int, default=1, help='Concurrent upserts')
+
+    # Index command
+    index_parser = subparsers.add_parser('index-hashes', help='Add sentence hashes for exact lookup to old points')
+    index_parser.add_argument('collection', help='Collection name')
+    index_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL or local:<directory>')
+
+    # Compact command
+    compact_parser = subparsers.add_parser('compact', help='Delete near-duplicate points with equal payloads')
+    compact_parser.add_argument('collection', help='Collection name')
+    compact_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL or local:<directory>')
+    compact_parser.add_argument('--threshold', type=float, default=0.98, help='Minimum cosine similarity of duplicates')
+    compact_parser.add_argument('--dry-run', action='store_true', help='Only report the duplicates')
+
+    # Configure command
+    configure_parser = subparsers.add_parser('configure', help='Change quantization and payload storage in place')
+    configure_parser.add_argument('collection', help='Collection name')
+    configure_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL or local:<directory>')
+    configure_parser.add_argument('--quantization', choices=['int8', 'binary'], default=None,
+                                  help='Vector quantization, full precision if omitted')
+    configure_parser.add_argument('--on-disk-payload', action='store_true', help='Keep payloads on disk')
+
+    # Reembed command
+    reembed_parser = subparsers.add_parser('reembed', help='Copy a collection with new embeddings and swap an alias')
+    reembed_parser.add_argument('source', help='Collection or alias to read')
+    reembed_parser.add_argument('target', help='New collection')
+    reembed_parser.add_argument('--url', default='localhost:6333', help='Qdrant server URL or local:<directory>')
+    reembed_parser.add_argument('--embedder', default='ollama',
+                                help='ollama[:<model>] or hash[:<dimensions>] for the new vectors')
+    reembed_parser.add_argument('--ollama-url', default='http://127.0.0.1:11434', help='Ollama server URL')
+    reembed_parser.add_argument('--alias', default=None,
+                                help='Alias to point at the target when done, for the --collection of the CLIs')
+    reembed_parser.add_argument('--batch-size', type=int, default=64, help='Texts per embedding request')
+    reembed_parser.add_argument('--workers', type=int, default=4, help='Concurrent embedding requests')
+    reembed_parser.add_argument('--quantization', choices=['int8', 'binary'], default=None,
+                                help='Vector quantization of the target, full precision if omitted')
+    reembed_parser.add_argument('--on-disk-payload', action='store_true', help='Keep the target payloads on disk')
+
     args = parser.parse_args()
 
     if args.command == 'dump':
@@ -132,5 +465,35 @@ def main():
         )
         print(f"Collection '{args.collection}' populated from {args.input}")
 
+    elif args.command == 'export':
+        count = dump_collection_stream(args.collection, args.output, args.url, args.batch_size, args.compress,
+                                       args.resume, args.workers)
+        print(f"Collection '{args.collection}' exported to {args.output} ({count} points)")
+
+    elif args.command == 'import':
+        count = restore_collection_stream(args.collection, args.input, args.url, args.batch_size, args.resume,
+                                          args.workers)
+        print(f"Collection '{args.collection}' populated from {args.input} ({count} points)")
+
+    elif args.command == 'index-hashes':
+        updated = RAG(collection_name=args.collection, qdrant_url=args.url).index_sentence_hashes()
+        print(f"Added sentence hashes to {updated} points of '{args.collection}'")
+
+    elif args.command == 'compact':
+        duplicates = RAG(collection_name=args.collection, qdrant_url=args.url).compact(args.threshold, args.dry_run)
+        action = "Found" if args.dry_run else "Deleted"
+        print(f"{action} {len(duplicates)} near-duplicate points in '{args.collection}'")
+
+    elif args.command == 'configure':
+        open_backend(args.url).configure_collection(args.collection, args.quantization, args.on_disk_payload)
+        print(f"Collection '{args.collection}' set to quantization={args.quantization}, "
+              f"on_disk_payload={args.on_disk_payload}")
+
+    elif args.command == 'reembed':
+        embedder = open_embedder(args.embedder, args.ollama_url, http_session(pool_maxsize=max(16, args.workers)))
+        count = reembed_collection(args.source, args.target, embedder, args.url, args.alias, args.batch_size,
+                                   args.workers, args.quantization, args.on_disk_payload)
+        print(f"Collection '{args.source}' re-embedded into '{args.target}' ({count} points)")
+
 if __name__ == '__main__':
     main()
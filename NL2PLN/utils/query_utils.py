@@ -1,8 +1,11 @@
 from NL2PLN.utils.common import create_openai_completion, extract_logic
+from NL2PLN.utils.pln_render import render_pln, render_stats
 
 def convert_to_english(pln_text, user_input, similar_examples, previous_sentences=None):
     """
     Convert PLN expressions to natural language English.
+
+    Simple shapes are rendered by templates, everything else is sent to the LLM.
     
     Args:
         pln_text: The PLN expression to convert
@@ -12,6 +15,17 @@ def convert_to_english(pln_text, user_input, similar_examples, previous_sentence
     Returns:
         str: The English translation of the PLN expression
     """
+    rendered = render_pln(pln_text)
+    if rendered:
+        render_stats.rendered += 1
+        return rendered
+    render_stats.fallbacks += 1
+    return llm_to_english(pln_text, user_input, similar_examples, previous_sentences)
+
+def llm_to_english(pln_text, user_input, similar_examples, previous_sentences=None):
+    """
+    Convert a PLN expression to English with a single pln2nl LLM call.
+    """
     from NL2PLN.utils.prompts import pln2nl
     system_msg, user_msg = pln2nl(pln_text, user_input, similar_examples, previous_sentences or [])
     response = create_openai_completion(system_msg, user_msg)
@@ -23,9 +37,56 @@ def convert_to_english(pln_text, user_input, similar_examples, previous_sentence
         return match.group(1).strip()
     return response.strip()
 
+def parse_numbered_answers(response: str, count: int) -> dict[int, str]:
+    """
+    Parse the numbered lines of a pln2nl_batch response.
+
+    Returns:
+        dict: Answer text by 1-based item number, for the numbers 1..count that were found
+    """
+    import re
+    match = re.search(r'```(.+?)```', response, re.DOTALL)
+    text = match.group(1) if match else response
+    answers = {}
+    for line in text.splitlines():
+        item = re.match(r'\s*(\d+)[.):]\s*(.+)', line)
+        if item and 1 <= int(item.group(1)) <= count and item.group(2).strip():
+            answers.setdefault(int(item.group(1)), item.group(2).strip())
+    return answers
+
+def convert_to_english_batch(pln_list, user_input, similar_examples, previous_sentences=None):
+    """
+    Convert several PLN expressions to English with a single LLM call.
+
+    Simple shapes are rendered by templates first. Items whose answer cannot be
+    found in the numbered response are converted one by one.
+
+    Returns:
+        list: The English translations, in the order of pln_list
+    """
+    from NL2PLN.utils.prompts import pln2nl_batch
+    results = [render_pln(pln) for pln in pln_list]
+    todo = [pln for pln, result in zip(pln_list, results) if result is None]
+    render_stats.rendered += len(pln_list) - len(todo)
+    render_stats.fallbacks += len(todo)
+    if not todo:
+        return results
+    if len(todo) == 1:
+        answers = {1: llm_to_english(todo[0], user_input, similar_examples, previous_sentences)}
+    else:
+        system_msg, user_msg = pln2nl_batch(todo, user_input, similar_examples, previous_sentences or [])
+        answers = parse_numbered_answers(create_openai_completion(system_msg, user_msg), len(todo))
+        missing = len(todo) - len(answers)
+        if missing:
+            print(f"Batched PLN to English conversion missed {missing} of {len(todo)} items, converting them one by one")
+
+    llm_results = iter([answers[i] if i in answers else llm_to_english(pln, user_input, similar_examples, previous_sentences)
+                        for i, pln in enumerate(todo, 1)])
+    return [result if result is not None else next(llm_results) for result in results]
+
 def convert_logic_simple(input_text, prompt_func, similar_examples, previous_sentences=None):
     """
-    Simplified version of convert_logic that doesn't include human validation.
+    Convert a sentence to PLN like the main loop, without human validation.
     """
     system_msg, user_msg = prompt_func(input_text, similar_examples, previous_sentences or [])
     txt = create_openai_completion(system_msg, user_msg)
@@ -1,110 +1,415 @@
+import hashlib
+import json
+import threading
 import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import requests
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+from requests.adapters import HTTPAdapter
 from qdrant_client.http.exceptions import UnexpectedResponse
-from requests.exceptions import RequestException, Timeout
+from requests.exceptions import Timeout
+from NL2PLN.utils.singleflight import SingleFlight
+from NL2PLN.utils.embedding_cache import default_embedding_cache
+from NL2PLN.utils.embedders import OllamaEmbedder
+from NL2PLN.utils.vector_backends import open_backend
 
-class RAG:
-    def __init__(self, collection_name="sentences", ollama_base_url="http://127.0.0.1:11434", qdrant_url="http://truenas:9333"):
+embedding_flight = SingleFlight("Embeddings")
+
+_shared_lock = threading.Lock()
+_sessions = {}
+
+def http_session(pool_connections=4, pool_maxsize=16):
+    """
+    Get the process-wide keep-alive session for the given pool sizes.
+    pool_connections is the number of hosts kept, pool_maxsize the connections per host.
+    """
+    with _shared_lock:
+        key = (pool_connections, pool_maxsize)
+        if key not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+        return _sessions[key]
+
+_search_pool = None
+
+def _search_executor():
+    global _search_pool
+    with _shared_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-search")
+        return _search_pool
+
+def search_collections(sentence, quotas, grouped=False, with_vectors=False):
+    """
+    Search several collections for one sentence, embedding it once and querying
+    the collections concurrently. quotas is a list of (rag, limit) pairs, all using
+    the same embedding model. Returns up to limit payloads of each collection in the
+    order of quotas, leaving out payloads already returned for an earlier collection;
+    with grouped, one list of payloads per collection. with_vectors returns the hits
+    with their stored vectors instead of the payloads.
+    """
+    if not quotas:
+        return []
+    try:
+        query_vector = quotas[0][0].get_embedding(sentence)
+    except Exception as e:
+        print(f"An unexpected error occurred: {str(e)}")
+        return []
+
+    def search(rag, limit):
+        try:
+            # Twice the quota, so payloads dropped as duplicates can be replaced
+            return rag.backend.search(rag.collection_name, query_vector, 2 * limit, with_vectors)
+        except Exception as e:
+            rag._report_search_error(e)
+        return []
+
+    futures = [_search_executor().submit(search, rag, limit) for rag, limit in quotas[1:]]
+    results = [search(*quotas[0])] + [future.result() for future in futures]
+    seen = set()
+    groups = []
+    for (_, limit), hits in zip(quotas, results):
+        group = []
+        for hit in hits:
+            key = RAG.payload_key(hit.payload)
+            if key not in seen and len(group) < limit:
+                seen.add(key)
+                group.append(hit if with_vectors else hit.payload)
+        groups.append(group)
+    return groups if grouped else [payload for group in groups for payload in group]
+
+def _batches(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class BaseRAG:
+    """The parts of RAG and AsyncRAG that do not wait on the embedder or the vector store."""
+    timeout_error = Timeout
+
+    @staticmethod
+    def sentence_hash(sentence):
+        """Hash of the sentence with case and whitespace normalized, the key of search_exact."""
+        return hashlib.sha1(' '.join(sentence.split()).casefold().encode()).hexdigest()
+
+    def _payload(self, data):
+        """The stored payload, with the embedder of its vector and the hash for search_exact."""
+        if 'sentence' not in data:
+            return {**data, 'embedder': self.embedding_model}
+        return {**data, 'embedder': self.embedding_model, 'sentence_hash': self.sentence_hash(data['sentence'])}
+
+    def _check_embedder(self, hits):
+        """Refuse a collection whose first point was stored with another embedder."""
+        recorded = hits[0].payload.get('embedder') if hits else None
+        if recorded is not None and recorded != self.embedding_model:
+            raise ValueError(f"'{self.collection_name}' is embedded with {recorded}, not {self.embedding_model}; "
+                             f"copy it with `python -m NL2PLN.utils.qdrant_utils reembed` to switch embedders")
+
+    @staticmethod
+    def payload_key(payload):
+        """The payload with whitespace and the case of the sentence normalized, for duplicate detection."""
+        def normalize(value):
+            if isinstance(value, str):
+                return ' '.join(value.split())
+            if isinstance(value, list):
+                return [normalize(item) for item in value]
+            if isinstance(value, dict):
+                return {key: normalize(item) for key, item in value.items()}
+            return value
+        normalized = {key: normalize(value) for key, value in payload.items()
+                      if key not in ('sentence_hash', 'embedder')}
+        if isinstance(normalized.get('sentence'), str):
+            normalized['sentence'] = normalized['sentence'].casefold()
+        return json.dumps(normalized, sort_keys=True)
+
+    def _duplicate(self, data, hits):
+        """Id of the first hit that duplicates data, or None."""
+        key = self.payload_key(data)
+        for hit in hits:
+            if hit.score >= self.dedup_threshold and self.payload_key(hit.payload) == key:
+                return hit.id
+        return None
+
+    @staticmethod
+    def embedding_text(data):
+        # Without a pln part this is the plain sentence, so the embedding from search_similar is reused
+        return ' '.join(part for part in (data.get('sentence', ''), data.get('pln', '')) if part)
+
+    def _cached_embeddings(self, texts):
+        """The cached embeddings of texts by text, and the texts still to be embedded."""
+        found = {}
+        for text in dict.fromkeys(texts):
+            embedding = self.embedding_cache.get(self.embedding_model, text)
+            if embedding is not None:
+                found[text] = embedding
+        return found, [text for text in dict.fromkeys(texts) if text not in found]
+
+    def _cache_embeddings(self, texts, embeddings, found):
+        for text, embedding in zip(texts, embeddings):
+            self.embedding_cache.put(self.embedding_model, text, embedding)
+            found[text] = embedding
+
+    def _points(self, batch, embeddings):
+        ids = [str(uuid.uuid4()) for _ in batch]
+        return ids, list(zip(ids, embeddings, map(self._payload, batch)))
+
+    def _without_duplicates(self, batch, ids, points, existing):
+        """
+        The points still to be written, given the search results of their vectors.
+        Replaces the ids of duplicates in place, also of duplicates within the batch.
+        """
+        first_of = {}
+        new_points = []
+        for i, (data, hits) in enumerate(zip(batch, existing)):
+            duplicate = self._duplicate(data, hits) or first_of.get(self.payload_key(data))
+            if duplicate is not None:
+                self.duplicates += 1
+                ids[i] = duplicate
+            else:
+                first_of[self.payload_key(data)] = ids[i]
+                new_points.append(points[i])
+        return new_points
+
+    def _hash_batches(self, sentences, batch_size):
+        """The sentence hashes of search_exact_many and the batches of distinct hashes to look up."""
+        hashes = [self.sentence_hash(sentence) for sentence in sentences]
+        return hashes, _batches(list(dict.fromkeys(hashes)), batch_size)
+
+    @staticmethod
+    def _exact_matches(hashes, hits):
+        found = {}
+        for hit in hits:
+            found.setdefault(hit.payload['sentence_hash'], hit.payload)
+        return [found.get(key) for key in hashes]
+
+    def _report_search_error(self, error):
+        if isinstance(error, self.timeout_error):
+            print("Timeout occurred during the search operation")
+        elif isinstance(error, UnexpectedResponse):
+            print(f"Unexpected response from Qdrant: {str(error)}")
+        else:
+            print(f"An unexpected error occurred: {str(error)}")
+
+    def dedup_report(self):
+        return f"Deduplication: {self.duplicates} near-duplicate items not stored again"
+
+class RAG(BaseRAG):
+    def __init__(self, collection_name="sentences", ollama_base_url="http://127.0.0.1:11434", qdrant_url="http://truenas:9333",
+                 embedding_cache=None, batch_size=64, timeout=30, pool_connections=4, pool_maxsize=16,
+                 prefer_grpc=True, grpc_port=6334, backend=None, dedup_threshold=None,
+                 quantization=None, on_disk_payload=False, embedder=None):
+        """
+        qdrant_url can also be local:<directory> for the in-process vector store,
+        or pass any VectorBackend as backend.
+        With a dedup_threshold, items are not stored again if a point with at least that
+        cosine similarity and the same normalized payload exists.
+        quantization ("int8" or "binary") and on_disk_payload apply when the collection is created.
+        embedder replaces the default Ollama nomic-embed-text embedder, e.g. with a HashEmbedder.
+        """
         self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.timeout = timeout
         self.ollama_base_url = ollama_base_url
-        self.qdrant_client = QdrantClient(qdrant_url)
+        self.dedup_threshold = dedup_threshold
+        self.quantization = quantization
+        self.on_disk_payload = on_disk_payload
+        self.duplicates = 0
+        self.embedding_cache = embedding_cache or default_embedding_cache()
+        self.session = http_session(pool_connections, pool_maxsize)
+        self.embedder = embedder or OllamaEmbedder(ollama_base_url, "nomic-embed-text", self.session, timeout, 768)
+        self.embedding_model = self.embedder.name
+        self.backend = backend or open_backend(qdrant_url, prefer_grpc, grpc_port, timeout)
         self.ensure_collection()
 
     def get_embedding(self, text):
         """
-        Get the embedding for a given text using Ollama's API.
+        Get the embedding for a given text from the embedder (Ollama's API by default).
+        Embeddings of remote embedders are cached, and concurrent requests for the same text share one API call.
         """
-        try:
-            response = requests.post(
-                f"{self.ollama_base_url}/api/embeddings",
-                json={"model": "nomic-embed-text", "prompt": text},
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()['embedding']
-        except Timeout:
-            print("Timeout occurred while getting embedding from Ollama API")
-            raise
-        except RequestException as e:
-            print(f"Error occurred while getting embedding: {str(e)}")
-            raise
+        if not self.embedder.remote:
+            return self.embedder.embed(text)
+        embedding = self.embedding_cache.get(self.embedding_model, text)
+        if embedding is None:
+            embedding = embedding_flight.do((self.ollama_base_url, self.embedding_model, text),
+                                            lambda: self.embedder.embed(text))
+            self.embedding_cache.put(self.embedding_model, text, embedding)
+        return embedding
+
+    def get_embeddings(self, texts, batch_size=None):
+        """
+        Get the embeddings for several texts, sending the uncached ones to
+        the embedder in batches of batch_size.
+        """
+        batch_size = batch_size or self.batch_size
+        if not self.embedder.remote:
+            return [vector for batch in _batches(texts, batch_size) for vector in self.embedder.embed_many(batch)]
+        found, missing = self._cached_embeddings(texts)
+        for batch in _batches(missing, batch_size):
+            self._cache_embeddings(batch, self.embedder.embed_many(batch), found)
+        return [found[text] for text in texts]
 
     def store_embedding(self, data):
         """
-        Store the embedding of a JSON object in Qdrant.
+        Store the embedding of a JSON object in the vector store.
+        Returns the id of the new point.
         """
         if not isinstance(data, dict):
             raise ValueError("Input must be a dictionary (JSON object)")
         
-        text = data.get('sentence', '') + ' ' + data.get('pln', '')
-        embedding = self.get_embedding(text)
-        
-        self.qdrant_client.upsert(
-            collection_name=self.collection_name,
-            points=[
-                models.PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=embedding,
-                    payload=data
-                )
-            ]
-        )
+        embedding = self.get_embedding(self.embedding_text(data))
+
+        if self.dedup_threshold is not None:
+            duplicate = self._duplicate(data, self.backend.search(self.collection_name, embedding, 5))
+            if duplicate is not None:
+                self.duplicates += 1
+                return duplicate
+
+        point_id = str(uuid.uuid4())
+        self.backend.upsert(self.collection_name, [(point_id, embedding, self._payload(data))])
+        return point_id
+
+    def store_embeddings(self, data_list, batch_size=None):
+        """
+        Store several JSON objects, embedding them in batches and writing
+        each batch of points with a single upsert. Returns the ids of the new points
+        (of the existing points for items skipped as duplicates).
+        """
+        if not all(isinstance(data, dict) for data in data_list):
+            raise ValueError("Input must be a list of dictionaries (JSON objects)")
+
+        batch_size = batch_size or self.batch_size
+        point_ids = []
+        for batch in _batches(data_list, batch_size):
+            embeddings = self.get_embeddings([self.embedding_text(data) for data in batch], batch_size)
+            ids, points = self._points(batch, embeddings)
+            if self.dedup_threshold is not None:
+                existing = self.backend.search_batch(self.collection_name, embeddings, 5)
+                points = self._without_duplicates(batch, ids, points, existing)
+            if points:
+                self.backend.upsert(self.collection_name, points)
+            point_ids.extend(ids)
+        return point_ids
+
+    def compact(self, threshold=0.98, dry_run=False):
+        """
+        Delete points that duplicate the first point with the same normalized
+        payload, with at least threshold cosine similarity. Returns the ids of the duplicates.
+
+        A first pass counts the payloads, so the second one only keeps the vector of
+        the first point of a payload while later points with that payload are to come.
+        """
+        def digest(payload):
+            return hashlib.sha1(self.payload_key(payload).encode()).digest()
+
+        remaining = Counter(digest(hit.payload) for hit in self.backend.scroll(self.collection_name))
+        first = {}
+        duplicates = []
+        for hit in self.backend.scroll(self.collection_name):
+            key = digest(hit.payload)
+            if remaining[key] < 2 and key not in first:
+                continue  # unique payload
+            vector = np.asarray(hit.vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+            if key not in first:
+                first[key] = vector
+            elif float(vector @ first[key]) >= threshold:
+                duplicates.append(hit.id)
+            remaining[key] -= 1
+            if remaining[key] <= 0:
+                first.pop(key, None)
+        if duplicates and not dry_run:
+            for batch in _batches(duplicates, self.batch_size):
+                self.backend.delete(self.collection_name, batch)
+        return duplicates
 
     def ensure_collection(self):
         """
-        Ensure the collection exists in Qdrant.
+        Ensure the collection exists in the vector store.
+
+        Raises:
+            ValueError: if the collection is embedded with another embedder
         """
-        collections = self.qdrant_client.get_collections().collections
-        if not any(collection.name == self.collection_name for collection in collections):
-            self.qdrant_client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(size=768, distance=models.Distance.COSINE),
-            )
-            print(f"Created '{self.collection_name}' collection in Qdrant")
+        if not self.backend.collection_exists(self.collection_name):
+            self.backend.create_collection(self.collection_name, self.embedder.dimensions, self.quantization,
+                                           self.on_disk_payload)
+            print(f"Created '{self.collection_name}' collection in {type(self.backend).__name__}")
+        else:
+            self._check_embedder(self.backend.scroll_page(self.collection_name, limit=1)[0])
+        self.backend.create_payload_index(self.collection_name, 'sentence_hash')
 
-    def search_similar(self, sentence, limit=3):
+    def index_sentence_hashes(self, batch_size=None):
+        """
+        Add the sentence hash to points stored before search_exact used it.
+        Returns the number of updated points.
+        """
+        batch_size = batch_size or self.batch_size
+        updated = 0
+        batch = []
+        for hit in self.backend.scroll(self.collection_name, batch_size):
+            if 'sentence' in hit.payload and 'sentence_hash' not in hit.payload:
+                # Only the hash is added, the points keep the embedder they were stored with
+                sentence_hash = self.sentence_hash(hit.payload['sentence'])
+                batch.append((hit.id, hit.vector, {**hit.payload, 'sentence_hash': sentence_hash}))
+            if len(batch) >= batch_size:
+                self.backend.upsert(self.collection_name, batch)
+                updated += len(batch)
+                batch = []
+        if batch:
+            self.backend.upsert(self.collection_name, batch)
+            updated += len(batch)
+        return updated
+
+    def search_similar(self, sentence, limit=3, with_vectors=False):
+        """The payloads of the items most similar to sentence, or with with_vectors their hits with vectors."""
         try:
             query_vector = self.get_embedding(sentence)
-            search_result = self.qdrant_client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=limit
-            )
+            search_result = self.backend.search(self.collection_name, query_vector, limit, with_vectors)
+            if with_vectors:
+                return search_result
             similar_items = [hit.payload for hit in search_result]
             return similar_items
-        except Timeout:
-            print("Timeout occurred during the search operation")
-            return []
-        except UnexpectedResponse as e:
-            print(f"Unexpected response from Qdrant: {str(e)}")
-            return []
         except Exception as e:
-            print(f"An unexpected error occurred: {str(e)}")
+            self._report_search_error(e)
             return []
 
+    def search_similar_many(self, sentences, limit=3, batch_size=None):
+        """
+        Search similar items for several sentences, with batched embedding
+        and one batch search per batch of sentences.
+        """
+        batch_size = batch_size or self.batch_size
+        results = []
+        try:
+            for batch in _batches(sentences, batch_size):
+                search_results = self.backend.search_batch(
+                    self.collection_name, self.get_embeddings(batch, batch_size), limit
+                )
+                results.extend([hit.payload for hit in hits] for hits in search_results)
+            return results
+        except Exception as e:
+            self._report_search_error(e)
+        return results + [[] for _ in sentences[len(results):]]
+
     def search_exact(self, sentence):
         """
-        Search for an exact match of the given sentence in Qdrant.
+        Search for an exact match of the given sentence in the vector store,
+        ignoring case and whitespace. Needs no embedding.
+        """
+        return self.search_exact_many([sentence])[0]
+
+    def search_exact_many(self, sentences, batch_size=1024):
+        """
+        Look up many sentences at once, e.g. to skip already stored ones before ingestion.
+        Returns the stored payload or None for each sentence.
         """
+        hashes, batches = self._hash_batches(sentences, batch_size)
+        hits = []
         try:
-            query_vector = self.get_embedding(sentence)
-            search_result = self.qdrant_client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=10  # Arbitrary limit to get a reasonable number of candidates
-            )
-            for hit in search_result:
-                if hit.payload.get('sentence') == sentence:
-                    return hit.payload
-            return None
-        except Timeout:
-            print("Timeout occurred during the search operation")
-            return None
-        except UnexpectedResponse as e:
-            print(f"Unexpected response from Qdrant: {str(e)}")
-            return None
+            for batch in batches:
+                hits.extend(self.backend.find(self.collection_name, 'sentence_hash', batch))
         except Exception as e:
-            print(f"An unexpected error occurred: {str(e)}")
-            return None
+            self._report_search_error(e)
+        return self._exact_matches(hashes, hits)
@@ -0,0 +1,58 @@
+import threading
+from typing import Callable
+from NL2PLN.utils.common import create_openai_completion
+
+FEEDBACK = """Your conversion has these errors:
+{errors}
+
+Output the corrected conversion in the same format, inside triple backticks."""
+
+class SelfCorrection:
+    """Sends mechanical errors in an LLM output back to the LLM before a human sees it.
+
+    validate(txt) returns the errors of an output, e.g. check_structure with the KB
+    symbols. On errors the rejected output and the error list are appended to the
+    conversation (the cached system prefix stays the same) and the LLM is asked
+    again, up to `retries` times. The last output is returned even if it still
+    fails, with its errors printed for the human review. on_retry() is called
+    before each retry, so a consumer of on_text can start over with the new output.
+    """
+    def __init__(self, validate: Callable[[str], list[str]], retries: int = 2):
+        self.validate = validate
+        self.retries = retries
+        self.lock = threading.Lock()  # look-ahead drafts are corrected concurrently
+        self.outputs = 0
+        self.failed = 0
+        self.repaired = 0
+        self.attempts = 0
+
+    def complete(self, system_msg, user_msg, on_text: Callable[[str], None] | None = None,
+                 completion: Callable = create_openai_completion,
+                 on_retry: Callable[[], None] | None = None) -> str:
+        """Get a completion with completion(system_msg, messages, on_text=...) and correct it."""
+        messages = list(user_msg)
+        txt = completion(system_msg, messages, on_text=on_text)
+        errors = self.validate(txt)
+        with self.lock:
+            self.outputs += 1
+            self.failed += bool(errors)
+        for _ in range(self.retries):
+            if not errors:
+                break
+            print(f"\nOutput failed the structural check, asking for a correction: {'; '.join(errors)}")
+            messages += [{"role": "assistant", "content": txt},
+                         {"role": "user", "content": FEEDBACK.format(errors='\n'.join(f"- {e}" for e in errors))}]
+            if on_retry:
+                on_retry()
+            txt = completion(system_msg, messages, on_text=on_text)
+            errors = self.validate(txt)
+            with self.lock:
+                self.attempts += 1
+                self.repaired += not errors
+        if errors:
+            print(f"\nWARNING: output still fails the structural check: {'; '.join(errors)}")
+        return txt
+
+    def report(self) -> str:
+        return (f"Self-correction: {self.failed}/{self.outputs} outputs failed the structural check, "
+                f"{self.repaired} corrected with {self.attempts} retries")
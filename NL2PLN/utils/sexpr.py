@@ -0,0 +1,235 @@
+import re
+from typing import Iterable, NamedTuple, Union
+
+# A comment runs to the end of the line; a string without its closing quote (no group 1) is an error
+TOKEN = re.compile(r'[()]|;.*|"(?:[^"\\]|\\.)*(")?|[^\s()";]+')
+NUMBER = re.compile(r'[-+]?\d+(\.\d+)?([eE][-+]?\d+)?')
+# Atoms starting with other characters are symbols
+SPECIAL_START = set('"$+-0123456789')
+ESCAPES = {'n': '\n', 't': '\t'}
+# The bytes deleted by the fast path of statements, all but parentheses and the separator
+NOT_PARENS = bytes(c for c in range(256) if c not in b'()\0')
+# Parentheses glued to an atom or a closing to an opening one, which split() keeps together
+GLUED_OPEN = re.compile(r'\((?<=[^\s(\0]\()')
+GLUED_CLOSE = re.compile(r'\)[^\s)\0]')
+# The ASCII whitespace that split() collapses besides the space
+ASCII_SPACES = '\t\n\v\f\r\x1c\x1d\x1e\x1f'
+
+
+class Span(NamedTuple):
+    start: int  # offset of the first character in the parsed text
+    end: int    # offset after the last character
+
+# Nodes keep their span as start and end fields, one allocation per node instead of two
+class Symbol(NamedTuple):
+    name: str
+    start: int
+    end: int
+
+    @property
+    def span(self) -> Span:
+        return Span(self.start, self.end)
+
+class Variable(NamedTuple):
+    name: str  # without the leading $
+    start: int
+    end: int
+    span = Symbol.span
+
+class String(NamedTuple):
+    value: str  # with the escapes resolved
+    start: int
+    end: int
+    span = Symbol.span
+
+class Number(NamedTuple):
+    value: int | float
+    text: str  # as written, e.g. 1e3 or 1.50, which render keeps
+    start: int
+    end: int
+    span = Symbol.span
+
+class Expression(NamedTuple):
+    children: tuple
+    start: int
+    end: int
+    span = Symbol.span
+
+Node = Union[Symbol, Variable, String, Number, Expression]
+
+
+class ParseError(ValueError):
+    """Malformed s-expression text, raised at the first offending token."""
+    def __init__(self, message: str, line: int, column: int, text: str = ""):
+        super().__init__(f"{message} at line {line}, column {column}" + (f": {text}" if text else ""))
+        self.line = line
+        self.column = column
+
+
+def _atom(text: str, start: int, end: int) -> Node:
+    first = text[0]
+    if first == '"':
+        return String(re.sub(r'\\(.)', lambda m: ESCAPES.get(m[1], m[1]), text[1:-1]), start, end)
+    if first == '$' and len(text) > 1:
+        return Variable(text[1:], start, end)
+    if NUMBER.fullmatch(text):
+        return Number(float(text) if any(c in text for c in '.eE') else int(text), text, start, end)
+    return Symbol(text, start, end)
+
+class Reader:
+    """Reads s-expressions from text fed line by line, looking at every character once.
+
+    feed_line returns the top-level nodes the line completes; spans are offsets in
+    the fed lines joined with newlines. Tokens never span lines, so a line is
+    tokenized on its own while open expressions are carried over.
+    """
+    def __init__(self):
+        self.stack: list[tuple[int, int, int, list]] = []  # offset, line, column and children of open expressions
+        self.offset = 0
+        self.line = 1
+        self.text = ""
+
+    @property
+    def depth(self) -> int:
+        return len(self.stack)
+
+    def _error(self, message: str, column: int) -> ParseError:
+        return ParseError(message, self.line, column + 1, self.text.strip())
+
+    def feed_line(self, line: str) -> list[Node]:
+        self.text = line
+        completed = []
+        stack = self.stack
+        offset = self.offset
+        for match in TOKEN.finditer(line):
+            token = match.group()
+            first = token[0]
+            if first == ';':
+                break
+            start = offset + match.start()
+            if first == '(':
+                stack.append((start, self.line, match.start(), []))
+                continue
+            if first == ')':
+                if not stack:
+                    raise self._error("Unbalanced ')'", match.start())
+                begin, _, _, children = stack.pop()
+                node = Expression(tuple(children), begin, start + 1)
+            elif first not in SPECIAL_START:
+                node = Symbol(token, start, start + len(token))
+            elif first == '"' and match.group(1) is None:
+                raise self._error("Unterminated string", match.start())
+            else:
+                node = _atom(token, start, start + len(token))
+            (stack[-1][3] if stack else completed).append(node)
+        self.skip_line(line)
+        return completed
+
+    def skip_line(self, line: str) -> None:
+        """Account for a line that is not parsed, so later spans stay correct."""
+        self.offset += len(line) + 1
+        self.line += 1
+
+    def close(self) -> None:
+        """Check that no expression is left open."""
+        if self.stack:
+            _, line, column, _ = self.stack[-1]
+            raise ParseError(f"Missing {len(self.stack)} ')' for the '(' opened", line, column + 1)
+
+def parse(text: str) -> list[Node]:
+    """All top-level nodes of text."""
+    reader = Reader()
+    nodes = []
+    for line in text.split('\n'):
+        nodes.extend(reader.feed_line(line))
+    reader.close()
+    return nodes
+
+def render(node: Node) -> str:
+    """Canonical text of a node: single spaces, no comments, escaped strings."""
+    if isinstance(node, Expression):
+        return '(' + ' '.join(map(render, node.children)) + ')'
+    if isinstance(node, Symbol):
+        return node.name
+    if isinstance(node, Variable):
+        return '$' + node.name
+    if isinstance(node, String):
+        escaped = node.value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\t', '\\t')
+        return f'"{escaped}"'
+    return node.text
+
+def to_lists(node: Node) -> list | str:
+    """Nested lists of the canonical atom texts, as used by validation and pln_render."""
+    if isinstance(node, Expression):
+        return [to_lists(child) for child in node.children]
+    return render(node)
+
+def expressions(lines: Iterable[str]) -> list[Expression]:
+    """
+    The top-level expressions of an LLM output section. Lines outside of any
+    expression that do not start with '(' are prose and skipped, as are atoms
+    after an expression on its last line.
+
+    Raises:
+        ParseError: for unbalanced parentheses or unterminated strings
+    """
+    reader = Reader()
+    result = []
+    for line in lines:
+        if not reader.depth and not line.lstrip().startswith('('):
+            reader.skip_line(line)
+            continue
+        result.extend(node for node in reader.feed_line(line) if isinstance(node, Expression))
+    reader.close()
+    return result
+
+def statements(lines: Iterable[str]) -> list[str]:
+    """
+    The canonical text of the top-level expressions of an LLM output section, the
+    same as rendering expressions(lines) but without building nodes.
+
+    Lines are only counted for their parentheses and comments are cut off; the
+    statements are then normalised and checked together. The full Reader runs
+    instead for sections with strings, and for sections whose parentheses do not
+    balance or close a statement before its last parenthesis, to split them
+    exactly or raise its ParseError.
+    """
+    lines = list(lines)
+    texts = []
+    current = []
+    depth = 0
+    for line in lines:
+        if '"' in line or '\0' in line:
+            return [render(expression) for expression in expressions(lines)]
+        if ';' in line:
+            line = line.split(';', 1)[0]
+        if not depth and not line.lstrip().startswith('('):
+            continue  # prose
+        depth += line.count('(') - line.count(')')
+        if depth < 0:
+            return [render(expression) for expression in expressions(lines)]
+        current.append(line)
+        if not depth:
+            # Atoms after the closing parenthesis are dropped, as by expressions
+            text = ' '.join(current)
+            texts.append(text[:text.rindex(')') + 1].lstrip())
+            current = []
+    if depth:
+        return [render(expression) for expression in expressions(lines)]
+    if not texts:
+        return []
+    # Inside the outermost pair of each statement, the parentheses must cancel out
+    section = '\0'.join(texts)
+    inner = section.encode().translate(None, NOT_PARENS).replace(b')\0(', b'\0')[1:-1]
+    while True:
+        reduced = inner.replace(b'()', b'')
+        if len(reduced) == len(inner):
+            break
+        inner = reduced
+    if inner.strip(b'\0'):
+        return [render(expression) for expression in expressions(lines)]
+    if '  ' in section or not section.isascii() or any(space in section for space in ASCII_SPACES):
+        section = ' '.join(section.split())
+    if GLUED_OPEN.search(section) or GLUED_CLOSE.search(section):
+        section = ' '.join(section.replace('(', ' ( ').replace(')', ' ) ').split()).replace(' \0 ', '\0')
+    return section.replace('( ', '(').replace(' )', ')').split('\0')
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Lets concurrent identical calls share one outstanding request.
+
+    The first caller for a key runs the function, callers arriving while it is
+    still running wait for and receive the same result (or exception). Nothing is
+    cached once the call has finished.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.in_flight: dict[Hashable, Future] = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self.lock:
+            self.calls += 1
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def report(self) -> str:
+        return f"{self.name}: {self.deduplicated} of {self.calls} calls shared an identical in-flight request"
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent identical awaits share one outstanding request.
+
+    Futures belong to the event loop of the first caller, so use one instance per loop.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            # shield, so a cancelled waiter does not cancel the shared request
+            return await asyncio.shield(future)
+
+        future = self.in_flight[key] = asyncio.ensure_future(func())
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done() and self.in_flight.get(key) is future:
+                del self.in_flight[key]
+            elif not future.done():
+                future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+    def report(self) -> str:
+        return f"{self.name}: {self.deduplicated} of {self.calls} calls shared an identical in-flight request"
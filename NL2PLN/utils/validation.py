@@ -0,0 +1,182 @@
+import os
+import threading
+from typing import Iterable
+from hyperon import MeTTa
+from NL2PLN.utils.common import extract_expressions
+from NL2PLN.utils.sexpr import Expression, Node, Symbol, Variable, parse, render, to_lists
+
+_local = threading.local()
+
+def _metta() -> MeTTa:
+    # MeTTa instances are not shared between threads, look-ahead drafts are validated in the background
+    if not hasattr(_local, "metta"):
+        _local.metta = MeTTa()
+    return _local.metta
+
+def read_sexpr(text: str) -> list | str:
+    """Read a single s-expression into nested lists of symbols.
+
+    Raises:
+        ValueError: if the parentheses are unbalanced or there is more than one expression
+    """
+    nodes = parse(text)
+    if len(nodes) != 1:
+        raise ValueError(f"Expected one expression, found {len(nodes)} in {text}")
+    return to_lists(nodes[0])
+
+def metta_parse_error(statement: str) -> str | None:
+    try:
+        atoms = _metta().parse_all(statement)
+    except Exception as e:
+        return f"MeTTa cannot parse {statement}: {e}"
+    if len(atoms) != 1:
+        return f"MeTTa parses {statement} as {len(atoms)} expressions"
+    return None
+
+# Operators and base types of the nl2pln format, never declared
+BUILTINS = {':', '->', 'Σ', '*', '|', 'Not', '∩', '∪', 'Type', 'Object'}
+# Objects the nl2pln prompt says are always in the context
+CONTEXT_OBJECTS = {'authorSpeaker', 'readerLister', 'placeTime'}
+
+def _declarations(node: Node):
+    """(name, type) of every (: name type) in node, nested ones included."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Expression):
+            children = node.children
+            if (len(children) == 3 and isinstance(children[0], Symbol) and children[0].name == ':'
+                    and isinstance(children[1], Symbol)):
+                yield children[1].name, children[2]
+            stack.extend(children)
+
+def _arity(type_node: Node) -> int | None:
+    children = type_node.children if isinstance(type_node, Expression) else ()
+    if children and isinstance(children[0], Symbol) and children[0].name == '->':
+        return len(children) - 2
+    return None
+
+class SymbolTable:
+    """Declared names, predicate arities and types, to check LLM output without MeTTa.
+
+    Fill it from the KB once with from_kb and add the statements of every accepted
+    sentence; checks are then dictionary lookups.
+    """
+    def __init__(self, statements: Iterable[str | Node] = ()):
+        self.names = set(CONTEXT_OBJECTS)
+        self.types: dict[str, str] = {}
+        self.arities: dict[str, int] = {}
+        self.add(statements)
+
+    @classmethod
+    def from_kb(cls, metta_handler) -> "SymbolTable":
+        """The declarations in the &kb space of a MeTTaHandler and in its KB file."""
+        table = cls(metta_handler.declarations())
+        if os.path.exists(metta_handler.file):
+            with open(metta_handler.file) as f:
+                try:
+                    table.add([f.read()])
+                except ValueError as e:
+                    print(f"Warning: cannot read declarations from {metta_handler.file}: {e}")
+        return table
+
+    def add(self, statements: Iterable[str | Node]) -> None:
+        for statement in statements:
+            for node in parse(statement) if isinstance(statement, str) else [statement]:
+                for name, type_node in _declarations(node):
+                    self.names.add(name)
+                    # MeTTa compares new type definitions with the first matching one
+                    self.types.setdefault(name, render(type_node))
+                    arity = _arity(type_node)
+                    if arity is not None:
+                        self.arities[name] = arity
+
+def structural_errors(sections: dict[str, list[Expression]], symbols: SymbolTable | None = None) -> list[str]:
+    """Mechanical errors in the sections read by extract_expressions.
+
+    Checks predicates against their declared arity and $-variables in statements
+    that no -> or Σ binds. With the symbols of the KB it also reports undeclared
+    symbols and type definitions that conflict with the KB.
+    """
+    local = SymbolTable(node for section in sections.values() for node in section)
+    errors = []
+    undeclared = {}
+
+    if symbols is not None:
+        for node in sections["type_definitions"]:
+            for name, type_node in _declarations(node):
+                known = symbols.types.get(name)
+                if known is not None and known != render(type_node):
+                    errors.append(f"Type definition (: {name} {render(type_node)}) conflicts with "
+                                  f"(: {name} {known}) in the KB")
+
+    def check(node, statement, variables_allowed, bound):
+        if isinstance(node, Variable):
+            if not variables_allowed and node.name not in bound:
+                errors.append(f"Variable ${node.name} in statement {render(statement)} is not bound by -> or Σ")
+        elif isinstance(node, Symbol):
+            if (symbols is not None and node.name not in BUILTINS and node.name not in local.names
+                    and node.name not in symbols.names):
+                undeclared.setdefault(node.name)
+        elif isinstance(node, Expression) and node.children:
+            children = node.children
+            head = children[0].name if isinstance(children[0], Symbol) else None
+            if head == '->':
+                # Variables of an implication are universally quantified
+                variables_allowed = True
+            elif head == 'Σ' and len(children) == 3:
+                binder = children[1]
+                if isinstance(binder, Expression) and len(binder.children) == 3 and isinstance(binder.children[1],
+                                                                                                Variable):
+                    bound = bound | {binder.children[1].name}
+            elif head == ':' and len(children) == 3 and isinstance(children[1], Symbol):
+                # The declared name is not a use
+                children = (children[0], children[2])
+            elif head and head not in BUILTINS:
+                arity = local.arities.get(head, symbols.arities.get(head) if symbols else None)
+                if arity is not None and len(children) - 1 != arity:
+                    errors.append(f"{head} is declared with {arity} arguments but used with {len(children) - 1}")
+            for child in children:
+                check(child, statement, variables_allowed, bound)
+
+    for section in ("statements", "questions"):
+        for statement in sections[section]:
+            check(statement, statement, section == "questions", frozenset())
+    errors.extend(f"Symbol {name} is not declared" for name in undeclared)
+    return errors
+
+def _read_sections(txt: str) -> tuple[dict[str, list[Expression]] | None, list[str]]:
+    try:
+        sections = extract_expressions(txt)
+    except ValueError as e:
+        return None, [str(e)]
+    if sections is None:
+        return None, ["No code block with statements or questions found"]
+    if sections == "Performative":
+        return None, []
+    return sections, []
+
+def check_structure(txt: str, symbols: SymbolTable | None = None) -> list[str]:
+    """Fast check of an LLM response in the nl2pln format, see structural_errors.
+
+    Returns a list of problems; an empty list means the output passed.
+    """
+    sections, errors = _read_sections(txt)
+    return structural_errors(sections, symbols) if sections else errors
+
+def check_logic_output(txt: str) -> list[str]:
+    """Check an LLM response in the nl2pln format without asking anyone.
+
+    Runs check_structure and makes sure MeTTa can parse every statement.
+    Returns a list of problems; an empty list means the output passed.
+    """
+    sections, errors = _read_sections(txt)
+    if not sections:
+        return errors
+    errors = structural_errors(sections)
+    for section in sections.values():
+        for expression in section:
+            parse_error = metta_parse_error(render(expression))
+            if parse_error:
+                errors.append(parse_error)
+    return errors
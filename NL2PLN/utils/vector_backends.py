@@ -0,0 +1,748 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import uuid
+from typing import Iterator, NamedTuple
+from urllib.parse import urlparse
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+
+class Hit(NamedTuple):
+    id: str
+    score: float
+    payload: dict
+    vector: list[float] | None = None
+
+QUANTIZATIONS = (None, "int8", "binary")
+
+class VectorBackend:
+    """Stores (id, vector, payload) points in named collections and searches them by cosine similarity.
+
+    RAG talks to its vector store only through this interface.
+    """
+    def collection_exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def create_collection(self, name: str, size: int, quantization: str | None = None,
+                          on_disk_payload: bool = False) -> None:
+        """Create a collection. quantization is None, "int8" or "binary"; searches rescore with the full vectors."""
+        raise NotImplementedError
+
+    def configure_collection(self, name: str, quantization: str | None = None, on_disk_payload: bool = False) -> None:
+        """Change the storage options of an existing collection in place."""
+        raise NotImplementedError
+
+    def upsert(self, name: str, points: list[tuple[str, list[float], dict]]) -> None:
+        raise NotImplementedError
+
+    def search(self, name: str, vector: list[float], limit: int, with_vectors: bool = False) -> list[Hit]:
+        raise NotImplementedError
+
+    def search_batch(self, name: str, vectors: list[list[float]], limit: int) -> list[list[Hit]]:
+        return [self.search(name, vector, limit) for vector in vectors]
+
+    def count(self, name: str) -> int:
+        raise NotImplementedError
+
+    def scroll(self, name: str, batch_size: int = 256) -> Iterator[Hit]:
+        """Iterate over all points of a collection, with vectors."""
+        raise NotImplementedError
+
+    def scroll_page(self, name: str, offset=None, limit: int = 256, end=None) -> tuple[list[Hit], object]:
+        """
+        One page of points with vectors, starting at offset (None for the first page),
+        and the JSON-serializable offset of the next page, None after the last one.
+        With end, the scroll stops before that offset.
+        """
+        raise NotImplementedError
+
+    def partition_offsets(self, name: str, parts: int) -> list:
+        """Start offsets of `parts` disjoint ranges covering the collection, for parallel scrolls."""
+        raise NotImplementedError
+
+    def delete(self, name: str, ids: list[str]) -> None:
+        raise NotImplementedError
+
+    def create_payload_index(self, name: str, field: str) -> None:
+        """Index a keyword payload field for find. Creating an existing index does nothing."""
+        raise NotImplementedError
+
+    def find(self, name: str, field: str, values: list[str]) -> list[Hit]:
+        """All points whose payload field equals one of values, without vectors."""
+        raise NotImplementedError
+
+    def get_alias(self, alias: str) -> str | None:
+        """The collection an alias points to, None if there is no such alias."""
+        raise NotImplementedError
+
+    def set_alias(self, alias: str, collection: str) -> None:
+        """
+        Atomically point alias at collection, creating the alias or moving it away from
+        its current collection. All methods accept aliases in place of collection names.
+        """
+        raise NotImplementedError
+
+
+_shared_lock = threading.Lock()
+_qdrant_clients = {}
+
+def _grpc_available(url, grpc_port):
+    try:
+        with socket.create_connection((urlparse(url).hostname, grpc_port), timeout=1):
+            return True
+    except OSError:
+        return False
+
+def qdrant_client(url, prefer_grpc=True, grpc_port=6334, timeout=30):
+    """
+    Get the process-wide Qdrant client for a server, using the gRPC transport
+    if the server accepts connections on grpc_port and REST otherwise.
+    """
+    with _shared_lock:
+        key = (url, prefer_grpc, grpc_port, timeout)
+        if key not in _qdrant_clients:
+            if url == ":memory:":
+                client = QdrantClient(url)
+            elif prefer_grpc and _grpc_available(url, grpc_port):
+                client = QdrantClient(url, prefer_grpc=True, grpc_port=grpc_port, timeout=timeout)
+            else:
+                client = QdrantClient(url, timeout=timeout)
+            _qdrant_clients[key] = client
+        return _qdrant_clients[key]
+
+class _QdrantRequests:
+    """The requests of QdrantBackend and AsyncQdrantBackend, which differ only in awaiting the client."""
+    # Rescore quantized candidates with the full vectors; ignored by collections without quantization
+    search_params = models.SearchParams(quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0))
+
+    @staticmethod
+    def _quantization_config(quantization):
+        if quantization == "int8":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+        if quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        if quantization is None:
+            return None
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+
+    def _create_request(self, name, size, quantization, on_disk_payload):
+        return dict(
+            collection_name=name,
+            # With quantization the full vectors are only read for rescoring, so they can stay on disk
+            vectors_config=models.VectorParams(size=size, distance=models.Distance.COSINE,
+                                               on_disk=quantization is not None),
+            quantization_config=self._quantization_config(quantization),
+            on_disk_payload=on_disk_payload,
+        )
+
+    @staticmethod
+    def _point_id(point_id):
+        # Qdrant ids are unsigned integers or UUIDs; hits carry integer ids as strings
+        return int(point_id) if isinstance(point_id, str) and point_id.isdigit() else point_id
+
+    def _upsert_request(self, name, points):
+        return dict(
+            collection_name=name,
+            points=[models.PointStruct(id=self._point_id(id), vector=vector, payload=payload)
+                    for id, vector, payload in points]
+        )
+
+    @staticmethod
+    def _hit(point, score=0.0):
+        vector = point.vector.tolist() if hasattr(point.vector, "tolist") else point.vector
+        return Hit(str(point.id), getattr(point, "score", score), point.payload, vector)
+
+    def _search_request(self, name, vector, limit, with_vectors):
+        return dict(collection_name=name, query_vector=vector, limit=limit, with_vectors=with_vectors,
+                    search_params=self.search_params)
+
+    def _search_batch_request(self, name, vectors, limit):
+        return dict(
+            collection_name=name,
+            requests=[models.SearchRequest(vector=vector, limit=limit, with_payload=True, params=self.search_params)
+                      for vector in vectors]
+        )
+
+    def _delete_request(self, name, ids):
+        return dict(collection_name=name, points_selector=models.PointIdsList(points=[self._point_id(id) for id in ids]))
+
+    @staticmethod
+    def _index_request(name, field):
+        return dict(collection_name=name, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD)
+
+    @staticmethod
+    def _find_request(name, field, values, offset):
+        return dict(
+            collection_name=name,
+            scroll_filter=models.Filter(must=[models.FieldCondition(key=field, match=models.MatchAny(any=list(values)))]),
+            limit=256,
+            offset=offset
+        )
+
+    @staticmethod
+    def _scroll_request(name, offset, limit):
+        return dict(collection_name=name, limit=limit, offset=offset, with_vectors=True)
+
+    @staticmethod
+    def _id_order(point_id):
+        # Qdrant orders integer ids before UUIDs
+        if isinstance(point_id, int) or str(point_id).isdigit():
+            return 0, int(point_id)
+        return 1, uuid.UUID(str(point_id)).int
+
+    def _page(self, batch, offset, end):
+        """The hits of a scroll page and the next offset, stopping before end."""
+        hits = [self._hit(point) for point in batch]
+        if end is not None:
+            end_order = self._id_order(end)
+            inside = [hit for hit in hits if self._id_order(hit.id) < end_order]
+            if len(inside) < len(hits) or (offset is not None and self._id_order(offset) >= end_order):
+                offset = None
+            hits = inside
+        return hits, offset
+
+class QdrantBackend(_QdrantRequests, VectorBackend):
+    def __init__(self, client: QdrantClient):
+        self.client = client
+
+    def collection_exists(self, name):
+        collections = self.client.get_collections().collections
+        return any(collection.name == name for collection in collections) or self.get_alias(name) is not None
+
+    def create_collection(self, name, size, quantization=None, on_disk_payload=False):
+        self.client.create_collection(**self._create_request(name, size, quantization, on_disk_payload))
+
+    def configure_collection(self, name, quantization=None, on_disk_payload=False):
+        self.client.update_collection(
+            collection_name=name,
+            vectors_config={"": models.VectorParamsDiff(on_disk=quantization is not None)},
+            quantization_config=self._quantization_config(quantization) or models.Disabled.DISABLED,
+            collection_params=models.CollectionParamsDiff(on_disk_payload=on_disk_payload),
+        )
+
+    def upsert(self, name, points):
+        self.client.upsert(**self._upsert_request(name, points))
+
+    def search(self, name, vector, limit, with_vectors=False):
+        return [self._hit(hit) for hit in self.client.search(**self._search_request(name, vector, limit, with_vectors))]
+
+    def search_batch(self, name, vectors, limit):
+        results = self.client.search_batch(**self._search_batch_request(name, vectors, limit))
+        return [[self._hit(hit) for hit in hits] for hits in results]
+
+    def count(self, name):
+        return self.client.count(collection_name=name).count
+
+    def scroll(self, name, batch_size=256):
+        offset = None
+        while True:
+            batch, offset = self.client.scroll(
+                collection_name=name, limit=batch_size, offset=offset, with_vectors=True
+            )
+            yield from (self._hit(point) for point in batch)
+            if offset is None:
+                break
+
+    def scroll_page(self, name, offset=None, limit=256, end=None):
+        return self._page(*self.client.scroll(**self._scroll_request(name, offset, limit)), end)
+
+    def partition_offsets(self, name, parts):
+        # Equal ranges of the UUID space, the first one also holds any integer ids
+        return [None] + [str(uuid.UUID(int=k * 2**128 // parts)) for k in range(1, parts)]
+
+    def delete(self, name, ids):
+        self.client.delete(**self._delete_request(name, ids))
+
+    def create_payload_index(self, name, field):
+        self.client.create_payload_index(**self._index_request(name, field))
+
+    def find(self, name, field, values):
+        hits = []
+        offset = None
+        while True:
+            batch, offset = self.client.scroll(**self._find_request(name, field, values, offset))
+            hits.extend(self._hit(point) for point in batch)
+            if offset is None:
+                return hits
+
+    def get_alias(self, alias):
+        aliases = self.client.get_aliases().aliases
+        return next((a.collection_name for a in aliases if a.alias_name == alias), None)
+
+    def set_alias(self, alias, collection):
+        # Deleting and re-creating in one request is applied atomically by the server
+        operations = []
+        if self.get_alias(alias) is not None:
+            operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+
+
+# Number of candidates per result that are rescored with the float32 vectors
+OVERSAMPLING = {"int8": 2, "binary": 8}
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    """Number of set bits of each uint64."""
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0f0f0f0f0f0f0f0f)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+class _LocalCollection:
+    """One collection of a LocalBackend.
+
+    Files in the collection directory:
+        meta.json       vector size, number of rows, storage options and indexed payload fields
+        vectors.f32     float32 matrix of normalized vectors, memory-mapped, grown by doubling
+        payloads.jsonl  one {"id", "payload"} line per write; later lines for an id win
+
+    With quantization, searches scan an in-memory int8 or binary copy of the vectors
+    and rescore the best candidates with the float32 vectors, so only those rows of
+    vectors.f32 are read. With on_disk_payload only the file offsets of the payloads
+    are kept in memory.
+    """
+    def __init__(self, path: str, size: int | None = None, quantization: str | None = None,
+                 on_disk_payload: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.scale = None
+        indexed = []
+        if size is None:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            size = meta["size"]
+            quantization = meta.get("quantization")
+            on_disk_payload = meta.get("on_disk_payload", False)
+            self.scale = meta.get("scale")
+            indexed = meta.get("indexes", [])
+        else:
+            os.makedirs(path, exist_ok=True)
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+        self.size = size
+        self.quantization = quantization
+        self.on_disk_payload = on_disk_payload
+        self.payload_path = os.path.join(path, "payloads.jsonl")
+        # field -> value -> rows, for the fields passed to create_index
+        self.indexes: dict[str, dict[str, set[int]]] = {field: {} for field in indexed}
+        self._load_payloads()
+        self.rows = len(self.ids)
+        self.vectors = self._open(max(self.rows, 1024))
+        self.live = np.zeros(self.vectors.shape[0], dtype=bool)
+        self.live[:self.rows] = [payload is not None for payload in self.payloads]
+        self._build_codes()
+        self._write_meta()
+
+    def _load_payloads(self) -> None:
+        """
+        Read payloads.jsonl into ids, row_of, payloads (dicts, or (offset, length) on
+        disk) and the indexes, in one pass so no payload is read back from disk.
+        """
+        self.ids: list[str] = []
+        self.payloads: list = []
+        self.row_of: dict[str, int] = {}
+        values = {field: [] for field in self.indexes}  # the indexed value of every row
+        if os.path.exists(self.payload_path):
+            offset = 0
+            with open(self.payload_path, "rb") as f:
+                for line in f:
+                    record = json.loads(line)
+                    stored = None if record.get("deleted") else (
+                        (offset, len(line)) if self.on_disk_payload else record["payload"])
+                    offset += len(line)
+                    row = self.row_of.get(record["id"])
+                    if row is not None:
+                        self.payloads[row] = stored
+                    elif stored is not None:
+                        row = self.row_of[record["id"]] = len(self.ids)
+                        self.ids.append(record["id"])
+                        self.payloads.append(stored)
+                        for column in values.values():
+                            column.append(None)
+                    else:
+                        continue
+                    for field, column in values.items():
+                        column[row] = None if stored is None else record["payload"].get(field)
+        for field, column in values.items():
+            index = self.indexes[field] = {}
+            for row, value in enumerate(column):
+                if value is not None:
+                    index.setdefault(value, set()).add(row)
+
+    def _payload(self, row: int) -> dict | None:
+        stored = self.payloads[row]
+        if isinstance(stored, tuple):
+            with open(self.payload_path, "rb") as f:
+                f.seek(stored[0])
+                return json.loads(f.read(stored[1]))["payload"]
+        return stored
+
+    def _open(self, capacity: int) -> np.memmap:
+        file = os.path.join(self.path, "vectors.f32")
+        needed = capacity * self.size * 4
+        with open(file, "ab") as f:
+            if f.tell() < needed:
+                f.truncate(needed)
+        return np.memmap(file, dtype=np.float32, mode="r+", shape=(capacity, self.size))
+
+    def _write_meta(self) -> None:
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"size": self.size, "rows": self.rows, "quantization": self.quantization,
+                       "scale": self.scale, "on_disk_payload": self.on_disk_payload,
+                       "indexes": list(self.indexes)}, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.quantization == "binary":
+            bits = np.packbits(vectors > 0, axis=-1)
+            padding = (-bits.shape[-1]) % 8
+            return np.pad(bits, [(0, 0)] * (bits.ndim - 1) + [(0, padding)])
+        if self.scale is None:
+            # Map the 99th percentile of the absolute component values to 127
+            self.scale = 127 / max(float(np.quantile(np.abs(vectors), 0.99)), 1e-6)
+        return np.clip(np.rint(vectors * self.scale), -127, 127).astype(np.int8)
+
+    def _build_codes(self) -> None:
+        self.codes = None
+        if self.quantization is None:
+            return
+        # Binary codes are padded to whole 64-bit words for the popcount
+        width = (self.size + 63) // 64 * 8 if self.quantization == "binary" else self.size
+        dtype = np.uint8 if self.quantization == "binary" else np.int8
+        self.codes = np.zeros((self.vectors.shape[0], width), dtype=dtype)
+        for i in range(0, self.rows, 65536):
+            self.codes[i:min(i + 65536, self.rows)] = self._encode(np.asarray(self.vectors[i:min(i + 65536, self.rows)]))
+
+    def configure(self, quantization: str | None, on_disk_payload: bool) -> None:
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+        with self.lock:
+            if on_disk_payload != self.on_disk_payload:
+                self.on_disk_payload = on_disk_payload
+                self._load_payloads()
+            if quantization != self.quantization:
+                self.quantization = quantization
+                self.scale = None
+                self._build_codes()
+            self._write_meta()
+
+    def _index(self, row: int, payload: dict | None, add: bool) -> None:
+        for field, index in self.indexes.items():
+            value = (payload or {}).get(field)
+            if value is None:
+                continue
+            if add:
+                index.setdefault(value, set()).add(row)
+            else:
+                index.get(value, set()).discard(row)
+
+    def create_index(self, field: str) -> None:
+        with self.lock:
+            if field in self.indexes:
+                return
+            # Indexed fields are kept in meta.json and indexed while the payloads are loaded
+            self.indexes[field] = {}
+            self._load_payloads()
+            self._write_meta()
+
+    def find(self, field: str, values) -> list[Hit]:
+        if field not in self.indexes:
+            self.create_index(field)
+        with self.lock:
+            index = self.indexes[field]
+            rows = sorted(set().union(*(index.get(value, set()) for value in values)))
+            return [Hit(self.ids[row], 1.0, self._payload(row)) for row in rows]
+
+    def upsert(self, points) -> None:
+        with self.lock:
+            new = [id for id, _, _ in points if id not in self.row_of]
+            if self.rows + len(new) > self.vectors.shape[0]:
+                self.vectors.flush()
+                self.vectors = self._open(max(2 * self.vectors.shape[0], self.rows + len(new)))
+                grow = self.vectors.shape[0] - len(self.live)
+                self.live = np.concatenate([self.live, np.zeros(grow, dtype=bool)])
+                if self.codes is not None:
+                    self.codes = np.concatenate([self.codes, np.zeros((grow, self.codes.shape[1]), self.codes.dtype)])
+            changed = []
+            with open(self.payload_path, "ab") as f:
+                for id, vector, payload in points:
+                    vector = np.asarray(vector, dtype=np.float32)
+                    norm = np.linalg.norm(vector)
+                    line = (json.dumps({"id": id, "payload": payload}) + "\n").encode()
+                    stored = (f.tell(), len(line)) if self.on_disk_payload else payload
+                    f.write(line)
+                    row = self.row_of.get(id)
+                    if row is None:
+                        row = self.row_of[id] = self.rows
+                        self.ids.append(id)
+                        self.payloads.append(stored)
+                        self.rows += 1
+                    else:
+                        self._index(row, self._payload(row), add=False)
+                        self.payloads[row] = stored
+                    self._index(row, payload, add=True)
+                    self.vectors[row] = vector / norm if norm else vector
+                    self.live[row] = True
+                    changed.append(row)
+            if self.codes is not None and changed:
+                self.codes[changed] = self._encode(np.asarray(self.vectors[changed]))
+            self.vectors.flush()
+            self._write_meta()
+
+    def delete(self, ids) -> None:
+        with self.lock, open(self.payload_path, "ab") as f:
+            for id in ids:
+                row = self.row_of.get(id)
+                if row is not None and self.payloads[row] is not None:
+                    self._index(row, self._payload(row), add=False)
+                    self.payloads[row] = None
+                    self.live[row] = False
+                    f.write((json.dumps({"id": id, "deleted": True}) + "\n").encode())
+            self.vectors.flush()
+
+    def _approximate_scores(self, query: np.ndarray, rows: int) -> np.ndarray:
+        if self.quantization == "binary":
+            distance = _popcount(self.codes[:rows].view(np.uint64) ^ self._encode(query).view(np.uint64))
+            return -distance.sum(axis=1, dtype=np.int32).astype(np.float32)
+        # Small chunks keep the float32 copy of the codes in cache
+        return np.concatenate([self.codes[i:min(i + 4096, rows)].astype(np.float32) @ query
+                               for i in range(0, rows, 4096)] or [np.zeros(0, np.float32)])
+
+    def search(self, vector, limit, with_vectors=False) -> list[Hit]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        with self.lock:
+            rows = self.rows
+            live = self.live[:rows]
+            limit = min(limit, int(live.sum()))
+            if limit <= 0:
+                return []
+            if self.quantization is None:
+                candidates = np.arange(rows)
+                scores = np.where(live, self.vectors[:rows] @ query, -np.inf)
+            else:
+                approximate = np.where(live, self._approximate_scores(query, rows), -np.inf)
+                count = min(limit * OVERSAMPLING[self.quantization], int(live.sum()))
+                candidates = np.sort(np.argpartition(-approximate, count - 1)[:count])
+                scores = self.vectors[candidates] @ query
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [Hit(self.ids[candidates[i]], float(scores[i]), self._payload(candidates[i]),
+                        self.vectors[candidates[i]].tolist() if with_vectors else None) for i in top]
+
+    def footprint(self) -> dict[str, int]:
+        """Bytes of vector and payload data a search keeps in memory."""
+        scanned = self.codes if self.codes is not None else self.vectors
+        payloads = 16 * self.rows if self.on_disk_payload else sum(
+            len(json.dumps(payload)) for payload in self.payloads if payload is not None)
+        return {"vectors": scanned[:self.rows].nbytes, "payloads": payloads}
+
+
+class LocalBackend(VectorBackend):
+    """In-process vector store persisted in a directory, one subdirectory per collection.
+
+    Vectors are kept normalized in a memory-mapped float32 matrix, so a search is
+    one matrix-vector product (over the quantized copy, plus rescoring, for quantized
+    collections) without any network round trip. Aliases are kept in aliases.json,
+    which is replaced atomically and re-read when another process changes it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.collections: dict[str, _LocalCollection] = {}
+        self.lock = threading.Lock()
+        self.alias_file = os.path.join(path, "aliases.json")
+        self.aliases: dict[str, str] = {}
+        self.alias_version = None
+        os.makedirs(path, exist_ok=True)
+
+    def _resolve(self, name: str) -> str:
+        try:
+            stat = os.stat(self.alias_file)
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+        if version != self.alias_version:
+            aliases = {}
+            if version is not None:
+                with open(self.alias_file) as f:
+                    aliases = json.load(f)
+            self.aliases, self.alias_version = aliases, version
+        return self.aliases.get(name, name)
+
+    def _collection(self, name: str) -> _LocalCollection:
+        with self.lock:
+            name = self._resolve(name)
+            if name not in self.collections:
+                directory = os.path.join(self.path, name)
+                if not os.path.exists(os.path.join(directory, "meta.json")):
+                    raise KeyError(f"Collection '{name}' does not exist in {self.path}")
+                self.collections[name] = _LocalCollection(directory)
+            return self.collections[name]
+
+    def collection_exists(self, name):
+        with self.lock:
+            name = self._resolve(name)
+        return name in self.collections or os.path.exists(os.path.join(self.path, name, "meta.json"))
+
+    def create_collection(self, name, size, quantization=None, on_disk_payload=False):
+        with self.lock:
+            if self._resolve(name) != name:
+                raise ValueError(f"'{name}' is an alias in {self.path}")
+            self.collections[name] = _LocalCollection(os.path.join(self.path, name), size, quantization,
+                                                      on_disk_payload)
+
+    def configure_collection(self, name, quantization=None, on_disk_payload=False):
+        self._collection(name).configure(quantization, on_disk_payload)
+
+    def footprint(self, name) -> dict[str, int]:
+        return self._collection(name).footprint()
+
+    def upsert(self, name, points):
+        self._collection(name).upsert(points)
+
+    def search(self, name, vector, limit, with_vectors=False):
+        return self._collection(name).search(vector, limit, with_vectors)
+
+    def count(self, name):
+        collection = self._collection(name)
+        return int(collection.live[:collection.rows].sum())
+
+    def scroll(self, name, batch_size=256):
+        collection = self._collection(name)
+        for row in range(collection.rows):
+            if collection.payloads[row] is not None:
+                yield Hit(collection.ids[row], 0.0, collection._payload(row), collection.vectors[row].tolist())
+
+    def scroll_page(self, name, offset=None, limit=256, end=None):
+        # Offsets are row numbers
+        collection = self._collection(name)
+        stop = collection.rows if end is None else min(end, collection.rows)
+        hits = []
+        row = offset or 0
+        while row < stop and len(hits) < limit:
+            if collection.payloads[row] is not None:
+                hits.append(Hit(collection.ids[row], 0.0, collection._payload(row), collection.vectors[row].tolist()))
+            row += 1
+        return hits, row if row < stop else None
+
+    def partition_offsets(self, name, parts):
+        rows = self._collection(name).rows
+        return [rows * k // parts for k in range(parts)]
+
+    def delete(self, name, ids):
+        self._collection(name).delete(ids)
+
+    def create_payload_index(self, name, field):
+        self._collection(name).create_index(field)
+
+    def find(self, name, field, values):
+        return self._collection(name).find(field, values)
+
+    def get_alias(self, alias):
+        with self.lock:
+            self._resolve(alias)
+            return self.aliases.get(alias)
+
+    def set_alias(self, alias, collection):
+        with self.lock:
+            if os.path.exists(os.path.join(self.path, alias, "meta.json")):
+                raise ValueError(f"'{alias}' is a collection in {self.path}")
+            if not os.path.exists(os.path.join(self.path, collection, "meta.json")):
+                raise KeyError(f"Collection '{collection}' does not exist in {self.path}")
+            self._resolve(alias)
+            tmp = self.alias_file + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({**self.aliases, alias: collection}, f)
+            os.replace(tmp, self.alias_file)
+            self._resolve(alias)
+
+
+class AsyncQdrantBackend(_QdrantRequests):
+    """The VectorBackend interface as coroutines, on the async Qdrant client."""
+    def __init__(self, client: AsyncQdrantClient):
+        self.client = client
+
+    async def collection_exists(self, name):
+        collections = (await self.client.get_collections()).collections
+        if any(collection.name == name for collection in collections):
+            return True
+        aliases = (await self.client.get_aliases()).aliases
+        return any(alias.alias_name == name for alias in aliases)
+
+    async def create_collection(self, name, size, quantization=None, on_disk_payload=False):
+        await self.client.create_collection(**self._create_request(name, size, quantization, on_disk_payload))
+
+    async def upsert(self, name, points):
+        await self.client.upsert(**self._upsert_request(name, points))
+
+    async def search(self, name, vector, limit, with_vectors=False):
+        return [self._hit(hit) for hit in
+                await self.client.search(**self._search_request(name, vector, limit, with_vectors))]
+
+    async def search_batch(self, name, vectors, limit):
+        results = await self.client.search_batch(**self._search_batch_request(name, vectors, limit))
+        return [[self._hit(hit) for hit in hits] for hits in results]
+
+    async def count(self, name):
+        return (await self.client.count(collection_name=name)).count
+
+    async def scroll_page(self, name, offset=None, limit=256, end=None):
+        return self._page(*await self.client.scroll(**self._scroll_request(name, offset, limit)), end)
+
+    async def delete(self, name, ids):
+        await self.client.delete(**self._delete_request(name, ids))
+
+    async def create_payload_index(self, name, field):
+        await self.client.create_payload_index(**self._index_request(name, field))
+
+    async def find(self, name, field, values):
+        hits = []
+        offset = None
+        while True:
+            batch, offset = await self.client.scroll(**self._find_request(name, field, values, offset))
+            hits.extend(self._hit(point) for point in batch)
+            if offset is None:
+                return hits
+
+    async def close(self):
+        await self.client.close()
+
+class ThreadedBackend:
+    """Runs a synchronous VectorBackend in worker threads, for use from async code."""
+    def __init__(self, backend: VectorBackend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+    async def close(self):
+        pass
+
+def open_backend(url: str, prefer_grpc: bool = True, grpc_port: int = 6334, timeout: int = 30) -> VectorBackend:
+    """Open the vector store at url: local:<directory> for a LocalBackend, anything else is a Qdrant server."""
+    if url.startswith("local:"):
+        return LocalBackend(os.path.expanduser(url[len("local:"):]))
+    return QdrantBackend(qdrant_client(url, prefer_grpc, grpc_port, timeout))
+
+def open_async_backend(url: str, prefer_grpc: bool = True, grpc_port: int = 6334, timeout: int = 30):
+    """
+    Async counterpart of open_backend: the async Qdrant client for a server,
+    the other stores run in worker threads. Close it with `await backend.close()`.
+    """
+    if url.startswith("local:") or url == ":memory:":
+        return ThreadedBackend(open_backend(url, prefer_grpc, grpc_port, timeout))
+    if prefer_grpc and _grpc_available(url, grpc_port):
+        return AsyncQdrantBackend(AsyncQdrantClient(url, prefer_grpc=True, grpc_port=grpc_port, timeout=timeout))
+    return AsyncQdrantBackend(AsyncQdrantClient(url, timeout=timeout))